@@ -1,8 +1,19 @@
 from google.adk.agents.llm_agent import Agent
-from .flowerPrompt import FLOWER_PROMPT
+from .flowerPrompt import CONGRATS_PROMPT, FLOWER_PROMPT
+from .schemas import FlowerAward
 root_agent = Agent(
     model='gemini-2.5-flash',
     name='root_agent',
     description='A helpful assistant for based on the task you decide which flower to give to the user.',
     instruction=FLOWER_PROMPT,
+    # the model is constrained to reply with exactly this JSON object
+    output_schema=FlowerAward,
+)
+
+# Used when the flower itself is picked by the local rule engine.
+message_agent = Agent(
+    model='gemini-2.5-flash',
+    name='message_agent',
+    description='Writes a one-sentence congratulations message for an awarded flower.',
+    instruction=CONGRATS_PROMPT,
 )
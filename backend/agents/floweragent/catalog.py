@@ -0,0 +1,176 @@
+import difflib
+import gzip
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+from .flowerPrompt import FLOWER_TIERS
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are served without it
+    brotli = None
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+# the backend's copy first, then the app's bundle; FLOWER_ASSETS_DIR takes
+# a list of directories separated by os.pathsep
+ASSETS_DIRS = tuple(
+    Path(p) for p in os.getenv(
+        "FLOWER_ASSETS_DIR", os.pathsep.join(map(str, (REPO_ROOT / "flowers", REPO_ROOT / "unfurl" / "flowers")))
+    ).split(os.pathsep) if p
+)
+FUZZY_CUTOFF = 0.8
+
+_CANONICAL_TIERS = {name: tier for tier, names in FLOWER_TIERS.items() for name in names}
+_COMMENT_RE = re.compile(rb"<!--.*?-->", re.S)
+_BETWEEN_TAGS_RE = re.compile(rb">\s+<")
+_TAG_RE = re.compile(rb"<[^!?/][^>]*>")
+_ATTRIBUTE_RE = re.compile(rb'\s+([\w:.-]+)\s*=\s*"([^"]*)"')
+_TAG_END_RE = re.compile(rb"\s+(/?>)$")
+_NUMBER_LIST_ATTRIBUTES = {b"d", b"points", b"viewBox"}
+_PATH_SEPARATOR_RE = re.compile(rb"\s*([MmZzLlHhVvCcSsQqTtAa,])\s*")
+_SEPARATOR_BEFORE_MINUS_RE = re.compile(rb"[\s,]+-")
+_LEADING_ZERO_RE = re.compile(rb"(?<![\d.])0(\.\d)")
+
+
+@dataclass(frozen=True)
+class FlowerAsset:
+    name: str           # canonical filename, as listed in FLOWER_TIERS
+    tier: str | None    # None for decorations such as paper.svg
+    path: Path
+    size: int           # bytes on disk
+    digest: str         # sha256 of the minified SVG
+    body: bytes         # minified SVG
+    gzip_body: bytes
+    br_body: bytes | None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+    @property
+    def url(self) -> str:
+        return f"/flowers/assets/{quote(self.name)}?v={self.digest}"
+
+
+def _key(name: str) -> str:
+    return " ".join(str(name).strip().lower().removesuffix(".svg").split())
+
+
+def _minify_numbers(value: bytes) -> bytes:
+    # path commands and commas already separate numbers, and a minus sign
+    # starts a new one, so no whitespace or comma next to them is needed;
+    # 0.5 is written .5
+    value = _PATH_SEPARATOR_RE.sub(rb"\1", b" ".join(value.split()))
+    value = _SEPARATOR_BEFORE_MINUS_RE.sub(b"-", value)
+    return _LEADING_ZERO_RE.sub(rb"\1", value)
+
+
+def _minify_attribute(match: re.Match) -> bytes:
+    name, value = match.group(1), match.group(2)
+    if name in _NUMBER_LIST_ATTRIBUTES:
+        value = _minify_numbers(value)
+    return b" " + name + b'="' + value + b'"'
+
+
+def _minify_tag(match: re.Match) -> bytes:
+    return _TAG_END_RE.sub(rb"\1", _ATTRIBUTE_RE.sub(_minify_attribute, match.group(0)))
+
+
+def minify_svg(raw: bytes) -> bytes:
+    """Lossless SVG minification with regular expressions.
+
+    Drops comments, whitespace between tags and between attributes, and
+    every redundant separator and leading zero in path data, points and
+    viewBox. Numbers keep their precision and text content is left alone,
+    so the drawing renders exactly as before.
+    """
+    body = _BETWEEN_TAGS_RE.sub(b"><", _COMMENT_RE.sub(b"", raw)).strip()
+    return _TAG_RE.sub(_minify_tag, body)
+
+
+def _canonical_name(filename: str) -> str:
+    """Map an on-disk filename onto its FLOWER_TIERS spelling, if close enough."""
+    keys = {_key(name): name for name in _CANONICAL_TIERS}
+    match = difflib.get_close_matches(_key(filename), keys, n=1, cutoff=FUZZY_CUTOFF)
+    return keys[match[0]] if match else filename
+
+
+def _load_asset(path: Path) -> FlowerAsset:
+    raw = path.read_bytes()
+    body = minify_svg(raw)
+    name = _canonical_name(path.name)
+    return FlowerAsset(
+        name=name,
+        tier=_CANONICAL_TIERS.get(name),
+        path=path,
+        size=len(raw),
+        digest=hashlib.sha256(body).hexdigest()[:32],
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        br_body=brotli.compress(body) if brotli else None,
+    )
+
+
+class FlowerCatalog:
+    """In-memory index of the flower SVGs, built once from the asset tree."""
+
+    def __init__(self, assets: list[FlowerAsset]):
+        self.assets = sorted(assets, key=lambda a: (a.tier or "", a.name))
+        self._by_key = {}
+        for asset in self.assets:
+            self._by_key[_key(asset.name)] = asset
+            self._by_key.setdefault(_key(asset.path.name), asset)
+
+    @classmethod
+    def scan(cls, roots=ASSETS_DIRS) -> "FlowerCatalog":
+        """Index the SVGs under every root; a flower found in an earlier
+        root hides the same flower in a later one."""
+        assets = {}
+        for root in roots:
+            for path in sorted(Path(root).rglob("*.svg")):
+                asset = _load_asset(path)
+                assets.setdefault(asset.name, asset)
+        return cls(list(assets.values()))
+
+    def get(self, name: str) -> FlowerAsset | None:
+        """Exact lookup by canonical or on-disk filename (case-insensitive)."""
+        return self._by_key.get(_key(name))
+
+    def resolve(self, name: str, tier: str | None = None) -> FlowerAsset | None:
+        """Correct a flower name from the agent against the index.
+
+        Tries an exact match first, then the closest name (restricted to
+        `tier` when given). Returns None if nothing is close enough.
+        """
+        asset = self.get(name)
+        if asset and asset.tier and (tier is None or asset.tier == tier):
+            return asset
+
+        candidates = {
+            key: a for key, a in self._by_key.items()
+            if a.tier and (tier is None or a.tier == tier)
+        }
+        match = difflib.get_close_matches(_key(name), candidates, n=1, cutoff=FUZZY_CUTOFF)
+        return candidates[match[0]] if match else None
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def load_catalog(roots=ASSETS_DIRS) -> FlowerCatalog:
+    global _catalog
+    with _catalog_lock:
+        _catalog = FlowerCatalog.scan(roots)
+    return _catalog
+
+
+def get_catalog() -> FlowerCatalog:
+    if _catalog is None:
+        return load_catalog()
+    return _catalog
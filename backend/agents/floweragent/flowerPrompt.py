@@ -1,28 +1,112 @@
-FLOWER_PROMPT = """
-Role: You are a Data-to-Garden Translator.
-You will receive task metadata JSON from the user message. Select exactly ONE flower filename and its tier.
+import json
 
-REWARD CATEGORIES (picture repository):
+# Flower filenames per reward tier. The prompt and the local rule engine both read this.
+FLOWER_TIERS = {
+    "EXCELLENT": [
+        "Accomplished Alstroemeria.svg",
+        "Clever Carnation.svg",
+        "Learning Lotus.svg",
+        "Organized Oleander.svg",
+        "Outstanding Orchid.svg",
+        "Polished Pansy.svg",
+        "Remarkable Rose.svg",
+    ],
+    "MEDIUM": [
+        "Admirable Anthurium.svg",
+        "Attentive Aster.svg",
+        "Brilliant Bougainvillea.svg",
+        "Heroic Hyacinth.svg",
+        "Knowledgeable Knapweed.svg",
+        "Mindful Mimosa.svg",
+        "Neat Nymphea.svg",
+        "Powerful Protea.svg",
+        "Prosperous Peony.svg",
+    ],
+    "SMALL": [
+        "Adept Astrantia.svg",
+        "Committed Clematis.svg",
+        "Dedicated Dianthus.svg",
+        "Diligent Daffodil.svg",
+        "Focused Freesia.svg",
+        "Grand Gerbera.svg",
+        "Grindset Gladiolus.svg",
+        "Grounded Ginger.svg",
+        "Growing Gardenia.svg",
+        "Hardworking Hydrangea.svg",
+        "Helpful Hypericum.svg",
+        "Persevering Poppy.svg",
+        "Prevailing Petunia.svg",
+        "Productive Poinsettia.svg",
+        "Smart Sisyrinchium.svg",
+        "Worthy Wallflower.svg",
+        "Zoned-in Zinnia.svg",
+    ],
+    "MICRO": [
+        "Active Anemone.svg",
+        "Ambitious Almond.svg",
+        "Dauntless Daisy.svg",
+        "Jaunty Jasmine.svg",
+        "Judicious Jonquil.svg",
+        "Marvelous Magnolia.svg",
+        "Persevering Pear.svg",
+        "Wise Wedelia.svg",
+    ],
+}
 
-1) EXCELLENT
-Conditions: priority_rank == 1 OR stress_level == "high" OR actual_time_spent_minutes > 120
-Options:
-["Accomplished Alstroemeria.svg", "Clever Carnation.svg", "Learning Lotus.svg", "Organized Oleander.svg", "Outstanding Orchid.svg", "Polished Pansy.svg", "Remarkable Rose.svg"]
+# Tier conditions, checked top-down: the first tier with a matching condition
+# wins, and MICRO is the fallback. The prompt renders them and the local rule
+# engine evaluates them, so both award modes apply the same rules. Each
+# condition is (field, op, value); "in" and "[]" are inclusive ranges, "[)"
+# excludes the upper bound.
+TIER_RULES = (
+    ("EXCELLENT", (
+        ("priority_rank", "==", 1),
+        ("stress_level", "==", "high"),
+        ("actual_time_spent_minutes", ">", 120),
+    )),
+    ("MEDIUM", (
+        ("priority_rank", "in", (2, 5)),
+        ("stress_level", "==", "medium"),
+        ("actual_time_spent_minutes", "[]", (45, 120)),
+    )),
+    ("SMALL", (
+        ("priority_rank", "in", (6, 10)),
+        ("stress_level", "==", "low"),
+        ("actual_time_spent_minutes", "[)", (15, 45)),
+    )),
+    ("MICRO", (
+        ("actual_time_spent_minutes", "<", 15),
+        ("category", "==", "House Chore"),
+    )),
+)
 
-2) MEDIUM
-Conditions: priority_rank in [2..5] OR stress_level == "medium" OR 45 <= actual_time_spent_minutes <= 120
-Options:
-["Admirable Anthurium.svg", "Attentive Aster.svg", "Brilliant Bougainvillea.svg", "Heroic Hyacinth.svg", "Knowledgeable Knapweed.svg", "Mindful Mimosa.svg", "Neat Nymphea.svg", "Powerful Protea.svg", "Prosperous Peony.svg"]
 
-3) SMALL
-Conditions: priority_rank in [6..10] OR stress_level == "low" OR 15 <= actual_time_spent_minutes < 45
-Options:
-["Adept Astrantia.svg", "Committed Clematis.svg", "Dedicated Dianthus.svg", "Diligent Daffodil.svg", "Focused Freesia.svg", "Grand Gerbera.svg", "Grindset Gladiolus.svg", "Grounded Ginger.svg", "Growing Gardenia.svg", "Hardworking Hydrangea.svg", "Helpful Hypericum.svg", "Persevering Poppy.svg", "Prevailing Petunia.svg", "Productive Poinsettia.svg", "Smart Sisyrinchium.svg", "Worthy Wallflower.svg", "Zoned-in Zinnia.svg"]
+def _condition_text(field: str, op: str, value) -> str:
+    if op == "in":
+        return f"{field} in [{value[0]}..{value[1]}]"
+    if op == "[]":
+        return f"{value[0]} <= {field} <= {value[1]}"
+    if op == "[)":
+        return f"{value[0]} <= {field} < {value[1]}"
+    return f"{field} {op} {json.dumps(value)}"
 
-4) MICRO
-Conditions: actual_time_spent_minutes < 15 OR category == "House Chore"
-Options:
-["Active Anemone.svg", "Ambitious Almond.svg", "Dauntless Daisy.svg", "Jaunty Jasmine.svg", "Judicious Jonquil.svg", "Marvelous Magnolia.svg", "Persevering Pear.svg", "Wise Wedelia.svg"]
+
+def _tier_blocks() -> str:
+    return "\n\n".join(
+        f"{number}) {tier}\n"
+        f"Conditions: {' OR '.join(_condition_text(*c) for c in conditions)}\n"
+        f"Options:\n{json.dumps(FLOWER_TIERS[tier])}"
+        for number, (tier, conditions) in enumerate(TIER_RULES, 1)
+    )
+
+
+FLOWER_PROMPT = f"""
+Role: You are a Data-to-Garden Translator.
+You will receive task metadata JSON from the user message. Select exactly ONE flower filename and its tier.
+
+REWARD CATEGORIES (picture repository):
+
+{_tier_blocks()}
 
 Selection rules:
 1. Choose exactly one tier and one filename from that tier.
@@ -32,10 +116,17 @@ Selection rules:
 5. Never invent filenames; pick only from the lists above.
 
 Output format (strict JSON object only):
-{
+{{
   "selected_flower": "Exact Filename.svg",
   "tier": "EXCELLENT | MEDIUM | SMALL | MICRO",
   "congrats_message": "One short sentence."
-}
+}}
 No markdown. No extra keys. No explanation outside JSON.
 """
+
+CONGRATS_PROMPT = """
+Role: You write the congratulations line for a flower reward.
+You will receive task metadata JSON from the user message, including the already chosen selected_flower and tier.
+Write exactly ONE short, warm sentence congratulating the user on the task. You may mention the flower by name (without ".svg").
+Output the sentence only. No JSON. No markdown. No quotes.
+"""
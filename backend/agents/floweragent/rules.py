@@ -0,0 +1,101 @@
+import random
+
+from .flowerPrompt import FLOWER_TIERS, TIER_RULES
+
+# Tiers are checked top-down, in the order FLOWER_PROMPT lists them (see
+# TIER_RULES); the first tier whose conditions match wins. MICRO is also the
+# fallback.
+TIER_ORDER = tuple(tier for tier, _ in TIER_RULES)
+
+PAUSED_PREFIXES = ("Persevering", "Grounded", "Hardworking")
+FAST_PREFIXES = ("Smart", "Brilliant", "Adept")
+WORK_FLOWERS = ("Grindset Gladiolus.svg", "Organized Oleander.svg")
+
+MESSAGE_TEMPLATES = {
+    "EXCELLENT": [
+        "Incredible work finishing {task} - this {flower} is all yours!",
+        "You conquered {task}; your {flower} marks a truly big win.",
+    ],
+    "MEDIUM": [
+        "Great job on {task} - enjoy your {flower}!",
+        "{task} is done, and your {flower} has bloomed.",
+    ],
+    "SMALL": [
+        "Nice work wrapping up {task}; here's your {flower}.",
+        "One more done! {task} earned you this {flower}.",
+    ],
+    "MICRO": [
+        "Quick win on {task} - enjoy this {flower}!",
+        "Every little task counts; {task} earned you this {flower}.",
+    ],
+}
+
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _matches(task: dict, field: str, op: str, expected) -> bool:
+    if isinstance(expected, str):
+        return str(task.get(field) or "").strip().lower() == expected.lower()
+    value = _number(task.get(field))
+    if value is None:
+        return False
+    if op == "==":
+        return value == expected
+    if op == ">":
+        return value > expected
+    if op == "<":
+        return value < expected
+    low, high = expected
+    return low <= value < high if op == "[)" else low <= value <= high
+
+
+def pick_tier(task: dict) -> str:
+    for tier, conditions in TIER_RULES:
+        if any(_matches(task, *condition) for condition in conditions):
+            return tier
+    return "MICRO"
+
+
+def preferred_flowers(task: dict, options: list[str]) -> list[str]:
+    """Options favoured by the selection rules, or all options if none apply."""
+    minutes = _number(task.get("actual_time_spent_minutes"))
+    estimated = _number(task.get("estimated_time"))
+    paused = _number(task.get("paused_count")) or 0
+
+    prefixes = []
+    if paused > 2:
+        prefixes.extend(PAUSED_PREFIXES)
+    if minutes is not None and estimated and minutes <= 0.8 * estimated:
+        prefixes.extend(FAST_PREFIXES)
+
+    preferred = [f for f in options if f.split(" ", 1)[0] in prefixes]
+    if task.get("category") == "Work Related":
+        preferred.extend(f for f in options if f in WORK_FLOWERS and f not in preferred)
+    return preferred or list(options)
+
+
+def template_message(task: dict, flower: str, tier: str, rng: random.Random) -> str:
+    template = rng.choice(MESSAGE_TEMPLATES[tier])
+    task_name = str(task.get("task_name") or "your task").strip()
+    return template.format(task=task_name, flower=flower.removesuffix(".svg"))
+
+
+def award_flower(task: dict, seed=None) -> dict:
+    """Pick a flower for a completed task without calling the LLM.
+
+    The same task and seed always produce the same award. Returns the same
+    shape as floweragent.schemas.parse_award: selected_flower, tier, congrats_message.
+    """
+    rng = random.Random(seed if seed is not None else task.get("task_id"))
+    tier = pick_tier(task)
+    flower = rng.choice(preferred_flowers(task, FLOWER_TIERS[tier]))
+    return {
+        "selected_flower": flower,
+        "tier": tier,
+        "congrats_message": template_message(task, flower, tier, rng),
+    }
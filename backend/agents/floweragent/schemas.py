@@ -0,0 +1,34 @@
+from typing import Literal
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+Tier = Literal["EXCELLENT", "MEDIUM", "SMALL", "MICRO"]
+
+
+class FlowerAward(BaseModel):
+    """The flower agent's reply; also its response schema."""
+
+    selected_flower: str
+    tier: Tier
+    congrats_message: str
+
+    @field_validator("tier", mode="before")
+    @classmethod
+    def _upper(cls, value):
+        return value.strip().upper() if isinstance(value, str) else value
+
+    @field_validator("selected_flower", "congrats_message")
+    @classmethod
+    def _not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("must not be empty")
+        return value
+
+
+def parse_award(reply: str) -> dict | None:
+    """Validate a JSON award reply; None if it does not match FlowerAward."""
+    try:
+        return FlowerAward.model_validate_json((reply or "").strip()).model_dump()
+    except ValidationError:
+        return None
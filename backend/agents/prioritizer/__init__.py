@@ -1 +1,8 @@
-from . import agent
+import importlib
+
+
+def __getattr__(name):
+    # agent imports google.adk; load it only when asked for (as adk web does)
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
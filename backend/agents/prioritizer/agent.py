@@ -1,8 +1,18 @@
+import threading
+from collections import OrderedDict
+
 from google.adk.agents.llm_agent import Agent
-from .prompt_priority import PRIORITIZER_PROMPT
-from .predicttime import load_or_create
+from metrics import span
+from .prompt_priority import PRIORITIZER_PROMPT, dynamic_instruction
+from .predicttime import feature_matrix
+from .model_updates import get_model
 
-_time_model = load_or_create()
+# predictions keyed by (model version, normalized features); every model and
+# every update gets a new version, so stale entries just stop being hit and
+# age out
+PREDICTION_CACHE_SIZE = 4096
+_prediction_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
 
 VALID_CATEGORIES = {"Personal Errands", "Health and Fitness", "Social", "Learning", "House Chore", "School Work", "Work Related", "Other"}
 
@@ -33,9 +43,6 @@ def predict_task_time(
         dict with predicted_minutes and confidence_score.
         If predicted_minutes is None, ask the user for their estimate.
     """
-    if category not in VALID_CATEGORIES:
-        category = "Other"
-
     features = {
         "category": category,
         "hour_of_day": hour_of_day,
@@ -44,13 +51,84 @@ def predict_task_time(
         "is_vague": is_vague,
         "has_dependencies": has_dependencies,
     }
-    return _time_model.predict(features)
+    return _predict_all([features])[0]
+
+
+def predict_task_times(tasks: list[dict]) -> dict:
+    """
+    Predict estimated minutes for several tasks in one call.
+
+    Call this once with every task whose estimated_time is missing, instead
+    of calling predict_task_time per task.
+
+    Args:
+        tasks: One object per task, each with the same fields as
+               predict_task_time: category, hour_of_day, day_of_week,
+               estimated_subtasks, is_vague, has_dependencies. An optional
+               task_name is echoed back to match results to tasks.
+
+    Returns:
+        dict with predictions: a list in the same order as tasks, each with
+        task_name, predicted_minutes and confidence. If predicted_minutes is
+        None for a task, ask the user for their estimate.
+    """
+    tasks = [t if isinstance(t, dict) else {} for t in tasks or []]
+    results = _predict_all(tasks)
+    return {
+        "predictions": [
+            {"task_name": task.get("task_name"), **result}
+            for task, result in zip(tasks, results)
+        ]
+    }
+
+
+def _predict_all(tasks: list[dict]) -> list[dict]:
+    with span("tool.predict_task_time"):
+        return _predict_cached(tasks)
+
+
+def _predict_cached(tasks: list[dict]) -> list[dict]:
+    tasks = [
+        dict(task, category=task.get("category") if task.get("category") in VALID_CATEGORIES else "Other")
+        for task in tasks
+    ]
+    if not tasks:
+        return []
+    X = feature_matrix(tasks)
+    keys = [tuple(row) for row in X.tolist()]
+    # the learner publishes a new model instead of changing this one, so
+    # scoring needs no lock and never waits for learning
+    model = get_model()
+    version = model.version
+    found = {}
+    with _cache_lock:
+        for key in keys:
+            result = _prediction_cache.get((version, key))
+            if result is not None:
+                _prediction_cache.move_to_end((version, key))
+                found[key] = result
+    missing = {}
+    for i, key in enumerate(keys):
+        if key not in found:
+            missing.setdefault(key, i)
+    if missing:
+        predicted = model.predict_matrix(X[list(missing.values())])
+        found.update(zip(missing, predicted))
+        with _cache_lock:
+            for key, result in zip(missing, predicted):
+                _prediction_cache[(version, key)] = result
+            while len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+                _prediction_cache.popitem(last=False)
+    return [dict(found[key]) for key in keys]
 
 
 root_agent = Agent(
     model='gemini-2.5-flash',
     name='root_agent',
     description='A helpful assistant for making a list of tasks from a brain dump.',
-    instruction=PRIORITIZER_PROMPT,
-    tools=[predict_task_time]
+    # the long prompt is a fixed prefix the model can cache; the current
+    # date and hour are filled in per turn
+    static_instruction=PRIORITIZER_PROMPT,
+    instruction=dynamic_instruction,
+    tools=[predict_task_times, predict_task_time]
 )
@@ -0,0 +1,353 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process learns for itself
+    fcntl = None
+
+from .predicttime import MODEL_DIR, SNAPSHOT_PATH, OnlineTimeModel, SnapshotError, load_or_create, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# checkpoint after this many applied updates, or this many seconds after the
+# first unsaved update, whichever comes first
+CHECKPOINT_EVERY = int(os.getenv("MODEL_CHECKPOINT_EVERY", "20"))
+CHECKPOINT_SECONDS = float(os.getenv("MODEL_CHECKPOINT_SECONDS", "30"))
+MAX_PENDING_UPDATES = 10_000
+# how often workers look for other workers' samples (learner) or for a newer
+# snapshot to load (everyone else)
+RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "5"))
+SPOOL_PATH = MODEL_DIR / "time_model_updates.sqlite"
+LOCK_PATH = MODEL_DIR / "time_model.lock"
+SPOOL_READ_SIZE = 1000
+
+# guards loading and swapping the shared model. A published model is never
+# changed: the learner trains a copy and swaps it in, so predictions take
+# the current model and score it without any lock.
+model_lock = threading.Lock()
+_model = None
+
+
+def get_model():
+    """The shared time model, loaded from its snapshot on first use."""
+    global _model
+    if _model is None:
+        with model_lock:
+            if _model is None:
+                _model = load_or_create()
+    return _model
+
+
+def _replace_model(model):
+    global _model
+    with model_lock:
+        _model = model
+
+
+class UpdateSpool:
+    """Learning samples from every worker process, queued in one SQLite file.
+
+    Only the updater thread touches it, so one connection is enough.
+    """
+
+    def __init__(self, path=SPOOL_PATH):
+        self._path = path
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS updates (id INTEGER PRIMARY KEY AUTOINCREMENT, features TEXT NOT NULL, y REAL NOT NULL, batch TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(updates)")}
+            if "batch" not in columns:
+                # spools written before batches were kept together
+                self._conn.execute("ALTER TABLE updates ADD COLUMN batch TEXT")
+        return self._conn
+
+    def append(self, batches):
+        """Spool lists of (features, y) samples; each list stays one learning batch."""
+        rows = []
+        for samples in batches:
+            batch_id = uuid.uuid4().hex
+            rows += [(json.dumps(features, default=str), float(y), batch_id) for features, y in samples]
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO updates (features, y, batch) VALUES (?, ?, ?)", rows)
+
+    def read(self, after_id: int, limit: int = SPOOL_READ_SIZE) -> list[tuple[int, str, dict, float]]:
+        """(id, batch, features, y) rows in spool order; a row spooled without a
+        batch is a batch of its own."""
+        rows = self._connect().execute(
+            "SELECT id, batch, features, y FROM updates WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+        return [(row_id, batch or f"row-{row_id}", json.loads(features), y) for row_id, batch, features, y in rows]
+
+    def delete_through(self, row_id: int):
+        self._connect().execute("DELETE FROM updates WHERE id <= ?", (row_id,))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class LearnerLock:
+    """Non-blocking flock on a file; its holder is the one learner process."""
+
+    def __init__(self, path=LOCK_PATH):
+        self._path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self._path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
+
+
+class ModelUpdater:
+    """Applies completion feedback to the time model off the request path.
+
+    Requests call submit(), which only enqueues. A background thread per
+    process moves queued samples to the shared UpdateSpool. The process that
+    holds the LearnerLock learns from the spool in order and writes coalesced,
+    atomic checkpoints, so every worker's samples reach one model and no
+    worker overwrites another's training. The other processes hot-reload the
+    snapshot when it changes, swapping the model in without blocking
+    predictions. If the learner exits, the next process to try the lock
+    takes over. stop() hands off pending samples and, in the learner, writes
+    a final checkpoint.
+
+    A learner that dies between a checkpoint and clearing the spool may
+    learn the last few samples twice; samples are never lost.
+    """
+
+    def __init__(
+        self,
+        get_model,
+        path=SNAPSHOT_PATH,
+        checkpoint_every=CHECKPOINT_EVERY,
+        checkpoint_seconds=CHECKPOINT_SECONDS,
+        spool=None,
+        learner_lock=None,
+        reload_seconds=RELOAD_SECONDS,
+    ):
+        self._get_model = get_model
+        self._path = path
+        self._checkpoint_every = checkpoint_every
+        self._checkpoint_seconds = checkpoint_seconds
+        self._spool = spool or UpdateSpool()
+        self._learner_lock = learner_lock or LearnerLock()
+        self._reload_seconds = reload_seconds
+        self._queue = queue.Queue(maxsize=MAX_PENDING_UPDATES)
+        self._thread = None
+        self._unsaved = 0
+        self._first_unsaved_at = None
+        self._applied_id = 0
+        self._snapshot_seen = None
+
+    @property
+    def is_learner(self) -> bool:
+        return self._learner_lock.held
+
+    def submit(self, features: dict, y: float) -> bool:
+        """Queue one learning sample. Returns False if the queue is full.
+
+        A dropped sample is not lost for good: it is still recorded in
+        model_training_events.
+        """
+        return self.submit_many([(features, y)])
+
+    def submit_many(self, samples: list[tuple[dict, float]]) -> bool:
+        """Queue (features, y) samples as one item: they are spooled in one
+        write and learned as one mini-batch update (learn_many). Returns
+        False if the queue is full."""
+        if not samples:
+            return True
+        try:
+            self._queue.put_nowait(list(samples))
+        except queue.Full:
+            logger.warning("time model update queue is full, dropping %d sample(s)", len(samples))
+            return False
+        return True
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._snapshot_seen = self._snapshot_stamp()
+            self._thread = threading.Thread(target=self._run, name="time-model-updater", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self._poll_timeout())
+            except queue.Empty:
+                first = ()
+            items = [first]
+            while len(items) < SPOOL_READ_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in items
+            batches = [item for item in items if item]
+            try:
+                self._tick(batches, stopping)
+            except Exception:
+                logger.exception("time model updater tick failed")
+            if stopping:
+                self._learner_lock.release()
+                self._spool.close()
+                return
+
+    def _tick(self, batches, stopping: bool):
+        if batches:
+            self._spool.append(batches)
+        if not self.is_learner and self._learner_lock.try_acquire():
+            # whatever the previous learner checkpointed is our starting point
+            self._reload(force=True)
+            self._applied_id = 0
+        if self.is_learner:
+            self._learn_from_spool(drain=stopping)
+            if stopping or self._checkpoint_due():
+                self._checkpoint()
+        else:
+            self._reload()
+
+    def _learn_from_spool(self, drain: bool):
+        model = self._get_model()
+        limit = SPOOL_READ_SIZE
+        while True:
+            rows = self._spool.read(self._applied_id, limit)
+            short = len(rows) < limit
+            if not short:
+                # the last batch may go on past a full read; leave it for the
+                # next one, which starts at its first row
+                rows = _without_last_batch(rows)
+                if not rows:
+                    # a single batch larger than the read: read further
+                    limit *= 2
+                    continue
+                limit = SPOOL_READ_SIZE
+            if rows:
+                # train a copy and publish it; predictions keep scoring the
+                # old model meanwhile. Each submitted batch is one update.
+                model = model.copy()
+                for _, batch in itertools.groupby(rows, key=lambda row: row[1]):
+                    batch = list(batch)
+                    if len(batch) == 1:
+                        model.learn(batch[0][2], batch[0][3])
+                    else:
+                        model.learn_many([row[2] for row in batch], [row[3] for row in batch])
+                _replace_model(model)
+                self._applied_id = rows[-1][0]
+                self._unsaved += len(rows)
+                if self._first_unsaved_at is None:
+                    self._first_unsaved_at = time.monotonic()
+            if short:
+                return
+            if not drain and self._checkpoint_due():
+                self._checkpoint()
+
+    def _snapshot_stamp(self):
+        try:
+            st = self._path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload(self, force: bool = False):
+        stamp = self._snapshot_stamp()
+        if stamp is None or (stamp == self._snapshot_seen and not force):
+            return
+        try:
+            # build the new model first; predictions keep using the old one
+            model = OnlineTimeModel.from_params(read_snapshot(self._path))
+        except (OSError, SnapshotError, KeyError, ValueError):
+            logger.exception("could not reload %s, keeping the current model", self._path)
+            return
+        _replace_model(model)
+        self._snapshot_seen = stamp
+
+    def _poll_timeout(self) -> float:
+        if self._first_unsaved_at is None:
+            return self._reload_seconds
+        deadline = max(0.0, self._first_unsaved_at + self._checkpoint_seconds - time.monotonic())
+        return min(deadline, self._reload_seconds)
+
+    def _checkpoint_due(self) -> bool:
+        if not self._unsaved:
+            return False
+        if self._unsaved >= self._checkpoint_every:
+            return True
+        return time.monotonic() - self._first_unsaved_at >= self._checkpoint_seconds
+
+    def _checkpoint(self):
+        if not self._unsaved:
+            return
+        params = self._get_model().to_params()
+        try:
+            write_snapshot(params, self._path)
+        except OSError:
+            # keep the updates counted as unsaved so the next poll retries
+            logger.exception("failed to write time model checkpoint")
+            self._first_unsaved_at = time.monotonic()
+            return
+        self._snapshot_seen = self._snapshot_stamp()
+        self._spool.delete_through(self._applied_id)
+        self._unsaved = 0
+        self._first_unsaved_at = None
+
+
+def _without_last_batch(rows):
+    """rows minus the trailing run of rows from the same batch."""
+    last = rows[-1][1]
+    end = len(rows)
+    while end and rows[end - 1][1] == last:
+        end -= 1
+    return rows[:end]
+
+
+model_updater = ModelUpdater(get_model)
@@ -1,12 +1,37 @@
-from river import compose, preprocessing, linear_model, optim, metrics
+import hashlib
+import io
+import itertools
+import json
 import pickle
+import logging
 import math
+import os
+import tempfile
 from pathlib import Path
 
-MODEL_PATH = Path("backend/agents/prioritizer/time_model.pkl")
+import numpy as np
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# time_model.json holds the metadata and points at a checksummed .npy file
+# with the arrays; both live next to this module unless TIME_MODEL_DIR is set
+MODEL_DIR = Path(os.getenv("TIME_MODEL_DIR", Path(__file__).resolve().parent))
+SNAPSHOT_PATH = MODEL_DIR / "time_model.json"
+SNAPSHOT_SCHEMA_VERSION = 1
+ARRAY_ROWS = ("counts", "means", "vars", "weights")
+# pickles written by earlier versions, migrated on first load
+LEGACY_MODEL_PATHS = (MODEL_DIR / "time_model.pkl", Path("backend/agents/prioritizer/time_model.pkl"))
 MIN_TRAINING_SAMPLES = 30
 CONFIDENCE_THRESHOLD = 0.7
 MIN_PREDICTED_MINUTES = 5.0
+# SGD step for the weights and the intercept, and the gradient clip, as in
+# the river pipeline the snapshots were first trained with
+LEARNING_RATE = 0.01
+GRADIENT_CLIP = 1e12
+# an untrained model scores every task as this many minutes
+UNTRAINED_GUESS = 45.0
 CATEGORY_TO_ID = {
     "Personal Errands": 0.0,
     "Health and Fitness": 1.0,
@@ -17,28 +42,66 @@ CATEGORY_TO_ID = {
     "Work Related": 6.0,
     "Other": 7.0,
 }
+FEATURE_NAMES = (
+    "category_id",
+    "hour_of_day",
+    "day_of_week",
+    "estimated_subtasks",
+    "is_vague",
+    "has_dependencies",
+)
+# model versions, unique and increasing for the life of the process
+_versions = itertools.count(1)
 
 class OnlineTimeModel:
-    def __init__(self):
-        self.model = compose.Pipeline(
-            preprocessing.StandardScaler(),
-            linear_model.LinearRegression(optimizer=optim.SGD(0.01))
-        )
-        self.mae = metrics.MAE()   # running error for confidence
-        self.n = 0
+    """Running standardization of the features, then linear regression trained by SGD.
+
+    The state is a few NumPy arrays in FEATURE_NAMES order. learn() makes
+    exactly the updates of the river pipeline this model used to wrap
+    (StandardScaler | LinearRegression(optimizer=SGD(0.01))), so snapshots
+    from either load into the other, but scoring and loading need neither
+    river nor pandas.
+    """
+
+    def __init__(self, counts=None, means=None, vars=None, weights=None, intercept=0.0, mae_n=0.0, mae=0.0, n=0):
+        self.counts = _vector(counts)
+        self.means = _vector(means)
+        self.vars = _vector(vars)
+        self.weights = _vector(weights)
+        self.intercept = float(intercept)
+        # running mean absolute error, for confidence
+        self.mae_n = float(mae_n)
+        self.mae = float(mae)
+        self.n = int(n)
+        # changes whenever learning could change a prediction; a copy or a
+        # reloaded model gets a version of its own
+        self.version = next(_versions)
 
     # x is the dict with task features, y is the actual time taken in minutes
+    @timed("model.predict")
     def predict(self, x: dict) -> dict:
-        x = _normalize_features(x)
-        try:
-            y_hat = self.model.predict_one(x)
-        except Exception:
-            return {
-                "predicted_minutes": None,
-                "confidence": 0.0,
-                "reason": "no_estimate",
-            }
+        return self._result(self._raw_predict(_feature_row(x)))
+
+    @timed("model.predict_many")
+    def predict_many(self, xs: list[dict]) -> list[dict]:
+        """predict() for a batch, normalized and scored with NumPy column operations."""
+        if not xs:
+            return []
+        return self.predict_matrix(feature_matrix(xs))
+
+    def predict_matrix(self, X: np.ndarray) -> list[dict]:
+        """predict() for rows that are already feature_matrix() output."""
+        return [self._result(y_hat) for y_hat in self._scale(X) @ self.weights + self.intercept]
 
+    def _scale(self, X):
+        # a feature without variance yet scales to 0, as in river
+        std = np.sqrt(self.vars)
+        return np.divide(X - self.means, std, out=np.zeros_like(X, dtype=np.float64), where=std > 0)
+
+    def _raw_predict(self, row) -> float:
+        return float(self._scale(np.asarray(row, dtype=np.float64)) @ self.weights + self.intercept)
+
+    def _result(self, y_hat) -> dict:
         # If we do not have a usable prediction, return no estimate so the agent asks the user.
         if y_hat is None or not math.isfinite(y_hat):
             return {
@@ -49,7 +112,7 @@ class OnlineTimeModel:
         y_hat = max(float(y_hat), MIN_PREDICTED_MINUTES)
 
         # confidence is based on the running MAE error, scaled to the predicted value (with a floor to avoid overconfidence on very low predictions)
-        err = self.mae.get() if self.n > 20 else 20.0
+        err = self.mae if self.n > 20 else 20.0
         # confidence is 1.0 if err is 0, and approaches 0.0 as err approaches or exceeds y_hat (with a floor to avoid overconfidence on very low predictions)
         confidence = max(0.0, min(1.0, 1.0 - (err / max(y_hat, 15.0))))
 
@@ -76,24 +139,123 @@ class OnlineTimeModel:
             "reason": "model_prediction",
         }
 
+    @timed("model.learn")
     def learn(self, x: dict, y: float):
         if y is None or not math.isfinite(y) or y <= 0:
             return
-        x = _normalize_features(x)
+        row = np.asarray(_feature_row(x), dtype=np.float64)
         y = max(float(y), MIN_PREDICTED_MINUTES)
-        try:
-            y_hat = self.model.predict_one(x) or 45.0
-        except Exception:
-            y_hat = 45.0
+
+        # score before learning, for the running error
+        y_hat = self._raw_predict(row) or UNTRAINED_GUESS
         if not math.isfinite(y_hat):
-            y_hat = 45.0
-        y_hat = max(float(y_hat), MIN_PREDICTED_MINUTES)
-        self.mae.update(y, y_hat)
-        try:
-            self.model.learn_one(x, y)
-        except Exception:
+            y_hat = UNTRAINED_GUESS
+        y_hat = max(y_hat, MIN_PREDICTED_MINUTES)
+        self.mae_n += 1
+        self.mae += (abs(y - y_hat) - self.mae) / self.mae_n
+
+        # scaler: running mean and population variance per feature
+        self.counts += 1
+        delta = row - self.means
+        self.means += delta / self.counts
+        self.vars += (delta * (row - self.means) - self.vars) / self.counts
+
+        # one SGD step on the squared loss, on the freshly scaled row
+        z = self._scale(row)
+        loss_gradient = float(np.clip(2.0 * (z @ self.weights + self.intercept - y), -GRADIENT_CLIP, GRADIENT_CLIP))
+        self.intercept -= LEARNING_RATE * loss_gradient
+        self.weights -= LEARNING_RATE * loss_gradient * z
+        self.n += 1
+        self.version = next(_versions)
+
+    @timed("model.learn_many")
+    def learn_many(self, xs: list[dict], ys: list[float]):
+        """learn() for a mini-batch, as one update.
+
+        Every row is scored before any is learned; the batch is merged into
+        the scaler statistics at once (Chan et al.) and the regression takes
+        one SGD step on the averaged gradient, which counts as one update
+        towards MIN_TRAINING_SAMPLES. A batch of one makes the same update as
+        learn().
+        """
+        keep = [i for i, y in enumerate(ys) if y is not None and math.isfinite(y) and y > 0]
+        if keep:
+            self.learn_matrix(feature_matrix([xs[i] for i in keep]), [ys[i] for i in keep])
+
+    def learn_matrix(self, X: np.ndarray, ys):
+        """learn_many() for rows that are already feature_matrix() output and
+        targets that are all usable (finite and positive)."""
+        y = np.maximum(np.asarray(ys, dtype=np.float64), MIN_PREDICTED_MINUTES)
+        n = len(y)
+        if not n:
             return
+
+        # score before learning, for the running error
+        y_hat = self._scale(X) @ self.weights + self.intercept
+        y_hat = np.maximum(np.where(np.isfinite(y_hat) & (y_hat != 0), y_hat, UNTRAINED_GUESS), MIN_PREDICTED_MINUTES)
+        self.mae_n += n
+        self.mae += (float(np.abs(y - y_hat).sum()) - n * self.mae) / self.mae_n
+
+        # scaler: merge the batch mean and population variance per feature
+        total = self.counts + n
+        delta = X.mean(axis=0) - self.means
+        m2 = self.vars * self.counts + X.var(axis=0) * n + delta ** 2 * self.counts * n / total
+        self.means += delta * n / total
+        self.vars = m2 / total
+        self.counts = total
+
+        # one SGD step on the squared loss, averaged over the freshly scaled rows
+        Z = self._scale(X)
+        loss_gradients = np.clip(2.0 * (Z @ self.weights + self.intercept - y), -GRADIENT_CLIP, GRADIENT_CLIP)
+        self.intercept -= LEARNING_RATE * float(loss_gradients.mean())
+        self.weights -= LEARNING_RATE * (Z.T @ loss_gradients) / n
+        # n counts updates, not samples: one averaged step is no more
+        # training than learn() makes, whatever the batch size
         self.n += 1
+        self.version = next(_versions)
+
+    def copy(self) -> "OnlineTimeModel":
+        return OnlineTimeModel(self.counts, self.means, self.vars, self.weights, self.intercept, self.mae_n, self.mae, self.n)
+
+    def to_params(self) -> dict:
+        """Learned state as plain numbers, in FEATURE_NAMES order."""
+        return {
+            "feature_names": list(FEATURE_NAMES),
+            "counts": self.counts.tolist(),
+            "means": self.means.tolist(),
+            "vars": self.vars.tolist(),
+            "weights": self.weights.tolist(),
+            "intercept": self.intercept,
+            "mae_n": self.mae_n,
+            "mae": self.mae,
+            "n": self.n,
+        }
+
+    @classmethod
+    def from_params(cls, params: dict) -> "OnlineTimeModel":
+        """Rebuild a model from to_params() output, e.g. one trained offline."""
+        if list(params["feature_names"]) != list(FEATURE_NAMES):
+            raise ValueError("model parameters were trained on different features")
+        return cls(
+            params["counts"],
+            params["means"],
+            params["vars"],
+            params["weights"],
+            params["intercept"],
+            params["mae_n"],
+            params["mae"],
+            params["n"],
+        )
+
+
+def _vector(values) -> np.ndarray:
+    """A private float64 copy of one row of model state, zeros if missing."""
+    if values is None:
+        return np.zeros(len(FEATURE_NAMES))
+    vector = np.array(values, dtype=np.float64)
+    if vector.shape != (len(FEATURE_NAMES),):
+        raise ValueError("model parameters have the wrong shape")
+    return vector
 
 
 def _to_int(value, default: int) -> int:
@@ -131,13 +293,177 @@ def _normalize_features(x: dict) -> dict:
         "has_dependencies": has_dependencies,
     }
 
+def _number_column(xs: list[dict], name: str, default: int) -> np.ndarray:
+    """One whole-number feature of every row, as _to_int() reads it."""
+    values = [x.get(name, default) for x in xs]
+    if all(type(v) in (int, float, bool) for v in values):
+        # the usual case (tool arguments are typed): one array conversion
+        column = np.array(values, dtype=np.float64)
+        return np.where(np.isfinite(column), np.trunc(column), default)
+    return np.array([_to_int(v, default) for v in values], dtype=np.float64)
+
+
+def _flag_column(xs: list[dict], name: str) -> np.ndarray:
+    """One yes/no feature of every row, as _to_bool() reads it."""
+    values = [x.get(name) for x in xs]
+    if all(type(v) in (int, float, bool) for v in values):
+        return (np.array(values, dtype=np.float64) != 0).astype(np.float64)
+    return np.array([1.0 if _to_bool(v) else 0.0 for v in values])
+
+
+def feature_matrix(xs: list[dict]) -> np.ndarray:
+    """_normalize_features() of many rows at once: an (n, len(FEATURE_NAMES)) array
+    built one column at a time, with the clamping done on whole columns."""
+    xs = [x if isinstance(x, dict) else {} for x in xs]
+    other = CATEGORY_TO_ID["Other"]
+    return np.column_stack([
+        np.array([CATEGORY_TO_ID.get(str(x.get("category", "Other")).strip(), other) for x in xs], dtype=np.float64),
+        np.clip(_number_column(xs, "hour_of_day", 12), 0, 23),
+        np.clip(_number_column(xs, "day_of_week", 0), 0, 6),
+        np.maximum(_number_column(xs, "estimated_subtasks", 1), 1),
+        _flag_column(xs, "is_vague"),
+        _flag_column(xs, "has_dependencies"),
+    ]).reshape(len(xs), len(FEATURE_NAMES))
+
+
+def _feature_row(x: dict) -> list[float]:
+    normalized = _normalize_features(x)
+    return [normalized[name] for name in FEATURE_NAMES]
+
+class SnapshotError(Exception):
+    """The snapshot is missing, corrupt, or from an unknown schema."""
+
+
+@timed("model.save")
+def write_snapshot(params: dict, path: Path = SNAPSHOT_PATH):
+    """Persist to_params() output as JSON metadata plus a .npy array file.
+
+    The array file is named after its checksum and written first, so the
+    metadata swap is the single atomic commit point. The previous array file
+    is kept for readers that still hold the old metadata; older ones go.
+    """
+    arrays = np.array([params[name] for name in ARRAY_ROWS], dtype=np.float64)
+    buf = io.BytesIO()
+    np.save(buf, arrays, allow_pickle=False)
+    data = buf.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    arrays_name = f"{path.stem}.{digest[:16]}.npy"
+
+    previous = None
+    try:
+        previous = json.loads(path.read_text())["arrays"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    write_atomic(path.parent / arrays_name, data)
+    meta = {
+        "schema_version": SNAPSHOT_SCHEMA_VERSION,
+        "feature_names": list(params["feature_names"]),
+        "intercept": float(params["intercept"]),
+        "mae_n": float(params["mae_n"]),
+        "mae": float(params["mae"]),
+        "n": int(params["n"]),
+        "arrays": arrays_name,
+        "arrays_sha256": digest,
+    }
+    write_atomic(path, json.dumps(meta, indent=2).encode())
+
+    for stale in path.parent.glob(f"{path.stem}.*.npy"):
+        if stale.name not in (arrays_name, previous):
+            stale.unlink(missing_ok=True)
+
+def read_snapshot(path: Path = SNAPSHOT_PATH) -> dict:
+    """Load a snapshot as from_params() input.
+
+    The array file is a few hundred bytes, so it is read once, and the
+    checksum and the arrays both come from that one buffer.
+    """
+    try:
+        meta = json.loads(path.read_text())
+    except FileNotFoundError:
+        raise
+    except (OSError, ValueError) as exc:
+        raise SnapshotError(f"unreadable snapshot {path}") from exc
+    if not isinstance(meta, dict) or meta.get("schema_version") != SNAPSHOT_SCHEMA_VERSION:
+        raise SnapshotError(f"unsupported snapshot schema in {path}")
+
+    arrays_path = path.parent / str(meta.get("arrays"))
+    try:
+        data = arrays_path.read_bytes()
+        if hashlib.sha256(data).hexdigest() != meta.get("arrays_sha256"):
+            raise SnapshotError(f"checksum mismatch for {arrays_path}")
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+    except (OSError, ValueError) as exc:
+        raise SnapshotError(f"unreadable snapshot arrays {arrays_path}") from exc
+    if arrays.shape != (len(ARRAY_ROWS), len(meta.get("feature_names") or ())):
+        raise SnapshotError(f"snapshot arrays in {arrays_path} have the wrong shape")
+
+    params = {key: meta[key] for key in ("feature_names", "intercept", "mae_n", "mae", "n")}
+    params.update(zip(ARRAY_ROWS, arrays))
+    return params
+
 def load_or_create():
-    if MODEL_PATH.exists():
-        with open(MODEL_PATH, "rb") as f:
-            return pickle.load(f)
+    try:
+        return OnlineTimeModel.from_params(read_snapshot(SNAPSHOT_PATH))
+    except FileNotFoundError:
+        pass
+    except (SnapshotError, KeyError, ValueError):
+        # an unreadable snapshot should not take the API down; rebuild it
+        # with python -m agents.prioritizer.retrain
+        logger.exception("could not load %s, starting from an untrained model", SNAPSHOT_PATH)
+        return OnlineTimeModel()
+
+    for legacy_path in LEGACY_MODEL_PATHS:
+        if legacy_path.exists():
+            return _migrate_pickle(legacy_path)
     return OnlineTimeModel()
 
+def _pickled_params(m) -> dict:
+    """to_params() of a model pickled by an earlier version, which wrapped a river pipeline."""
+    scaler, regressor = m.model.steps.values()
+    return {
+        "feature_names": list(FEATURE_NAMES),
+        "counts": [float(scaler.counts.get(f, 0)) for f in FEATURE_NAMES],
+        "means": [float(scaler.means.get(f, 0.0)) for f in FEATURE_NAMES],
+        "vars": [float(scaler.vars.get(f, 0.0)) for f in FEATURE_NAMES],
+        "weights": [float(regressor._weights.get(f, 0.0)) for f in FEATURE_NAMES],
+        "intercept": float(regressor.intercept),
+        "mae_n": float(m.mae._mean.n),
+        "mae": float(m.mae._mean.get()),
+        "n": int(m.n),
+    }
+
+def _migrate_pickle(legacy_path: Path):
+    # one-time upgrade from the pickled pipeline, the only place river is
+    # still needed; the pickle is left in place
+    try:
+        with open(legacy_path, "rb") as f:
+            m = pickle.load(f)
+        params = _pickled_params(m)
+    except Exception:
+        logger.exception("could not load %s, starting from an untrained model", legacy_path)
+        return OnlineTimeModel()
+    try:
+        write_snapshot(params, SNAPSHOT_PATH)
+        logger.info("migrated %s to %s", legacy_path, SNAPSHOT_PATH)
+    except OSError:
+        logger.exception("could not write %s, will retry at the next checkpoint", SNAPSHOT_PATH)
+    return OnlineTimeModel.from_params(params)
+
+def write_atomic(path: Path, data: bytes):
+    # write to a temp file in the same directory, then rename over the target,
+    # so a crash mid-write never leaves a truncated model behind
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
 def save(m):
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump(m, f)
+    write_snapshot(m.to_params(), SNAPSHOT_PATH)
@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 VALID_CATEGORIES = {
     "Personal Errands", "Health and Fitness", "Social", "Learning",
@@ -21,24 +22,45 @@ PRIORITIZER_PROMPT = (
     - task_name (string)
     - urgency: one of: low, medium, high
     - stress_level: one of: low, medium, high
-    - estimated_time (minutes) - if missing, use predict_task_time tool to infer it
+    - estimated_time (minutes) - if missing, use predict_task_times tool to infer it
     - category: one of exactly: Personal Errands, Health and Fitness, Social, Learning, House Chore, School Work, Work Related, Other
 
-    When calling predict_task_time tool, always pass:
+    Call predict_task_times once with every task missing estimated_time, not once per task.
+    For each task, always pass:
+    - task_name: the task's name
     - category: use the category field directly
     - estimated_subtasks: use task value if present, else 1
     - is_vague: use task value if present, else false
     - has_dependencies: use task value if present, else false
-    - hour_of_day: use the numeric hour from system time below
-    - day_of_week: use numeric weekday from system time below (0=Monday, 6=Sunday)
+    - hour_of_day: use the numeric hour from the current time context
+    - day_of_week: use numeric weekday from the current time context (0=Monday, 6=Sunday)
 
     When all tasks have required details:
     - Thoroughly analyze and prioritize tasks based on urgency, stress level, and estimated time.
     - Return ONLY a valid JSON list with keys:
       priority_rank, task_name, category, estimated_time, urgency, stress_level, summary
     - No markdown, no extra text, no explanation."""
-    f"\n    Today's date: {datetime.now().strftime('%Y-%m-%d')}"
-    f"\n    Day of week index (0=Monday, 6=Sunday): {datetime.now().weekday()}"
-    f"\n    Day of week name: {datetime.now().strftime('%A')}"
-    f"\n    Hour of day: {datetime.now().strftime('%H')}"
 )
+
+
+# PRIORITIZER_PROMPT never changes, so it is sent as the static instruction
+# the model can cache; only this short time context is rebuilt per turn.
+def time_context(tz_name: str | None = None, now: datetime | None = None) -> str:
+    try:
+        tz = ZoneInfo(tz_name) if tz_name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.utc
+    now = (now or datetime.now(timezone.utc)).astimezone(tz)
+    return (
+        "Current time context:"
+        f"\n    Timezone: {tz_name if tz is not timezone.utc else 'UTC'}"
+        f"\n    Today's date: {now.strftime('%Y-%m-%d')}"
+        f"\n    Day of week index (0=Monday, 6=Sunday): {now.weekday()}"
+        f"\n    Day of week name: {now.strftime('%A')}"
+        f"\n    Hour of day: {now.strftime('%H')}"
+    )
+
+
+def dynamic_instruction(context) -> str:
+    """ADK instruction provider: the time context in the session user's timezone."""
+    return time_context(context.state.get("timezone"))
@@ -0,0 +1,116 @@
+"""Retrain the time model from scratch by replaying model_training_events.
+
+Events are replayed in created_at order in NumPy mini-batches, each one
+OnlineTimeModel.learn_many() update. Every batch is scored before the model
+learns from it (progressive validation), so the reported MAE is the error the
+model would have had online. With --batch-size 1 the result matches feeding
+every event to learn() in order; larger batches take fewer, averaged steps and
+trade some accuracy on short logs for speed. Each batch counts as one update
+towards MIN_TRAINING_SAMPLES, so a short log replayed in large batches leaves a
+model that still asks the user. The result is written in the snapshot format that
+load_or_create() reads.
+
+Run from backend/:
+    python -m agents.prioritizer.retrain                         # from the store
+    python -m agents.prioritizer.retrain --jsonl events.jsonl    # from an export
+    python -m agents.prioritizer.retrain --dry-run --batch-size 256
+
+Stop the API first, or restart it afterwards: a running server keeps its
+in-memory model and checkpoints over the file.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .predicttime import SNAPSHOT_PATH, OnlineTimeModel, feature_matrix, write_snapshot
+
+COLLECTION = "model_training_events"
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_PAGE_SIZE = 1000
+
+
+def iter_stored_events(page_size: int = DEFAULT_PAGE_SIZE):
+    """Stream the event log oldest first, one page per round trip."""
+    from db.repository import ASCENDING, get_store
+
+    store = get_store()
+    cursor = None
+    while True:
+        page, cursor = store.query_page(COLLECTION, [], [("created_at", ASCENDING)], page_size, cursor)
+        for _, data in page:
+            yield data
+        if cursor is None:
+            return
+
+
+def iter_jsonl_events(path: Path):
+    """Read one event per line from an export, skipping blank lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_batches(events, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Turn events into (X, y) arrays, dropping ones OnlineTimeModel.learn() would skip."""
+    features, targets = [], []
+    for event in events:
+        try:
+            y = float(event.get("actual_time_spent_minutes"))
+        except (TypeError, ValueError):
+            continue
+        if not np.isfinite(y) or y <= 0:
+            continue
+        features.append(event.get("features") or {})
+        targets.append(y)
+        if len(targets) == batch_size:
+            yield feature_matrix(features), np.array(targets)
+            features, targets = [], []
+    if targets:
+        yield feature_matrix(features), np.array(targets)
+
+
+def replay(batches, model: OnlineTimeModel) -> dict:
+    """Feed every batch to model.learn_matrix(), i.e. one learn_many() update per batch."""
+    samples = 0
+    started = time.perf_counter()
+    for X, y in batches:
+        model.learn_matrix(X, y)
+        samples += len(y)
+    elapsed = time.perf_counter() - started
+    return {
+        "samples": samples,
+        "mae": round(model.mae, 3),
+        "seconds": round(elapsed, 3),
+        "us_per_sample": round(elapsed / samples * 1e6, 3) if samples else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the time model from model_training_events.")
+    parser.add_argument("--jsonl", type=Path, help="read events from this JSONL export instead of the store")
+    parser.add_argument("--out", type=Path, default=SNAPSHOT_PATH, help=f"where to write the snapshot (default {SNAPSHOT_PATH})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="1 reproduces the online learner exactly")
+    parser.add_argument("--dry-run", action="store_true", help="report the replay without writing a model")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    events = iter_jsonl_events(args.jsonl) if args.jsonl else iter_stored_events()
+    model = OnlineTimeModel()
+    report = replay(iter_batches(events, args.batch_size), model)
+    print(json.dumps(report))
+
+    if not report["samples"]:
+        print("no usable events, model not written")
+        return
+    if not args.dry_run:
+        write_snapshot(model.to_params(), args.out)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+from .prompt_priority import VALID_CATEGORIES
+
+Level = Literal["low", "medium", "high"]
+
+
+class TaskItem(BaseModel):
+    """One task of the prioritizer's final JSON list."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    priority_rank: int | None = None
+    task_name: str
+    category: str = "Other"
+    estimated_time: int | None = None
+    urgency: Level | None = None
+    stress_level: Level | None = None
+    summary: str | None = None
+
+    @field_validator("task_name")
+    @classmethod
+    def _not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("task_name is empty")
+        return value
+
+    @field_validator("category", mode="before")
+    @classmethod
+    def _known_category(cls, value):
+        return value if value in VALID_CATEGORIES else "Other"
+
+    @field_validator("urgency", "stress_level", mode="before")
+    @classmethod
+    def _level(cls, value):
+        if isinstance(value, str):
+            value = value.strip().lower()
+            return value if value in ("low", "medium", "high") else None
+        return None
+
+    @field_validator("priority_rank", "estimated_time", mode="before")
+    @classmethod
+    def _whole_number(cls, value):
+        # "45", 45.0 and "45 minutes" all mean 45; anything else is unknown
+        if isinstance(value, str):
+            value = value.strip().split(" ", 1)[0]
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def validate_tasks(items: list) -> list[dict]:
+    """Validate raw list items in one pass, dropping the ones that are not tasks."""
+    tasks = []
+    for item in items:
+        try:
+            tasks.append(TaskItem.model_validate(item).model_dump())
+        except ValidationError:
+            continue
+    return tasks
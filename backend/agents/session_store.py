@@ -0,0 +1,145 @@
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # backend/
+# Any SQLAlchemy URL ADK supports; a shared file or server database lets
+# sessions survive restarts and be seen by every uvicorn worker.
+# "memory" keeps everything in-process (tests, throwaway runs).
+SESSION_DB_URL = os.getenv("ADK_SESSION_DB_URL", f"sqlite:///{BASE_DIR / '.adk' / 'sessions.db'}")
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("ADK_SESSION_CACHE_TTL", "900"))
+
+
+def _default_cache_size() -> int:
+    # With several workers a cached session can go stale behind another
+    # worker's writes, so only cache when running a single worker.
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        return 0
+    return 1024
+
+
+SESSION_CACHE_SIZE = int(os.getenv("ADK_SESSION_CACHE_SIZE", _default_cache_size()))
+
+
+class BoundedSessionService(BaseSessionService):
+    """ADK session service: a durable backing store plus a bounded hot cache.
+
+    Sessions are read through and written through to `backing`. At most
+    `max_sessions` are kept resident, least recently used first out, and an
+    entry expires `ttl_seconds` after its last use.
+    """
+
+    def __init__(self, backing: BaseSessionService, max_sessions: int = SESSION_CACHE_SIZE, ttl_seconds: float = SESSION_CACHE_TTL_SECONDS):
+        self._backing = backing
+        self._max_sessions = max_sessions
+        self._ttl = ttl_seconds
+        # key -> [session, expires_at, approx_bytes]
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(app_name: str, user_id: str, session_id: str):
+        return app_name, user_id, session_id
+
+    def _forget(self, key):
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _reap(self):
+        now = time.monotonic()
+        while self._cache:
+            key, (_, expires_at, _) = next(iter(self._cache.items()))
+            if expires_at > now and len(self._cache) <= self._max_sessions:
+                break
+            self._forget(key)
+            self.evictions += 1
+
+    def _remember(self, session, extra_bytes: int | None = None):
+        if self._max_sessions <= 0:
+            return
+        key = self._key(session.app_name, session.user_id, session.id)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] is session and extra_bytes is not None:
+            size = entry[2] + extra_bytes
+        else:
+            size = len(session.model_dump_json())
+        self._forget(key)
+        self._cache[key] = [session, time.monotonic() + self._ttl, size]
+        self._bytes += size
+        self._reap()
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session = await self._backing.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._remember(session)
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        key = self._key(app_name, user_id, session_id)
+        self._reap()
+        entry = self._cache.get(key)
+        if entry is not None and config is None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            entry[1] = time.monotonic() + self._ttl
+            return entry[0]
+
+        self.misses += 1
+        session = await self._backing.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None and config is None:
+            self._remember(session)
+        return session
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        return await self._backing.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        self._forget(self._key(app_name, user_id, session_id))
+        await self._backing.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session, event):
+        key = self._key(session.app_name, session.user_id, session.id)
+        try:
+            event = await self._backing.append_event(session, event)
+        except ValueError:
+            # the backing store rejects stale sessions; drop our copy so the
+            # next request reloads it
+            self._forget(key)
+            raise
+        if key in self._cache:
+            self._remember(session, extra_bytes=len(event.model_dump_json()))
+        return event
+
+    def stats(self) -> dict:
+        self._reap()
+        return {
+            "live_sessions": len(self._cache),
+            "approx_bytes": self._bytes,
+            "max_sessions": self._max_sessions,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _backing_service() -> BaseSessionService:
+    if SESSION_DB_URL == "memory":
+        return InMemorySessionService()
+    if SESSION_DB_URL.startswith("sqlite:///"):
+        Path(SESSION_DB_URL.removeprefix("sqlite:///")).parent.mkdir(parents=True, exist_ok=True)
+    return DatabaseSessionService(db_url=SESSION_DB_URL)
+
+
+# shared by the prioritizer and flower runners; they use different app names
+session_service = BoundedSessionService(_backing_service())
@@ -0,0 +1,82 @@
+import json
+
+
+class JsonArrayItems:
+    """Incremental parser for the objects of the first JSON array in a text.
+
+    feed() takes text as it arrives and returns the objects that closed in
+    it, so a caller can act on each list item before the rest is generated.
+    Text around the array (prose, a ``` fence, a {"tasks": ...} wrapper) is
+    skipped. Items that are not valid JSON objects are dropped.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._array_depth = None
+        self._maybe_array = False
+        self._item = None
+        self.found = False
+        self.complete = False
+
+    def feed(self, text: str) -> list[dict]:
+        items = []
+        for ch in text:
+            if self.complete:
+                break
+            if self._maybe_array and not ch.isspace():
+                # "[" starts the list only if an object or "]" follows, so a
+                # bracket in prose ("tasks [sorted]:") is not mistaken for it
+                self._maybe_array = False
+                if ch in "{]":
+                    self._array_depth = len(self._stack)
+                    self.found = True
+                else:
+                    self._stack.pop()
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                # quotes in prose outside any container are not JSON strings
+                self._in_string = bool(self._stack)
+            elif ch in "[{":
+                if ch == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item = [ch]
+                self._stack.append(ch)
+                if ch == "[" and self._array_depth is None:
+                    self._maybe_array = True
+            elif ch in "]}" and self._stack:
+                self._stack.pop()
+                depth = len(self._stack)
+                if ch == "}" and self._item is not None and depth == self._array_depth:
+                    item = self._close_item()
+                    if item is not None:
+                        items.append(item)
+                elif ch == "]" and self._array_depth is not None and depth == self._array_depth - 1:
+                    self.complete = True
+        return items
+
+    def _close_item(self) -> dict | None:
+        raw, self._item = "".join(self._item), None
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def parse_array_items(text: str) -> list[dict] | None:
+    """All objects of the first JSON array in text, or None if no array closes."""
+    parser = JsonArrayItems()
+    items = parser.feed(text or "")
+    return items if parser.complete else None
@@ -0,0 +1,309 @@
+"""Shared execution layer for LLM agent calls.
+
+Each agent gets an AgentLane: a concurrency cap with a bounded wait queue
+(admission control), a per-call deadline covering both the wait and the
+call, optional hedging for idempotent calls, and a circuit breaker. Routes
+turn the errors into 429/503 responses or a degraded answer.
+
+Configured per lane with LLM_<LANE>_CONCURRENCY, LLM_<LANE>_QUEUE,
+LLM_<LANE>_TIMEOUT and LLM_<LANE>_HEDGE_AFTER (seconds, 0 = off).
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+WAIT_SAMPLES = 512
+
+
+class LLMUnavailable(Exception):
+    """The call was not made or did not finish; the caller should degrade."""
+
+    status_code = 503
+
+    def __init__(self, detail: str, retry_after: float = 1.0):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Saturated(LLMUnavailable):
+    """The lane's wait queue is full."""
+
+    status_code = 429
+
+
+class CircuitOpen(LLMUnavailable):
+    """Recent calls kept failing; calls are refused until the cooldown ends."""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The deadline passed while waiting for a slot or for the model."""
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive failures, for `cooldown` seconds.
+
+    After the cooldown one trial call is let through (half-open); its
+    outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self._threshold = failures
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._cooldown:
+            return "open"
+        return "half_open"
+
+    def refusal(self) -> CircuitOpen:
+        retry_after = max(0.0, self._opened_at + self._cooldown - time.monotonic())
+        return CircuitOpen("The assistant is temporarily unavailable.", retry_after=retry_after or 1.0)
+
+    def allows(self) -> bool:
+        """Whether a call would be let through now; claims nothing."""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial)
+
+    def check(self) -> bool:
+        """Let one call through or raise CircuitOpen; True if it is the half-open trial.
+
+        The trial call must end in success(), failure() or release_trial(),
+        or no other call is let through again.
+        """
+        if not self.allows():
+            raise self.refusal()
+        if self.state == "half_open":
+            self._trial = True
+            return True
+        return False
+
+    def release_trial(self):
+        """The trial call ended without an outcome, e.g. the client went away."""
+        self._trial = False
+
+    def success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def failure(self):
+        self._failures += 1
+        if self._trial or self._failures >= self._threshold:
+            if self._opened_at is None or self._trial:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def _env(lane: str, name: str, default):
+    return type(default)(os.getenv(f"LLM_{lane.upper()}_{name}", default))
+
+
+class AgentLane:
+    def __init__(self, name: str, concurrency: int, max_queue: int, timeout: float, hedge_after: float = 0.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.queued = 0
+        self.in_flight = 0
+        self.counts = {"admitted": 0, "rejected": 0, "timeouts": 0, "failures": 0, "hedged": 0, "short_circuited": 0}
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, max_queue: int, timeout: float, hedge_after: float = 0.0):
+        return cls(
+            name,
+            _env(name, "CONCURRENCY", concurrency),
+            _env(name, "QUEUE", max_queue),
+            _env(name, "TIMEOUT", float(timeout)),
+            _env(name, "HEDGE_AFTER", float(hedge_after)),
+        )
+
+    def deadline(self, budget: float | None = None) -> float:
+        """Absolute loop-time deadline: the lane timeout, or a shorter caller budget."""
+        budget = self.timeout if budget is None else min(budget, self.timeout)
+        return asyncio.get_running_loop().time() + budget
+
+    def _remaining(self, deadline: float) -> float:
+        return deadline - asyncio.get_running_loop().time()
+
+    @asynccontextmanager
+    async def slot(self, deadline: float | None = None):
+        """Hold one of the lane's slots; yields the seconds left until the deadline.
+
+        Raises Saturated if the queue is full, CircuitOpen if the breaker is
+        open, DeadlineExceeded if no slot frees up in time. Failures inside the
+        block count towards the breaker.
+        """
+        deadline = deadline if deadline is not None else self.deadline()
+        if not self.breaker.allows():
+            self.counts["short_circuited"] += 1
+            raise self.breaker.refusal()
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.counts["rejected"] += 1
+            raise Saturated("Too many requests are waiting for the assistant.", retry_after=1.0)
+
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout_at(deadline):
+                await self._slots.acquire()
+        except TimeoutError:
+            self.counts["timeouts"] += 1
+            raise DeadlineExceeded("Timed out waiting for the assistant.") from None
+        finally:
+            self.queued -= 1
+            self._waits.append(time.monotonic() - started)
+
+        # only an admitted call may take the half-open trial; one that is
+        # rejected or times out queueing must not leave it claimed
+        try:
+            trial = self.breaker.check()
+        except CircuitOpen:
+            self.counts["short_circuited"] += 1
+            self._slots.release()
+            raise
+
+        self.counts["admitted"] += 1
+        self.in_flight += 1
+        recorded = False
+        try:
+            yield self._remaining(deadline)
+        except (TimeoutError, DeadlineExceeded):
+            self.counts["timeouts"] += 1
+            self.breaker.failure()
+            recorded = True
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # the client went away; says nothing about the backend
+            raise
+        except Exception:
+            self.counts["failures"] += 1
+            self.breaker.failure()
+            recorded = True
+            raise
+        else:
+            self.breaker.success()
+            recorded = True
+        finally:
+            if trial and not recorded:
+                self.breaker.release_trial()
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def run(self, call, deadline: float | None = None):
+        """Await call(attempt) within a slot and the deadline.
+
+        With hedge_after set, a second attempt (attempt=1) starts if the first
+        has not finished by then and a slot is free; the first result wins.
+        Only hedge calls that are safe to run twice.
+        """
+        deadline = deadline if deadline is not None else self.deadline()
+        async with self.slot(deadline) as remaining:
+            if not self.hedge_after or self.hedge_after >= remaining:
+                return await self._bounded(call(0), deadline)
+            return await self._hedged(call, deadline)
+
+    async def iterate(self, events, deadline: float):
+        """Yield from an async iterator, raising DeadlineExceeded once the deadline passes.
+
+        For streamed calls, used inside slot().
+        """
+        iterator = events.__aiter__()
+        while True:
+            try:
+                # timeout_at rather than wait_for: the step runs in this task,
+                # so the agent's context variables stay in one context
+                async with asyncio.timeout_at(deadline):
+                    event = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                raise DeadlineExceeded("The assistant took too long to answer.") from None
+            yield event
+
+    async def _bounded(self, awaitable, deadline: float):
+        try:
+            async with asyncio.timeout_at(deadline):
+                return await awaitable
+        except TimeoutError:
+            raise DeadlineExceeded("The assistant took too long to answer.") from None
+
+    async def _hedged(self, call, deadline: float):
+        attempts = [asyncio.ensure_future(call(0))]
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_after)
+            if not done and not self._slots.locked():
+                # the hedge takes a second slot, so it never pushes the lane
+                # past its concurrency; acquire() cannot block here
+                await self._slots.acquire()
+                hedged = True
+                self.in_flight += 1
+                self.counts["hedged"] += 1
+                attempts.append(asyncio.ensure_future(call(1)))
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, self._remaining(deadline)), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded("The assistant took too long to answer.")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # every attempt failed: report the first one's error
+            return attempts[0].result()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+            if hedged:
+                self.in_flight -= 1
+                self._slots.release()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else None
+
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "hedge_after_seconds": self.hedge_after or None,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)},
+            **self.counts,
+        }
+
+
+# clients give up after 20 s, so answer (or degrade) before that
+prioritizer_lane = AgentLane.from_env("prioritizer", concurrency=8, max_queue=32, timeout=18)
+# award calls use throwaway sessions, so they are safe to hedge
+flower_lane = AgentLane.from_env("flower", concurrency=8, max_queue=32, timeout=10, hedge_after=4)
+
+
+def lane_stats() -> dict:
+    return {lane.name: lane.stats() for lane in (prioritizer_lane, flower_lane)}
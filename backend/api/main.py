@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from pathlib import Path
 from fastapi import FastAPI
@@ -9,8 +11,37 @@ load_dotenv(BASE_DIR / "agents" / "prioritizer" / ".env")
 from api.routes.chat import router as chat_router
 from api.routes.actualTime import router as complete_task_router
 from api.routes.flowers.award import router as flower_award_router
+from api.routes.flowers.assets import router as flower_assets_router
+from api.routes.status import router as status_router
+from api.routes.timer import router as timer_router
+from api.timer_engine import timer_engine
+from api import providers
+from api.metrics import TimingMiddleware
+from agents.floweragent.catalog import load_catalog
+from agents.prioritizer.model_updates import model_updater
+from db import repository
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_updater.start()
+    # index the flower SVGs once, before serving awards or assets
+    await asyncio.to_thread(load_catalog)
+    timer_engine.start_flushing()
+    # build Firestore, the model and the agent runners in the background;
+    # requests that need one before then build it on demand
+    warmup = asyncio.create_task(providers.warm_up())
+    yield
+    warmup.cancel()
+    # persist timer events still buffered in memory
+    await timer_engine.stop_flushing()
+    # flush pending model updates before the process exits
+    model_updater.stop()
+    repository.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(TimingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -21,6 +52,9 @@ app.add_middleware(
 app.include_router(chat_router)
 app.include_router(complete_task_router)
 app.include_router(flower_award_router)
+app.include_router(flower_assets_router)
+app.include_router(status_router)
+app.include_router(timer_router)
 
 
 @app.get("/")
@@ -0,0 +1,77 @@
+"""Request and phase timings, exposed in Prometheus text format on GET /metrics.
+
+TimingMiddleware times every HTTP request and collects the spans (see the
+top-level metrics module) recorded while serving it; when the request ends
+it records, per route, the total time each phase took in that request.
+
+Phases can nest (a tool call happens inside an agent run), so they do not
+add up to the request time. With METRICS_SERVER_TIMING=1 each response also
+carries them as a Server-Timing header, which browser dev tools display.
+"""
+import os
+import time
+
+from metrics import PHASES, Histogram, begin_request, end_request, format_labels
+
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def gauge_lines(name: str, help_text: str, labelnames: tuple[str, ...], samples: dict) -> list[str]:
+    """Prometheus lines for a gauge given {label values tuple: value}."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{{{format_labels(labelnames, labels)}}} {value}")
+    return lines
+
+
+REQUESTS = Histogram("http_request_duration_seconds", "HTTP request time, until the response body is sent.", ("method", "route", "status"))
+
+
+def server_timing(spans: dict, total: float) -> str:
+    entries = [
+        f'{phase};desc="{calls}x";dur={seconds * 1000:.1f}'
+        for phase, (seconds, calls) in spans.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """ASGI middleware recording REQUESTS and per-request PHASES by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans, token = begin_request()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing(spans, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
+            elapsed = time.perf_counter() - started
+            # the template (/tasks/{user_id}), not the raw path, keeps the
+            # number of series bounded; FastAPI puts the matched route in scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUESTS.observe((scope["method"], route, str(status)), elapsed)
+            for phase, (seconds, _) in spans.items():
+                PHASES.observe((route, phase), seconds)
+
+
+def render() -> str:
+    return "\n".join(REQUESTS.render() + PHASES.render()) + "\n"
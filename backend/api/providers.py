@@ -0,0 +1,110 @@
+"""Heavy singletons built on first use instead of at import.
+
+Importing the API should not pay for google.adk, river or Firestore
+authentication. Each of those sits behind a Lazy provider: the first get()
+builds it exactly once, even with concurrent callers, and main.py warms every
+registered provider in the background at startup so the first real request
+rarely waits. GET /status/ready reports their state.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = []
+
+
+class Lazy:
+    """A value built by `factory` on the first get(), thread-safely."""
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._ready = False
+        self.error = None
+        self.seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self):
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as exc:
+                    # leave it unbuilt so the next get() retries
+                    self.error = repr(exc)
+                    raise
+                self.seconds = round(time.perf_counter() - started, 3)
+                self.error = None
+                self._ready = True
+        return self._value
+
+    def set(self, value):
+        """Use a prebuilt value instead of the factory (benchmarks, scripted agents)."""
+        with self._lock:
+            self._value = value
+            self.error = None
+            self.seconds = 0.0
+            self._ready = True
+
+    async def aget(self):
+        """get() for async code: builds off the event loop if needed."""
+        if self._ready:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def status(self) -> dict:
+        return {"ready": self._ready, "seconds": self.seconds, "error": self.error}
+
+
+def provider(name: str):
+    """Decorator turning a zero-argument factory into a registered Lazy."""
+    def register(factory):
+        lazy = Lazy(name, factory)
+        PROVIDERS.append(lazy)
+        return lazy
+    return register
+
+
+async def warm_up():
+    # one at a time: the factories mostly import, and imports serialize anyway
+    for lazy in list(PROVIDERS):
+        try:
+            await asyncio.to_thread(lazy.get)
+        except Exception:
+            logger.exception("warmup of %s failed, it will be retried on first use", lazy.name)
+
+
+def readiness() -> dict:
+    return {
+        "ready": all(lazy.ready for lazy in PROVIDERS),
+        "providers": {lazy.name: lazy.status() for lazy in PROVIDERS},
+    }
+
+
+@provider("storage")
+def storage():
+    from db.repository import get_store
+    return get_store()
+
+
+@provider("session_service")
+def session_service():
+    from agents.session_store import session_service
+    return session_service
+
+
+@provider("time_model")
+def time_model():
+    from agents.prioritizer.model_updates import get_model
+    return get_model()
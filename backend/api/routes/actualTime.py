@@ -1,50 +1,62 @@
+import uuid
 from datetime import datetime, timezone
-from threading import Lock
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
-from agents.prioritizer import agent as prioritizer_agent
-from agents.prioritizer.predicttime import save as save_time_model
-from db.firebase import db
+from agents.prioritizer.model_updates import model_updater
+from api.timer_engine import timer_engine
+from db import repository
+from db.cache import etag_matches, task_view_cache
 
 router = APIRouter()
-MODEL_UPDATE_LOCK = Lock()
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BATCH_COMPLETIONS = 100
 
 class CompleteTaskRequest(BaseModel):
     task_id: str
     user_id: str
-    actual_time_spent_minutes: int = Field(gt=0)
+    # ignored when the task was timed with /tasks/{task_id}/timer
+    actual_time_spent_minutes: int | None = Field(default=None, gt=0)
+
+
+class BatchCompletion(BaseModel):
+    task_id: str
+    # ignored when the task was timed with /tasks/{task_id}/timer
+    actual_time_spent_minutes: int | None = Field(default=None, gt=0)
+
+
+class CompleteTasksRequest(BaseModel):
+    user_id: str
+    tasks: list[BatchCompletion] = Field(min_length=1, max_length=MAX_BATCH_COMPLETIONS)
 
 
 def _to_iso(value):
     return value.isoformat() if hasattr(value, "isoformat") else value
 
 
-@router.get("/tasks/{user_id}")
-async def get_tasks(user_id: str):
-    docs = db.collection("tasks").where("user_id", "==", user_id).stream()
-    tasks = []
-
-    for doc in docs:
-        data = doc.to_dict() or {}
-        tasks.append({
-            "task_id": doc.id,
-            "user_id": data.get("user_id"),
-            "session_id": data.get("session_id"),
-            "priority_rank": data.get("priority_rank"),
-            "task_name": data.get("task_name"),
-            "category": data.get("category"),
-            "estimated_time": data.get("estimated_time"),
-            "actual_time_spent_minutes": data.get("actual_time_spent_minutes"),
-            "urgency": data.get("urgency"),
-            "stress_level": data.get("stress_level"),
-            "summary": data.get("summary"),
-            "completed": bool(data.get("completed", False)),
-            "created_at": _to_iso(data.get("created_at")),
-            "completed_at": _to_iso(data.get("completed_at")),
-        })
+def _task_view(doc_id: str, data: dict) -> dict:
+    return {
+        "task_id": doc_id,
+        "user_id": data.get("user_id"),
+        "session_id": data.get("session_id"),
+        "priority_rank": data.get("priority_rank"),
+        "task_name": data.get("task_name"),
+        "category": data.get("category"),
+        "estimated_time": data.get("estimated_time"),
+        "actual_time_spent_minutes": data.get("actual_time_spent_minutes"),
+        "urgency": data.get("urgency"),
+        "stress_level": data.get("stress_level"),
+        "summary": data.get("summary"),
+        "completed": bool(data.get("completed", False)),
+        "created_at": _to_iso(data.get("created_at")),
+        "completed_at": _to_iso(data.get("completed_at")),
+    }
 
+
+def _sort_tasks(tasks: list[dict]):
     tasks.sort(
         key=lambda t: (
             t["completed"],
@@ -52,55 +64,129 @@ async def get_tasks(user_id: str):
         )
     )
 
+
+def _patch_completed(task_id: str, changes: dict):
+    """Return a cache patch that applies `changes` to one task of a cached view."""
+    def update(view: dict):
+        if not any(t["task_id"] == task_id for t in view["tasks"]):
+            return None
+        tasks = [dict(t, **changes) if t["task_id"] == task_id else t for t in view["tasks"]]
+        _sort_tasks(tasks)
+        return {**view, "tasks": tasks}
+    return update
+
+
+def _utc_iso(value: datetime) -> str:
+    # created_at is stored as a UTC ISO string, so compare in the same form
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+async def _get_tasks_page(user_id, limit, cursor, completed, category, created_after, created_before):
+    filters = [("user_id", "==", user_id)]
+    if completed is not None:
+        filters.append(("completed", "==", completed))
+    if category is not None:
+        filters.append(("category", "==", category))
+    if created_after is not None:
+        filters.append(("created_at", ">=", _utc_iso(created_after)))
+    if created_before is not None:
+        filters.append(("created_at", "<", _utc_iso(created_before)))
+
+    # a date range is only servable newest-first; otherwise keep the list order
+    if created_after is not None or created_before is not None:
+        order_by = [("created_at", repository.DESCENDING)]
+    else:
+        order_by = [("completed", repository.ASCENDING), ("priority_rank", repository.ASCENDING)]
+
+    try:
+        docs, next_cursor = await repository.query_page("tasks", filters, order_by, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    tasks = [_task_view(doc_id, data) for doc_id, data in docs]
     return {
         "user_id": user_id,
         "count": len(tasks),
         "tasks": tasks,
+        "next_cursor": next_cursor,
     }
 
 
-@router.post("/tasks/complete")
-async def complete_task(body: CompleteTaskRequest):
-    # fetch the task from tasks collection
-    task_ref = db.collection("tasks").document(body.task_id)
-    task_doc = task_ref.get()
-
-    if not task_doc.exists:
-        raise HTTPException(status_code=404, detail="Task not found.")
+# ---------------------------------------------------------------------------
+# GET /tasks/{user_id}
+# Without query parameters: every task of the user, served from the view
+# cache. With limit/cursor/filters: one page, filtered and ordered by the
+# datastore, plus next_cursor (null on the last page).
+# ---------------------------------------------------------------------------
+@router.get("/tasks/{user_id}")
+async def get_tasks(
+    user_id: str,
+    request: Request,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    completed: bool | None = None,
+    category: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    if any(v is not None for v in (limit, cursor, completed, category, created_after, created_before)):
+        return await _get_tasks_page(
+            user_id, limit or DEFAULT_PAGE_SIZE, cursor, completed, category, created_after, created_before
+        )
 
-    task_data = task_doc.to_dict()
-    if task_data.get("user_id") != body.user_id:
-        raise HTTPException(status_code=403, detail="Task does not belong to this user.")
+    cached = task_view_cache.get(user_id)
+    if cached is not None:
+        etag, view = cached
+    else:
+        version = task_view_cache.version(user_id)
+        docs = await repository.query_docs("tasks", [("user_id", "==", user_id)])
+        tasks = [_task_view(doc_id, data) for doc_id, data in docs]
+        _sort_tasks(tasks)
 
-    if task_data.get("completed"):
-        completed_doc = db.collection("completed_tasks").document(body.task_id).get()
-        if completed_doc.exists:
-            completed_task = completed_doc.to_dict() or {}
-        else:
-            completed_task = {
-                "task_id": body.task_id,
-                "user_id": body.user_id,
-                "task_name": task_data.get("task_name"),
-                "category": task_data.get("category"),
-                "actual_time_spent_minutes": task_data.get("actual_time_spent_minutes"),
-                "estimated_time": task_data.get("estimated_time"),
-                "completed_at": task_data.get("completed_at"),
-            }
-        return {
-            "task_id": body.task_id,
-            "completed_task": completed_task
+        view = {
+            "user_id": user_id,
+            "count": len(tasks),
+            "tasks": tasks,
         }
+        etag = task_view_cache.put(user_id, view, version)
 
-    now = datetime.now(timezone.utc)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(view, headers=headers)
 
-    # mark task as completed in tasks collection
-    task_ref.update({
-        "completed": True,
-        "completed_at": now.isoformat(),
-        "actual_time_spent_minutes": body.actual_time_spent_minutes,
-    })
 
-    # update online model using completion feedback
+def _previous_completion(task_id: str, user_id: str, task_data: dict, completed_task: dict | None) -> dict:
+    """The completed_tasks record of an already completed task, rebuilt if missing."""
+    if completed_task is not None:
+        return completed_task
+    return {
+        "task_id": task_id,
+        "user_id": user_id,
+        "task_name": task_data.get("task_name"),
+        "category": task_data.get("category"),
+        "actual_time_spent_minutes": task_data.get("actual_time_spent_minutes"),
+        "estimated_time": task_data.get("estimated_time"),
+        "completed_at": task_data.get("completed_at"),
+    }
+
+
+async def _finish_timer(task_id: str, user_id: str, task_data: dict, client_minutes: int | None):
+    """(actual minutes, timer fields to write); minutes is None if neither the
+    server timer nor the client has a count. The timer is only stopped in the
+    written fields: timer_engine.discard() it once they are committed, or
+    timer_engine.keep() it if they are not."""
+    # prefer the server-side timer over the client's own count
+    focus_minutes, timer_fields = await timer_engine.finish(task_id, user_id, task_data)
+    if focus_minutes is not None:
+        return max(1, round(focus_minutes)), timer_fields
+    return client_minutes, timer_fields
+
+
+def _completion(task_id: str, user_id: str, task_data: dict, actual_minutes: int, now: datetime) -> tuple[dict, dict, dict]:
+    """(completed_tasks record, model_training_events record, model features) for one completion."""
     features = {
         "category": task_data.get("category", "Other"),
         "hour_of_day": int(task_data.get("hour_of_day", now.hour)),
@@ -109,31 +195,158 @@ async def complete_task(body: CompleteTaskRequest):
         "is_vague": bool(task_data.get("is_vague", False)),
         "has_dependencies": bool(task_data.get("has_dependencies", False)),
     }
-    with MODEL_UPDATE_LOCK:
-        prioritizer_agent._time_model.learn(features, float(body.actual_time_spent_minutes))
-        save_time_model(prioritizer_agent._time_model)
-
-    # write to completed_tasks collection
     completed_task = {
-        "task_id": body.task_id,
-        "user_id": body.user_id,
+        "task_id": task_id,
+        "user_id": user_id,
         "task_name": task_data.get("task_name"),
         "category": task_data.get("category"),
-        "actual_time_spent_minutes": body.actual_time_spent_minutes,
+        "actual_time_spent_minutes": actual_minutes,
         "estimated_time": task_data.get("estimated_time"),
         "completed_at": now.isoformat()
     }
-    db.collection("completed_tasks").document(body.task_id).set(completed_task)
-    db.collection("model_training_events").add({
-        "task_id": body.task_id,
-        "user_id": body.user_id,
+    training_event = {
+        "task_id": task_id,
+        "user_id": user_id,
         "features": features,
-        "actual_time_spent_minutes": body.actual_time_spent_minutes,
+        "actual_time_spent_minutes": actual_minutes,
         "estimated_time": task_data.get("estimated_time"),
         "created_at": now.isoformat(),
-    })
+    }
+    return completed_task, training_event, features
+
+
+def _completed_fields(actual_minutes: int, now: datetime) -> dict:
+    return {
+        "completed": True,
+        "completed_at": now.isoformat(),
+        "actual_time_spent_minutes": actual_minutes,
+    }
+
+
+@router.post("/tasks/complete")
+async def complete_task(body: CompleteTaskRequest):
+    # fetch the task from tasks collection
+    task_data = await repository.get_doc("tasks", body.task_id)
+
+    if task_data is None:
+        raise HTTPException(status_code=404, detail="Task not found.")
+
+    if task_data.get("user_id") != body.user_id:
+        raise HTTPException(status_code=403, detail="Task does not belong to this user.")
+
+    if task_data.get("completed"):
+        completed_task = await repository.get_doc("completed_tasks", body.task_id)
+        return {
+            "task_id": body.task_id,
+            "completed_task": _previous_completion(body.task_id, body.user_id, task_data, completed_task)
+        }
+
+    actual_minutes, timer_fields = await _finish_timer(body.task_id, body.user_id, task_data, body.actual_time_spent_minutes)
+    if actual_minutes is None:
+        raise HTTPException(
+            status_code=422,
+            detail="actual_time_spent_minutes is required when the task was not timed.",
+        )
+
+    now = datetime.now(timezone.utc)
+    try:
+        completed_task, training_event, features = _completion(body.task_id, body.user_id, task_data, actual_minutes, now)
+
+        # mark task as completed and record the completion, all or nothing
+        await repository.commit_batch([
+            ("tasks", body.task_id, {**timer_fields, **_completed_fields(actual_minutes, now)}, True),
+            ("completed_tasks", body.task_id, completed_task, False),
+            ("model_training_events", uuid.uuid4().hex[:20], training_event, False),
+        ])
+    except BaseException:
+        # nothing was written: the timer carries on
+        timer_engine.keep(body.task_id)
+        raise
+    timer_engine.discard(body.task_id)
+    # update online model using completion feedback, once it is durable;
+    # learning and checkpointing happen on the updater thread
+    model_updater.submit(features, float(actual_minutes))
+    task_view_cache.patch(body.user_id, _patch_completed(body.task_id, _completed_fields(actual_minutes, now)))
 
     return {
         "task_id": body.task_id,
         "completed_task": completed_task
     }
+
+
+# ---------------------------------------------------------------------------
+# POST /tasks/complete:batch
+# Completes up to MAX_BATCH_COMPLETIONS tasks of one user: one multi-get for
+# the tasks, one batched write for every document, one model update batch.
+# Each item is answered like POST /tasks/complete would answer it alone,
+# with its own status (200, 403, 404 or 422) instead of failing the batch;
+# an already completed task, or a task listed twice, returns its existing
+# completion and is not learned from again.
+# ---------------------------------------------------------------------------
+@router.post("/tasks/complete:batch")
+async def complete_tasks(body: CompleteTasksRequest):
+    task_ids = list(dict.fromkeys(item.task_id for item in body.tasks))
+    tasks = await repository.get_many("tasks", task_ids)
+    already_done = [tid for tid in task_ids if tasks.get(tid, {}).get("completed") and tasks[tid].get("user_id") == body.user_id]
+    previous = await repository.get_many("completed_tasks", already_done)
+
+    now = datetime.now(timezone.utc)
+    results = {}
+    writes = []
+    samples = []
+    patches = {}
+    stopped = []
+    try:
+        for item in body.tasks:
+            if item.task_id in results:
+                continue
+            task_data = tasks.get(item.task_id)
+            if task_data is None:
+                results[item.task_id] = {"task_id": item.task_id, "status": 404, "detail": "Task not found."}
+                continue
+            if task_data.get("user_id") != body.user_id:
+                results[item.task_id] = {"task_id": item.task_id, "status": 403, "detail": "Task does not belong to this user."}
+                continue
+            if task_data.get("completed"):
+                completed_task = _previous_completion(item.task_id, body.user_id, task_data, previous.get(item.task_id))
+                results[item.task_id] = {"task_id": item.task_id, "status": 200, "completed_task": completed_task}
+                continue
+
+            actual_minutes, timer_fields = await _finish_timer(item.task_id, body.user_id, task_data, item.actual_time_spent_minutes)
+            stopped.append(item.task_id)
+            if actual_minutes is None:
+                results[item.task_id] = {
+                    "task_id": item.task_id,
+                    "status": 422,
+                    "detail": "actual_time_spent_minutes is required when the task was not timed.",
+                }
+                continue
+
+            completed_task, training_event, features = _completion(item.task_id, body.user_id, task_data, actual_minutes, now)
+            writes += [
+                ("tasks", item.task_id, {**timer_fields, **_completed_fields(actual_minutes, now)}, True),
+                ("completed_tasks", item.task_id, completed_task, False),
+                ("model_training_events", uuid.uuid4().hex[:20], training_event, False),
+            ]
+            samples.append((features, float(actual_minutes)))
+            patches[item.task_id] = _completed_fields(actual_minutes, now)
+            results[item.task_id] = {"task_id": item.task_id, "status": 200, "completed_task": completed_task}
+
+        await repository.commit_batch(writes)
+    except BaseException:
+        # nothing was written: the timers carry on
+        for task_id in stopped:
+            timer_engine.keep(task_id)
+        raise
+    for task_id in patches:
+        timer_engine.discard(task_id)
+    # learned together, after the completions are durable
+    model_updater.submit_many(samples)
+    for task_id, changes in patches.items():
+        task_view_cache.patch(body.user_id, _patch_completed(task_id, changes))
+
+    return {
+        "user_id": body.user_id,
+        "succeeded": sum(1 for r in results.values() if r["status"] == 200),
+        "results": [results[task_id] for task_id in task_ids],
+    }
@@ -1,102 +1,151 @@
+import asyncio
 import json
-import re
+import time
+from contextlib import aclosing
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from db.firebase import db
-from agents.prioritizer.agent import root_agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from db import flower_stats, repository
+from db.cache import task_view_cache
+from agents.prioritizer.schemas import validate_tasks
+from api.json_stream import JsonArrayItems, parse_array_items
+from api.llm_scheduler import LLMUnavailable, prioritizer_lane
+from api.providers import provider, session_service
+from metrics import record, span
 
 APP_NAME = "bonita-prioritizer"
-session_service = InMemorySessionService()
-runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
 FINAL_LIST_MESSAGE = "The list will be created for you very soon!"
+DEGRADED_MESSAGE = "I can't think this through right now, so here is your current list. Try again in a minute!"
 
-async def call_prioritizer_agent(user_id: str, session_id: str, text: str) -> str:
-    existing = await session_service.get_session(
+
+@provider("prioritizer_runner")
+def runner():
+    from google.adk.runners import Runner
+    from agents.prioritizer.agent import root_agent
+    return Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service.get())
+
+
+async def _ensure_session(user_id: str, session_id: str, tz_name: str | None = None):
+    sessions = await session_service.aget()
+    existing = await sessions.get_session(
         app_name=APP_NAME,
         user_id=user_id,
         session_id=session_id,
     )
     
     if not existing:
-        await session_service.create_session(
+        await sessions.create_session(
             app_name=APP_NAME,
             user_id=user_id,
             session_id=session_id,
+            state={"timezone": tz_name} if tz_name else None,
         )
 
-    msg = types.Content(role="user", parts=[types.Part(text=text)])
-    reply = ""
 
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=msg,
-    ):
-        if event.is_final_response() and event.content and event.content.parts:
-            reply = "".join(
-                p.text for p in event.content.parts if getattr(p, "text", None)
-            )
-            break
+def _event_text(event) -> str:
+    return "".join(p.text for p in event.content.parts if getattr(p, "text", None))
 
-    return reply or "No response from agent."
 
+def _timezone_delta(tz_name: str | None) -> dict | None:
+    # the agent's dynamic instruction reads the user's timezone from session state
+    return {"timezone": tz_name} if tz_name else None
 
-def _extract_json_candidate(reply: str) -> str | None:
-    text = (reply or "").strip()
-    if not text:
-        return None
 
-    fenced = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, re.IGNORECASE)
-    if fenced:
-        return fenced.group(1).strip()
+async def call_prioritizer_agent(user_id: str, session_id: str, text: str, tz_name: str | None = None, deadline: float | None = None) -> str:
+    """Run one turn through the prioritizer lane; raises LLMUnavailable when it cannot.
 
-    return text
+    Not hedged: a second attempt would append the message to the session twice.
+    """
+    return await prioritizer_lane.run(lambda _attempt: _run_prioritizer(user_id, session_id, text, tz_name), deadline)
 
 
-def _parse_task_list_payload(payload):
-    if isinstance(payload, list):
-        return payload
+async def _run_prioritizer(user_id: str, session_id: str, text: str, tz_name: str | None) -> str:
+    await _ensure_session(user_id, session_id, tz_name)
+    agent_runner = await runner.aget()
+    from google.genai import types
 
-    if isinstance(payload, dict):
-        for key in ("tasks", "final_tasks", "task_list", "list"):
-            value = payload.get(key)
-            if isinstance(value, list):
-                return value
+    msg = types.Content(role="user", parts=[types.Part(text=text)])
+    reply = ""
 
-    return None
+    with span("llm.prioritizer"):
+        async for event in agent_runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=msg,
+            state_delta=_timezone_delta(tz_name),
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                reply = _event_text(event)
+                break
 
+    return reply or "No response from agent."
 
-def parse_final_tasks(reply: str):
-    candidate = _extract_json_candidate(reply)
-    if not candidate:
-        return None
 
-    parse_attempts = [candidate]
+async def stream_prioritizer_agent(user_id: str, session_id: str, text: str, tz_name: str | None = None, deadline: float | None = None):
+    """Like call_prioritizer_agent, but yields text as the model generates it.
 
-    # Fallback for extra leading/trailing prose around a JSON array/object.
-    array_match = re.search(r"\[[\s\S]*\]", candidate)
-    object_match = re.search(r"\{[\s\S]*\}", candidate)
-    if array_match:
-        parse_attempts.append(array_match.group(0))
-    if object_match:
-        parse_attempts.append(object_match.group(0))
+    Yields ("delta", chunk) for each partial event, then ("final", reply) once.
+    The lane slot is held, and the deadline enforced, until the reply is
+    complete; close the generator early (aclosing) to give the slot back.
+    """
+    deadline = deadline if deadline is not None else prioritizer_lane.deadline()
+    final = "No response from agent."
+    async with prioritizer_lane.slot(deadline):
+        await _ensure_session(user_id, session_id, tz_name)
+        agent_runner = await runner.aget()
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai import types
 
-    for attempt in parse_attempts:
+        msg = types.Content(role="user", parts=[types.Part(text=text)])
+        events = agent_runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=msg,
+            state_delta=_timezone_delta(tz_name),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        )
+        started = time.perf_counter()
+        first_token = True
         try:
-            parsed = json.loads(attempt)
-        except (json.JSONDecodeError, TypeError):
-            continue
+            async for event in prioritizer_lane.iterate(events, deadline):
+                if not (event.content and event.content.parts):
+                    continue
+                if first_token:
+                    record("llm.prioritizer.first_token", time.perf_counter() - started)
+                    first_token = False
+                if event.partial:
+                    chunk = _event_text(event)
+                    if chunk:
+                        yield "delta", chunk
+                elif event.is_final_response():
+                    final = _event_text(event) or final
+                    break
+        finally:
+            record("llm.prioritizer", time.perf_counter() - started)
+            await events.aclose()
+
+    # outside the slot: the call has succeeded, and the slot is free while
+    # the caller saves the turn
+    yield "final", final
 
-        final_tasks = _parse_task_list_payload(parsed)
-        if final_tasks is not None:
-            return final_tasks
 
-    return None
+def parse_final_tasks(reply: str):
+    """The validated task list in a final agent reply, or None if it has none.
+
+    The prioritizer has tools and asks follow-up questions in prose, so it
+    cannot be held to a response schema; the list is found by the same
+    incremental parser the stream uses and validated against TaskItem. A
+    list none of whose items is a task is not a list either: an empty list
+    is a turn with no tasks, a list of junk is a reply that failed to parse.
+    """
+    with span("parse"):
+        items = parse_array_items(reply)
+        if items is None:
+            return None
+        tasks = validate_tasks(items)
+        return tasks if tasks or not items else None
 
 
 def _safe_int(value, default: int) -> int:
@@ -106,43 +155,69 @@ def _safe_int(value, default: int) -> int:
         return default
 
 
-def save_tasks_for_session(user_id: str, session_id: str, final_tasks: list[dict]) -> list[dict]:
-    now = datetime.now(timezone.utc)
-    saved_tasks = []
+def _task_payload(user_id: str, session_id: str, idx: int, task: dict, now: datetime) -> dict:
+    return {
+        "task_id": f"{session_id}-{idx}",
+        "user_id": user_id,
+        "session_id": session_id,
+        "priority_rank": _safe_int(task.get("priority_rank"), idx),
+        "task_name": task.get("task_name"),
+        "category": task.get("category", "Other"),
+        "estimated_time": _safe_int(task.get("estimated_time"), 0),
+        "urgency": task.get("urgency"),
+        "stress_level": task.get("stress_level"),
+        "summary": task.get("summary"),
+        "hour_of_day": now.hour,
+        "day_of_week": now.weekday(),
+        "estimated_subtasks": 1,
+        "is_vague": False,
+        "has_dependencies": False,
+    }
+
+
+def _task_write(payload: dict, exists: bool, now: datetime) -> tuple:
+    if exists:
+        return ("tasks", payload["task_id"], payload, True)
+    payload["created_at"] = now.isoformat()
+    payload["completed"] = False
+    return ("tasks", payload["task_id"], payload, False)
+
+
+async def prepare_task_writes(user_id: str, session_id: str, final_tasks: list[dict]) -> tuple[list[dict], list[tuple]]:
+    """Build the task documents for a finished list without writing them.
 
+    Existence is checked with one multi-document read. Returns the saved task
+    payloads and the (collection, doc_id, data, merge) writes for commit_batch,
+    so the caller can commit them together with the session document.
+    """
+    now = datetime.now(timezone.utc)
     valid_tasks = [t for t in final_tasks if isinstance(t, dict)]
-    for idx, task in enumerate(valid_tasks, start=1):
-        task_id = f"{session_id}-{idx}"
-        task_ref = db.collection("tasks").document(task_id)
-        task_doc = task_ref.get()
-
-        payload = {
-            "task_id": task_id,
-            "user_id": user_id,
-            "session_id": session_id,
-            "priority_rank": _safe_int(task.get("priority_rank"), idx),
-            "task_name": task.get("task_name"),
-            "category": task.get("category", "Other"),
-            "estimated_time": _safe_int(task.get("estimated_time"), 0),
-            "urgency": task.get("urgency"),
-            "stress_level": task.get("stress_level"),
-            "summary": task.get("summary"),
-            "hour_of_day": now.hour,
-            "day_of_week": now.weekday(),
-            "estimated_subtasks": 1,
-            "is_vague": False,
-            "has_dependencies": False,
-        }
+    saved_tasks = [_task_payload(user_id, session_id, idx, task, now) for idx, task in enumerate(valid_tasks, start=1)]
+    existing = await repository.get_many("tasks", [payload["task_id"] for payload in saved_tasks])
+    writes = [_task_write(payload, payload["task_id"] in existing, now) for payload in saved_tasks]
+    return saved_tasks, writes
 
-        if not task_doc.exists:
-            payload["created_at"] = now.isoformat()
-            payload["completed"] = False
-            task_ref.set(payload)
-        else:
-            task_ref.set(payload, merge=True)
 
-        saved_tasks.append(payload)
+async def save_streamed_task(user_id: str, session_id: str, idx: int, task: dict) -> dict:
+    """Write task number `idx` of a list that is still being generated.
+
+    Create-if-absent like prepare_task_writes, in one transaction per task,
+    so each task is stored while the model is still writing the next.
+    """
+    now = datetime.now(timezone.utc)
+    payload = _task_payload(user_id, session_id, idx, task, now)
+
+    def save(txn):
+        collection, doc_id, data, merge = _task_write(dict(payload), txn.get("tasks", payload["task_id"]) is not None, now)
+        txn.set(collection, doc_id, data, merge)
+        return data
 
+    return await repository.run_transaction(save)
+
+
+async def save_tasks_for_session(user_id: str, session_id: str, final_tasks: list[dict]) -> list[dict]:
+    saved_tasks, writes = await prepare_task_writes(user_id, session_id, final_tasks)
+    await repository.commit_batch(writes)
     return saved_tasks
 
 
@@ -152,71 +227,332 @@ class ChatMessage(BaseModel):
     session_id: str
     user_id: str
     message: str
+    # IANA name (e.g. "Europe/Paris") for the date and hour the agent plans with;
+    # kept in the session, so later turns may omit it
+    timezone: str | None = None
+    # return history entries with seq >= since; omit to get only this turn
+    since: int | None = Field(default=None, ge=0)
 
-@router.post("/chat")
-async def chat(body: ChatMessage):
-    # reference the session document in Firestore
-    session_ref = db.collection("sessions").document(body.session_id)
-    # fetches the existing session document, if it exists
-    session_doc = session_ref.get()
 
-    if session_doc.exists:
-        history = session_doc.to_dict().get("history", [])
-    else:
-        history = []
-    
-    # append the new message to the history
-    history.append({
-        "role": "user",
-        "message": body.message
-    })
+def _messages_path(session_id: str) -> str:
+    return f"sessions/{session_id}/messages"
 
-    try:
-        raw_agent_reply = await call_prioritizer_agent(
-            user_id=body.user_id,
-            session_id=body.session_id,
-            text=body.message,
-        )
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Prioritizer agent failed: {exc}") from exc
-    final_tasks = parse_final_tasks(raw_agent_reply)
-    is_ready = final_tasks is not None
-    agent_reply = FINAL_LIST_MESSAGE if is_ready else raw_agent_reply
-    saved_tasks = save_tasks_for_session(body.user_id, body.session_id, final_tasks) if is_ready else []
 
-    history.append({
-        "role": "agent",
-        "message": agent_reply
-    })
+def _message_id(seq: int) -> str:
+    # zero-padded so document ids sort in sequence order
+    return f"{seq:08d}"
+
 
-    # save the updated history back to Firestore
+async def _load_session(session_id: str) -> dict:
+    # fetches the existing session document, if it exists
+    return await repository.get_doc("sessions", session_id) or {}
+
+
+def _reserve_seqs(txn, session_id: str, user_id: str, count: int) -> int:
+    """Take the session's next `count` message seqs; returns the first one.
+
+    A transaction, so concurrent turns on one session get disjoint ranges.
+    """
+    data = txn.get("sessions", session_id) or {}
+    # a session from before the message log has its history inline, and
+    # its first logged seq follows it
+    first_seq = data.get("message_count", len(data.get("history") or []))
+    txn.set("sessions", session_id, {"user_id": user_id, "message_count": first_seq + count}, merge=True)
+    return first_seq
+
+
+async def _migrate_legacy_history(session_id: str, session_data: dict):
+    """Copy the inline history of a session from before the message log into the log.
+
+    Runs before the turn reserves its seqs, and only while the session has
+    no message_count. The copies get fixed ids (seq 0..n-1), so a migration
+    that fails halfway, or runs in two turns at once, is simply redone.
+    """
+    if "message_count" in session_data:
+        return
+    legacy_history = session_data.get("history") or []
+    writes = [
+        (_messages_path(session_id), _message_id(seq), {"role": entry.get("role"), "message": entry.get("message"), "seq": seq}, False)
+        for seq, entry in enumerate(legacy_history)
+    ]
+    await repository.commit_batch(writes)
+
+
+async def _finish_turn(
+    body: ChatMessage,
+    session_data: dict,
+    raw_agent_reply: str,
+    final_tasks: list[dict] | None = None,
+    saved_tasks: list[dict] | None = None,
+) -> dict:
+    """Parse the agent reply, persist tasks and the new turn, and build the /chat response.
+
+    final_tasks skips parsing when the caller already has the validated list,
+    and saved_tasks skips writing the tasks when the caller already has.
+    History is an append-only log under sessions/{id}/messages, one document
+    per message keyed by its sequence number, so a turn writes only its own
+    two messages no matter how long the session is. The seqs are reserved in
+    a transaction on the session document, so concurrent turns never collide.
+    """
+    if final_tasks is None:
+        final_tasks = parse_final_tasks(raw_agent_reply)
+    is_ready = final_tasks is not None
+    agent_reply = FINAL_LIST_MESSAGE if is_ready else raw_agent_reply
+    if not is_ready:
+        saved_tasks, writes = [], []
+    elif saved_tasks is None:
+        saved_tasks, writes = await prepare_task_writes(body.user_id, body.session_id, final_tasks)
+    else:
+        writes = []
+
+    await _migrate_legacy_history(body.session_id, session_data)
+    new_messages = [
+        {"role": "user", "message": body.message},
+        {"role": "agent", "message": agent_reply},
+    ]
+    first_seq = await repository.run_transaction(
+        lambda txn: _reserve_seqs(txn, body.session_id, body.user_id, len(new_messages))
+    )
+    message_count = first_seq + len(new_messages)
+    now = datetime.now(timezone.utc).isoformat()
+    for seq, entry in enumerate(new_messages, start=first_seq):
+        entry["seq"] = seq
+        writes.append((_messages_path(body.session_id), _message_id(seq), {**entry, "created_at": now}, False))
+
+    # the session document holds the seq counter (kept by _reserve_seqs) and
+    # the latest list, written in the same batch as the tasks and messages
     payload = {
         "user_id": body.user_id,
-        "history": history,
         "list_ready": is_ready,
         "final_tasks": final_tasks if is_ready else None,
         "saved_tasks": saved_tasks if is_ready else [],
     }
-    session_ref.set(payload)
+    writes.append(("sessions", body.session_id, payload, True))
+    await repository.commit_batch(writes)
+    if is_ready:
+        task_view_cache.invalidate(body.user_id)
+
+    since = first_seq if body.since is None else body.since
+    history = [m for m in new_messages if m["seq"] >= since]
+    if since < first_seq:
+        history = await load_history(body.session_id, since, first_seq) + history
 
     return {
         "session_id": body.session_id,
         "reply": agent_reply,
         "history": history,
+        "cursor": message_count,
         "list_ready": is_ready,
         "tasks": saved_tasks,
     }
 
 
+async def load_history(session_id: str, since: int = 0, until: int | None = None, limit: int | None = None) -> list[dict]:
+    """Messages with since <= seq < until, in order."""
+    filters = [("seq", ">=", since)]
+    if until is not None:
+        filters.append(("seq", "<", until))
+    docs = await repository.query_docs(
+        _messages_path(session_id),
+        filters,
+        order_by=[("seq", repository.ASCENDING)],
+        limit=limit,
+    )
+    return [
+        {"role": data.get("role"), "message": data.get("message"), "seq": data.get("seq")}
+        for _, data in docs
+    ]
+
+
+def _request_deadline(request_timeout: float | None) -> float:
+    # a client that gives up sooner than the lane timeout says so in
+    # X-Request-Timeout (seconds); leave a little time to write the turn
+    budget = None if request_timeout is None else max(0.0, request_timeout - 1)
+    return prioritizer_lane.deadline(budget)
+
+
+async def _degraded_turn(body: ChatMessage, session_data: dict, exc: LLMUnavailable) -> dict:
+    """The last saved list when the agent is unavailable; the error if there is none.
+
+    Nothing is written: the user's message was not answered, so it is not
+    added to the history.
+    """
+    saved_tasks = session_data.get("saved_tasks") or []
+    if not (session_data.get("list_ready") and saved_tasks):
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+    return {
+        "session_id": body.session_id,
+        "reply": DEGRADED_MESSAGE,
+        "history": [],
+        "cursor": session_data.get("message_count", 0),
+        "list_ready": True,
+        "tasks": saved_tasks,
+        "degraded": True,
+    }
+
+
+def _check_timezone(tz_name: str | None):
+    try:
+        flower_stats.get_zone(tz_name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/chat")
+async def chat(body: ChatMessage, request_timeout: float | None = Header(default=None, alias="X-Request-Timeout", gt=0)):
+    _check_timezone(body.timezone)
+    session_data = await _load_session(body.session_id)
+
+    try:
+        raw_agent_reply = await call_prioritizer_agent(
+            user_id=body.user_id,
+            session_id=body.session_id,
+            text=body.message,
+            tz_name=body.timezone,
+            deadline=_request_deadline(request_timeout),
+        )
+    except LLMUnavailable as exc:
+        return await _degraded_turn(body, session_data, exc)
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"Prioritizer agent failed: {exc}") from exc
+
+    return await _finish_turn(body, session_data, raw_agent_reply)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _looks_like_task_list(text: str) -> bool:
+    return text.lstrip().startswith(("[", "{", "```"))
+
+
+# ---------------------------------------------------------------------------
+# POST /chat/stream
+# Same turn as POST /chat, as Server-Sent Events:
+#   event: delta  data: {"text": "..."}   partial agent text, as generated
+#   event: task   data: {...}             one validated task of the final
+#                                         list, as soon as its object closes;
+#                                         it is saved at the same time
+#   event: done   data: {...}             the full /chat response body
+#   event: error  data: {"detail": "..."}
+# Deltas stop once the reply turns out to be the JSON task list; tasks then
+# arrive one by one, and the saved list in the done event. Each task is
+# written while the model generates the next, so only the session and the
+# messages are left to write after the list closes; a stream that fails
+# halfway leaves the tasks it already produced. If the agent is
+# unavailable before anything was streamed, done carries the last saved list
+# (see POST /chat) or error the reason.
+# ---------------------------------------------------------------------------
+@router.post("/chat/stream")
+async def chat_stream(body: ChatMessage, request_timeout: float | None = Header(default=None, alias="X-Request-Timeout", gt=0)):
+    _check_timezone(body.timezone)
+    session_data = await _load_session(body.session_id)
+    deadline = _request_deadline(request_timeout)
+
+    async def events():
+        streamed = ""
+        items = JsonArrayItems()
+        streamed_tasks = []
+        saves = []
+        agent_events = stream_prioritizer_agent(
+            user_id=body.user_id,
+            session_id=body.session_id,
+            text=body.message,
+            tz_name=body.timezone,
+            deadline=deadline,
+        )
+        try:
+            # closed as soon as the loop is left, which frees the lane slot
+            async with aclosing(agent_events):
+                async for kind, text in agent_events:
+                    if kind == "final":
+                        raw_agent_reply = text
+                        break
+                    was_list = _looks_like_task_list(streamed)
+                    streamed += text
+                    if not was_list and not _looks_like_task_list(streamed):
+                        yield _sse("delta", {"text": text})
+                    for task in validate_tasks(items.feed(text)):
+                        streamed_tasks.append(task)
+                        save = asyncio.ensure_future(
+                            save_streamed_task(body.user_id, body.session_id, len(streamed_tasks), task)
+                        )
+                        # the task is stored even if the turn fails later on
+                        save.add_done_callback(lambda _: task_view_cache.invalidate(body.user_id))
+                        saves.append(save)
+                        yield _sse("task", task)
+        except LLMUnavailable as exc:
+            if streamed:
+                yield _sse("error", {"detail": exc.detail})
+                return
+            try:
+                yield _sse("done", await _degraded_turn(body, session_data, exc))
+            except HTTPException as unavailable:
+                yield _sse("error", {"detail": unavailable.detail, "status": unavailable.status_code})
+            return
+        except Exception as exc:
+            yield _sse("error", {"detail": f"Prioritizer agent failed: {exc}"})
+            return
+
+        try:
+            saved_tasks = list(await asyncio.gather(*saves))
+        except Exception as exc:
+            yield _sse("error", {"detail": f"Could not save the task list: {exc}"})
+            return
+        # the deltas normally add up to the final text; if they did not, parse
+        # it, and the final list is written over the streamed one. Without a
+        # streamed task, parsing also tells a list of junk from an empty list.
+        if items.complete and streamed == raw_agent_reply and streamed_tasks:
+            done = await _finish_turn(body, session_data, raw_agent_reply, streamed_tasks, saved_tasks)
+        else:
+            done = await _finish_turn(body, session_data, raw_agent_reply)
+        yield _sse("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# GET /chat/{session_id}/history?since=&limit=
+# Pages through the message log; pass the returned cursor as the next since.
+# ---------------------------------------------------------------------------
+@router.get("/chat/{session_id}/history")
+async def get_chat_history(session_id: str, since: int = Query(default=0, ge=0), limit: int = Query(default=100, ge=1, le=500)):
+    session_data = await _load_session(session_id)
+    if not session_data:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    if "message_count" not in session_data:
+        legacy = [
+            {"role": entry.get("role"), "message": entry.get("message"), "seq": seq}
+            for seq, entry in enumerate(session_data.get("history", []))
+        ]
+        history = legacy[since:since + limit]
+    else:
+        history = await load_history(session_id, since, limit=limit)
+
+    return {
+        "session_id": session_id,
+        "history": history,
+        "cursor": history[-1]["seq"] + 1 if history else since,
+    }
+
+
 @router.get("/chat/{session_id}/tasks")
 async def get_final_task_list(session_id: str):
-    session_ref = db.collection("sessions").document(session_id)
-    session_doc = session_ref.get()
+    data = await repository.get_doc("sessions", session_id)
 
-    if not session_doc.exists:
+    if data is None:
         raise HTTPException(status_code=404, detail="Session not found.")
 
-    data = session_doc.to_dict() or {}
     if not data.get("list_ready"):
         return {
             "session_id": session_id,
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from agents.floweragent.catalog import get_catalog
+from db.cache import etag_matches
+
+router = APIRouter()
+
+# Versioned URLs (?v=<digest>) never change content, so they can be cached forever.
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, max-age=86400, must-revalidate"
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    header = request.headers.get("accept-encoding", "")
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() == encoding:
+            return params.replace(" ", "") != "q=0"
+    return False
+
+
+# ---------------------------------------------------------------------------
+# GET /flowers/assets
+# Lists every indexed flower SVG with its tier and versioned URL.
+# ---------------------------------------------------------------------------
+@router.get("/flowers/assets")
+async def list_flower_assets():
+    return {
+        "assets": [
+            {
+                "name": asset.name,
+                "tier": asset.tier,
+                "size": asset.size,
+                "etag": asset.etag,
+                "url": asset.url,
+            }
+            for asset in get_catalog().assets
+        ]
+    }
+
+
+# ---------------------------------------------------------------------------
+# GET /flowers/assets/{name}
+# Serves one minified SVG, pre-compressed when the client accepts it.
+# Answers 304 when the client already holds the current version.
+# ---------------------------------------------------------------------------
+@router.get("/flowers/assets/{name}")
+async def get_flower_asset(name: str, request: Request, v: str | None = None):
+    asset = get_catalog().get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Flower asset not found.")
+
+    body, encoding, etag = asset.body, None, asset.etag
+    if asset.br_body is not None and _accepts(request, "br"):
+        body, encoding, etag = asset.br_body, "br", f'"{asset.digest}-br"'
+    elif _accepts(request, "gzip"):
+        body, encoding, etag = asset.gzip_body, "gzip", f'"{asset.digest}-gz"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE if v == asset.digest else REVALIDATE_CACHE,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="image/svg+xml", headers=headers)
@@ -1,18 +1,59 @@
+import asyncio
 import json
+import logging
+import os
+import uuid
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from agents.floweragent.agent import root_agent
-from db.firebase import db
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
+from agents.floweragent.catalog import get_catalog
+from agents.floweragent.rules import award_flower
+from agents.floweragent.schemas import parse_award
+from api.llm_scheduler import LLMUnavailable, flower_lane
+from api.providers import Lazy, provider, session_service
+from db import flower_stats, repository
+from db.cache import award_flights
+from metrics import span
+
+logger = logging.getLogger(__name__)
 
 APP_NAME = "bonita-flower-award"
-session_service = InMemorySessionService()
-runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+MESSAGE_APP_NAME = "bonita-flower-message"
+
+
+@provider("flower_runner")
+def runner():
+    from google.adk.runners import Runner
+    from agents.floweragent.agent import root_agent
+    return Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service.get())
+
+
+@provider("flower_message_runner")
+def message_runner():
+    from google.adk.runners import Runner
+    from agents.floweragent.agent import message_agent
+    return Runner(agent=message_agent, app_name=MESSAGE_APP_NAME, session_service=session_service.get())
+
+
+# How awards are decided:
+#   "llm"    - the flower agent picks the flower and writes the message
+#   "hybrid" - the local rule engine picks the flower, the LLM only writes
+#              congrats_message (template message if the LLM fails)
+#   "rules"  - rule engine and template message only, no LLM call
+AWARD_MODES = {"llm", "hybrid", "rules"}
+AWARD_MODE = os.getenv("FLOWER_AWARD_MODE", "hybrid").strip().lower()
+if AWARD_MODE not in AWARD_MODES:
+    AWARD_MODE = "hybrid"
+MAX_MESSAGE_LENGTH = 200
+# A worker about to call the LLM for an award holds a claim on the task until
+# it has saved the award or given up, and at most this long should it die;
+# the same award requested on another worker waits for it instead of paying
+# for a second call.
+CLAIM_COLLECTION = "award_claims"
+CLAIM_SECONDS = 45
+CLAIM_POLL_SECONDS = 0.5
 
 router = APIRouter()
 
@@ -20,102 +61,209 @@ router = APIRouter()
 class AwardRequest(BaseModel):
     task_id: str
     user_id: str
+    # IANA name (e.g. "Europe/Paris") that decides which day the flower counts for
+    timezone: str | None = None
 
 
 def dt_to_iso(value):
     return value.isoformat() if hasattr(value, "isoformat") else value
 
 
-async def call_flower_agent(user_id: str, session_id: str, text: str) -> str:
-    existing = await session_service.get_session(
-        app_name=APP_NAME,
+def asset_url(flower_name) -> str | None:
+    asset = get_catalog().get(flower_name) if flower_name else None
+    return asset.url if asset else None
+
+
+def award_response(flower: dict) -> dict:
+    return {
+        "task_id": flower.get("task_id"),
+        "user_id": flower.get("user_id"),
+        "selected_flower": flower.get("flower_type_id"),
+        "tier": flower.get("tier"),
+        "congrats_message": flower.get("message"),
+        "earned_at": dt_to_iso(flower.get("earned_at")),
+        "asset_url": asset_url(flower.get("flower_type_id")),
+    }
+
+
+def _zone_or_400(name: str | None):
+    try:
+        return flower_stats.get_zone(name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _save_award(txn, flower: dict, tz_name: str | None) -> dict:
+    """Write the flower and update user_stats atomically; create-if-absent.
+
+    Also drops the task's award claim, whoever holds it: with the award
+    stored there is nothing left to wait for. Returns the stored flower
+    document, which is the existing one if another request already awarded
+    this task.
+    """
+    user_id = flower["user_id"]
+    existing = txn.get("flowers", flower["task_id"])
+    stats = txn.get(flower_stats.COLLECTION, user_id)
+    txn.delete(CLAIM_COLLECTION, flower["task_id"])
+    if existing is not None:
+        return existing
+
+    tz_name = tz_name or (stats or {}).get("timezone")
+    stats = stats or flower_stats.empty_stats(user_id, tz_name)
+    if tz_name:
+        stats["timezone"] = tz_name
+    award_date = flower_stats.local_date(flower["earned_at"], flower_stats.get_zone(tz_name))
+    txn.set("flowers", flower["task_id"], flower)
+    txn.set(flower_stats.COLLECTION, user_id, flower_stats.apply_award(stats, award_date, flower["tier"]))
+    return flower
+
+
+def _claim_held(claim: dict | None, now: datetime) -> bool:
+    expires_at = flower_stats.to_datetime((claim or {}).get("expires_at"))
+    return expires_at is not None and expires_at > now
+
+
+def _claim_award(txn, task_id: str, token: str) -> bool:
+    """Take the task's award claim unless the award exists or someone else holds it."""
+    now = datetime.now(timezone.utc)
+    if txn.get("flowers", task_id) is not None:
+        return False
+    claim = txn.get(CLAIM_COLLECTION, task_id)
+    if claim is not None and claim.get("token") != token and _claim_held(claim, now):
+        return False
+    txn.set(CLAIM_COLLECTION, task_id, {"token": token, "expires_at": now + timedelta(seconds=CLAIM_SECONDS)})
+    return True
+
+
+def _release_claim(txn, task_id: str, token: str):
+    """Drop the claim if it is still ours; it may have expired and been taken over."""
+    claim = txn.get(CLAIM_COLLECTION, task_id)
+    if claim is not None and claim.get("token") == token:
+        txn.delete(CLAIM_COLLECTION, task_id)
+
+
+async def _claim_or_wait(task_id: str, token: str) -> dict | None:
+    """Take the task's award claim, or wait for the worker that holds it.
+
+    Returns the award if that worker stored one, or None once this worker
+    holds the claim: the holder may have given up (released the claim) or
+    died (the claim expired), and then this worker makes the award.
+    """
+    while not await repository.run_transaction(lambda txn: _claim_award(txn, task_id, token)):
+        while True:
+            await asyncio.sleep(CLAIM_POLL_SECONDS)
+            flower, claim = await repository.get_docs(("flowers", task_id), (CLAIM_COLLECTION, task_id))
+            if flower is not None:
+                return flower
+            if not _claim_held(claim, datetime.now(timezone.utc)):
+                break
+    return None
+
+
+async def call_flower_agent(user_id: str, session_id: str, text: str, agent_runner: Lazy = runner) -> str:
+    """Run one award prompt through the flower lane and return the reply text.
+
+    Raises LLMUnavailable when the lane is saturated, its breaker is open or
+    the call runs out of time. A hedged second attempt gets its own session.
+    """
+    return await flower_lane.run(
+        lambda attempt: _run_flower_agent(user_id, f"{session_id}-{attempt}" if attempt else session_id, text, agent_runner)
+    )
+
+
+async def _run_flower_agent(user_id: str, session_id: str, text: str, agent_runner: Lazy) -> str:
+    # award sessions are never reused, so the session is deleted afterwards
+    # instead of accumulating in the session store
+    sessions = await session_service.aget()
+    agent_runner = await agent_runner.aget()
+    from google.genai import types
+
+    existing = await sessions.get_session(
+        app_name=agent_runner.app_name,
         user_id=user_id,
         session_id=session_id,
     )
     if not existing:
-        await session_service.create_session(
-            app_name=APP_NAME,
+        await sessions.create_session(
+            app_name=agent_runner.app_name,
             user_id=user_id,
             session_id=session_id,
         )
 
     msg = types.Content(role="user", parts=[types.Part(text=text)])
     reply = ""
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=msg,
-    ):
-        if event.is_final_response() and event.content and event.content.parts:
-            reply = "".join(p.text for p in event.content.parts if getattr(p, "text", None))
-            break
+    try:
+        with span(f"llm.{agent_runner.app_name}"):
+            async for event in agent_runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=msg,
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    reply = "".join(p.text for p in event.content.parts if getattr(p, "text", None))
+                    break
+    finally:
+        await sessions.delete_session(
+            app_name=agent_runner.app_name,
+            user_id=user_id,
+            session_id=session_id,
+        )
     return reply or ""
 
 
-def parse_award_response(reply: str) -> dict | None:
+async def write_congrats_message(user_id: str, task_payload: dict, award: dict) -> str | None:
+    """Ask the LLM for the congrats sentence only; None if it fails."""
     try:
-        cleaned = (
-            reply.strip()
-            .removeprefix("```json")
-            .removeprefix("```")
-            .removesuffix("```")
-            .strip()
+        reply = await call_flower_agent(
+            user_id=user_id,
+            session_id=f"award-message-{task_payload['task_id']}",
+            text=json.dumps({**task_payload, "selected_flower": award["selected_flower"], "tier": award["tier"]}),
+            agent_runner=message_runner,
         )
-        parsed = json.loads(cleaned)
-    except (json.JSONDecodeError, TypeError):
+    except Exception:
         return None
 
-    if not isinstance(parsed, dict):
+    lines = [line.strip() for line in reply.strip().splitlines() if line.strip()]
+    message = lines[0].strip('"\'` ') if lines else ""
+    if not message or message.startswith("{"):
         return None
-
-    selected_flower = parsed.get("selected_flower")
-    tier = parsed.get("tier")
-    congrats_message = parsed.get("congrats_message")
-    if not all(isinstance(v, str) and v.strip() for v in [selected_flower, tier, congrats_message]):
-        return None
-
-    return {
-        "selected_flower": selected_flower.strip(),
-        "tier": tier.strip().upper(),
-        "congrats_message": congrats_message.strip(),
-    }
+    return message[:MAX_MESSAGE_LENGTH]
 
 
 # ---------------------------------------------------------------------------
 # POST /flowers/award
-# Called after a task is completed. Asks the agent which flower to give,
-# then writes one document to the flowers collection.
+# Called after a task is completed. Picks the flower (rule engine or agent,
+# see FLOWER_AWARD_MODE), then writes one document to the flowers collection.
+# Repeated calls for a task all get the one award: concurrent calls share a
+# single run, and the write is create-if-absent.
 # ---------------------------------------------------------------------------
 @router.post("/flowers/award")
 async def award_flowers(body: AwardRequest):
-    existing_award_doc = db.collection("flowers").document(body.task_id).get()
-    if existing_award_doc.exists:
-        existing_award = existing_award_doc.to_dict() or {}
+    _zone_or_400(body.timezone)
+    return await award_flights.do((body.task_id, body.user_id), lambda: _award(body))
+
+
+async def _award(body: AwardRequest) -> dict:
+    # the three reads are independent, so fetch them concurrently
+    existing_award, completed, task = await repository.get_docs(
+        ("flowers", body.task_id),
+        ("completed_tasks", body.task_id),
+        ("tasks", body.task_id),
+    )
+    if existing_award is not None:
         if existing_award.get("user_id") != body.user_id:
             raise HTTPException(status_code=403, detail="Task does not belong to this user.")
-        return {
-            "task_id": body.task_id,
-            "user_id": body.user_id,
-            "selected_flower": existing_award.get("flower_type_id"),
-            "tier": existing_award.get("tier"),
-            "congrats_message": existing_award.get("message"),
-            "earned_at": dt_to_iso(existing_award.get("earned_at")),
-        }
-
-    # fetch completed_tasks record
-    completed_doc = db.collection("completed_tasks").document(body.task_id).get()
-    if not completed_doc.exists:
+        return award_response(existing_award)
+
+    if completed is None:
         raise HTTPException(status_code=404, detail="Completed task not found.")
 
-    completed = completed_doc.to_dict() or {}
     if completed.get("user_id") != body.user_id:
         raise HTTPException(status_code=403, detail="Task does not belong to this user.")
 
-    # fetch original task for full context
-    task_doc = db.collection("tasks").document(body.task_id).get()
-    if not task_doc.exists:
+    # original task for full context
+    if task is None:
         raise HTTPException(status_code=404, detail="Original task not found.")
-    task = task_doc.to_dict() or {}
 
     # build task payload for agent
     task_payload = {
@@ -134,63 +282,108 @@ async def award_flowers(body: AwardRequest):
         "completed_at": str(completed.get("completed_at")),
     }
 
-    # call agent
-    raw_reply = await call_flower_agent(
-        user_id=body.user_id,
-        session_id=f"award-{body.task_id}",
-        text=json.dumps(task_payload),
-    )
-    award = parse_award_response(raw_reply)
-    if not award:
-        raise HTTPException(status_code=422, detail="Agent did not return valid flower award JSON.")
-
-    valid_tiers = {"EXCELLENT", "MEDIUM", "SMALL", "MICRO"}
-    if award["tier"] not in valid_tiers:
-        raise HTTPException(status_code=422, detail=f"Invalid tier from agent: {award['tier']}")
+    if AWARD_MODE == "rules":
+        return await _store_award(body, _rules_award(task_payload, body.task_id))
 
-    # write to flowers collection
-    awarded_at = datetime.now(timezone.utc)
-    db.collection("flowers").document(body.task_id).set({
+    # another worker may already be paying for this award's LLM call
+    token = uuid.uuid4().hex
+    existing_award = await _claim_or_wait(body.task_id, token)
+    if existing_award is not None:
+        return award_response(existing_award)
+    saved = False
+    try:
+        award = await (_llm_award if AWARD_MODE == "llm" else _hybrid_award)(body, task_payload)
+        response = await _store_award(body, award)
+        saved = True
+        return response
+    finally:
+        if not saved:
+            # let a retry on any worker go ahead now instead of after CLAIM_SECONDS
+            try:
+                await repository.run_transaction(lambda txn: _release_claim(txn, body.task_id, token))
+            except Exception:
+                logger.exception("could not release the award claim on task %s", body.task_id)
+
+
+def _rules_award(task_payload: dict, task_id: str) -> dict:
+    # seeded by task_id, so a retried award picks the same flower
+    return award_flower(task_payload, seed=task_id)
+
+
+async def _hybrid_award(body: AwardRequest, task_payload: dict) -> dict:
+    award = _rules_award(task_payload, body.task_id)
+    message = await write_congrats_message(body.user_id, task_payload, award)
+    if message:
+        award["congrats_message"] = message
+    return award
+
+
+async def _llm_award(body: AwardRequest, task_payload: dict) -> dict:
+    # call agent; when it is unavailable or fails the award degrades to the
+    # rule engine rather than failing the request, as in hybrid mode
+    try:
+        raw_reply = await call_flower_agent(
+            user_id=body.user_id,
+            session_id=f"award-{body.task_id}",
+            text=json.dumps(task_payload),
+        )
+    except LLMUnavailable:
+        raw_reply = ""
+    except Exception:
+        logger.exception("flower agent failed on task %s, awarding by rules", body.task_id)
+        raw_reply = ""
+    # the agent answers in the FlowerAward schema; a reply that does not
+    # validate gets the rule engine's award instead of failing the request
+    award = parse_award(raw_reply)
+    asset = get_catalog().resolve(award["selected_flower"], tier=award["tier"]) if award else None
+    if award is None:
+        return _rules_award(task_payload, body.task_id)
+    if asset is not None:
+        # correct misspelled filenames
+        award["selected_flower"] = asset.name
+    else:
+        # the agent invented a flower: the rule engine picks one, the
+        # agent's message stays
+        fallback = _rules_award(task_payload, body.task_id)
+        award["selected_flower"], award["tier"] = fallback["selected_flower"], fallback["tier"]
+    return award
+
+
+async def _store_award(body: AwardRequest, award: dict) -> dict:
+    # write to flowers collection, together with the user's streak counters
+    flower = {
         "task_id": body.task_id,
         "user_id": body.user_id,
         "flower_type_id": award["selected_flower"],
         "tier": award["tier"],
         "message": award["congrats_message"],
-        "earned_at": awarded_at,
-    })
-
-    return {
-        "task_id": body.task_id,
-        "user_id": body.user_id,
-        "selected_flower": award["selected_flower"],
-        "tier": award["tier"],
-        "congrats_message": award["congrats_message"],
-        "earned_at": awarded_at.isoformat(),
+        "earned_at": datetime.now(timezone.utc),
     }
+    stored = await repository.run_transaction(lambda txn: _save_award(txn, flower, body.timezone))
+    return award_response(stored)
 
 
 # ---------------------------------------------------------------------------
 # GET /flowers/bouquet/{user_id}
-# Returns all flowers earned today for the given user.
+# Returns all flowers earned today for the given user; "today" is in the
+# IANA timezone tz (default UTC).
 # ---------------------------------------------------------------------------
 @router.get("/flowers/bouquet/{user_id}")
-async def get_active_bouquet(user_id: str):
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+async def get_active_bouquet(user_id: str, tz: str | None = None):
+    zone = _zone_or_400(tz)
+    today_start = datetime.now(zone).replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow_start = today_start + timedelta(days=1)
 
-    docs = (
-        db.collection("flowers")
-        .where("user_id", "==", user_id)
-        .where("earned_at", ">=", today_start)
-        .where("earned_at", "<", tomorrow_start)
-        .stream()
-    )
+    docs = await repository.query_docs("flowers", [
+        ("user_id", "==", user_id),
+        ("earned_at", ">=", today_start),
+        ("earned_at", "<", tomorrow_start),
+    ])
 
     flowers = []
-    for doc in docs:
-        data = doc.to_dict() or {}
+    for doc_id, data in docs:
         flowers.append({
-            "flower_id": doc.id,
+            "flower_id": doc_id,
             "task_id": data.get("task_id"),
             "flower_type_id": data.get("flower_type_id"),
             "tier": data.get("tier"),
@@ -206,32 +399,84 @@ async def get_active_bouquet(user_id: str):
 
 
 # ---------------------------------------------------------------------------
-# GET /flowers/trophy-room/{user_id}
-# Returns all flowers ever earned, grouped by date, newest first.
+# GET /flowers/streak/{user_id}?tz=&days=
+# Current and longest daily streak plus per-day counts for the last `days`
+# days, read from the user's stats document (one read, no flower scan).
+# ---------------------------------------------------------------------------
+@router.get("/flowers/streak/{user_id}")
+async def get_streak(user_id: str, tz: str | None = None, days: int = Query(default=7, ge=1, le=flower_stats.DAY_COUNT_WINDOW)):
+    stats = await repository.get_doc(flower_stats.COLLECTION, user_id) or flower_stats.empty_stats(user_id)
+    zone = _zone_or_400(tz or stats.get("timezone"))
+    today = datetime.now(zone).date()
+    day_counts = stats.get("day_counts") or {}
+
+    recent_days = []
+    for offset in range(days):
+        day = (today - timedelta(days=offset)).isoformat()
+        recent_days.append({"date": day, **day_counts.get(day, {"total": 0})})
+
+    return {
+        "user_id": user_id,
+        "timezone": str(zone),
+        "current_streak": flower_stats.effective_streak(stats, today),
+        "longest_streak": stats.get("longest_streak", 0),
+        "last_award_date": stats.get("last_award_date"),
+        "earned_today": stats.get("last_award_date") == today.isoformat(),
+        "total_flowers": stats.get("total_flowers", 0),
+        "tier_counts": stats.get("tier_counts", {}),
+        "recent_days": recent_days,
+    }
+
+
+# ---------------------------------------------------------------------------
+# GET /flowers/trophy-room/{user_id}?tz=&limit=&cursor=&start=&end=&tier=
+# Returns earned flowers grouped by date, newest first, one page at a time.
+# Dates are local to the IANA timezone tz (default: the one saved with the
+# user's stats, as for the streak), so a flower lands on the same day here
+# as in the bouquet and the streak. A date can continue on the next page;
+# pass next_cursor to get it.
 # ---------------------------------------------------------------------------
 @router.get("/flowers/trophy-room/{user_id}")
-async def get_trophy_room(user_id: str):
-    docs = (
-        db.collection("flowers")
-        .where("user_id", "==", user_id)
-        .stream()
-    )
+async def get_trophy_room(
+    user_id: str,
+    tz: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tier: str | None = None,
+):
+    zone = _zone_or_400(tz) if tz else None
+    filters = [("user_id", "==", user_id)]
+    if tier is not None:
+        filters.append(("tier", "==", tier.strip().upper()))
+    if start is not None:
+        filters.append(("earned_at", ">=", start))
+    if end is not None:
+        filters.append(("earned_at", "<", end))
+
+    page = repository.query_page("flowers", filters, [("earned_at", repository.DESCENDING)], limit, cursor)
+    try:
+        if zone is None:
+            # the saved timezone is read alongside the page
+            stats, (docs, next_cursor) = await asyncio.gather(repository.get_doc(flower_stats.COLLECTION, user_id), page)
+            zone = _zone_or_400((stats or {}).get("timezone"))
+        else:
+            docs, next_cursor = await page
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     by_date = {}
-    for doc in docs:
-        data = doc.to_dict() or {}
+    for doc_id, data in docs:
         earned_at = data.get("earned_at")
-
-        if hasattr(earned_at, "date"):
-            date_str = earned_at.date().isoformat()
-        else:
-            date_str = str(earned_at)[:10]
+        day = flower_stats.local_date(earned_at, zone)
+        date_str = day.isoformat() if day else str(earned_at)[:10]
 
         if date_str not in by_date:
             by_date[date_str] = []
 
         by_date[date_str].append({
-            "flower_id": doc.id,
+            "flower_id": doc_id,
             "task_id": data.get("task_id"),
             "flower_type_id": data.get("flower_type_id"),
             "tier": data.get("tier"),
@@ -239,12 +484,15 @@ async def get_trophy_room(user_id: str):
             "earned_at": dt_to_iso(earned_at),
         })
 
+    # docs arrive newest first, and dicts keep insertion order
     bouquets = [
         {"date": date, "flowers": flowers}
-        for date, flowers in sorted(by_date.items(), reverse=True)
+        for date, flowers in by_date.items()
     ]
 
     return {
         "user_id": user_id,
+        "timezone": str(zone),
         "bouquets": bouquets,
+        "next_cursor": next_cursor,
     }
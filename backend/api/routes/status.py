@@ -0,0 +1,70 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from api import metrics
+from api.llm_scheduler import lane_stats
+from api.providers import readiness, session_service
+from db.cache import award_flights, task_view_cache
+
+router = APIRouter()
+
+
+# ---------------------------------------------------------------------------
+# GET /status/sessions
+# Live ADK session count, approximate resident memory and cache counters.
+# ---------------------------------------------------------------------------
+@router.get("/status/sessions")
+async def get_session_stats():
+    return (await session_service.aget()).stats()
+
+
+# ---------------------------------------------------------------------------
+# GET /status/cache
+# Hit/miss counters and size of the GET /tasks/{user_id} cache, and how
+# many POST /flowers/award calls were shared or answered from memory.
+# ---------------------------------------------------------------------------
+@router.get("/status/cache")
+async def get_cache_stats():
+    return {"tasks": task_view_cache.stats(), "awards": award_flights.stats()}
+
+
+# ---------------------------------------------------------------------------
+# GET /status/llm
+# Per-agent LLM lane: slots in use, queue depth, wait-time percentiles,
+# rejections, timeouts, hedges and circuit breaker state.
+# ---------------------------------------------------------------------------
+@router.get("/status/llm")
+async def get_llm_stats():
+    return lane_stats()
+
+
+# ---------------------------------------------------------------------------
+# GET /status/ready
+# 200 once every lazily built component (storage, models, agent runners)
+# is loaded, 503 while startup warmup is still running or one failed.
+# ---------------------------------------------------------------------------
+@router.get("/status/ready")
+async def get_readiness():
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+# ---------------------------------------------------------------------------
+# GET /metrics
+# Prometheus text format: request and per-phase duration histograms (see
+# api/metrics.py) plus LLM lane queue depth and slots in use.
+# ---------------------------------------------------------------------------
+@router.get("/metrics")
+async def get_metrics():
+    lanes = lane_stats()
+    lines = metrics.gauge_lines(
+        "llm_lane_queued", "Agent calls waiting for a lane slot.", ("lane",),
+        {(name,): stats["queued"] for name, stats in lanes.items()},
+    ) + metrics.gauge_lines(
+        "llm_lane_in_flight", "Agent calls holding a lane slot.", ("lane",),
+        {(name,): stats["in_flight"] for name, stats in lanes.items()},
+    ) + metrics.gauge_lines(
+        "llm_lane_breaker_open", "1 while the lane's circuit breaker refuses calls.", ("lane",),
+        {(name,): int(stats["breaker"] == "open") for name, stats in lanes.items()},
+    )
+    return PlainTextResponse(metrics.render() + "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from api.timer_engine import TimerError, timer_engine
+
+router = APIRouter()
+
+
+class TimerRequest(BaseModel):
+    user_id: str
+
+
+async def _run(action, task_id: str, user_id: str):
+    try:
+        return await action(task_id, user_id)
+    except TimerError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+
+
+# ---------------------------------------------------------------------------
+# POST /tasks/{task_id}/timer/start|pause|resume
+# Server-side focus timer; repeating the current action is a no-op.
+# All return the timer state: state, focus_seconds, paused_count, timer_cycle.
+# ---------------------------------------------------------------------------
+@router.post("/tasks/{task_id}/timer/start")
+async def start_timer(task_id: str, body: TimerRequest):
+    return await _run(timer_engine.start, task_id, body.user_id)
+
+
+@router.post("/tasks/{task_id}/timer/pause")
+async def pause_timer(task_id: str, body: TimerRequest):
+    return await _run(timer_engine.pause, task_id, body.user_id)
+
+
+@router.post("/tasks/{task_id}/timer/resume")
+async def resume_timer(task_id: str, body: TimerRequest):
+    return await _run(timer_engine.resume, task_id, body.user_id)
+
+
+@router.get("/tasks/{task_id}/timer")
+async def get_timer(task_id: str, user_id: str):
+    return await _run(timer_engine.state, task_id, user_id)
@@ -0,0 +1,268 @@
+import asyncio
+import contextlib
+import copy
+import logging
+import os
+import time
+
+from db import repository
+
+logger = logging.getLogger(__name__)
+
+# Live timer state is flushed to the task documents at most this often, so a
+# burst of start/pause/resume taps costs one write instead of one per tap.
+TIMER_FLUSH_SECONDS = float(os.getenv("TIMER_FLUSH_SECONDS", "30"))
+# paused timers untouched for this long are dropped from memory after a flush
+TIMER_IDLE_SECONDS = 3600
+
+START, PAUSE, RESUME, COMPLETE = "s", "p", "r", "c"
+
+
+class TimerError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class TimerState:
+    """Focus timer of one task, rebuilt from and flushed to its task document.
+
+    events is the compact log [[code, unix_seconds], ...]; focus_seconds
+    only counts closed intervals, running_since marks the open one.
+    """
+
+    def __init__(self, task_id: str, user_id: str, data: dict):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.events = [list(e) for e in data.get("timer_events") or []]
+        self.focus_seconds = float(data.get("focus_seconds") or 0.0)
+        self.pause_count = int(data.get("paused_count") or 0)
+        self.cycle = int(data.get("timer_cycle") or 0)
+        self.running_since = data.get("timer_running_since")
+        self.completed = bool(data.get("completed"))
+        # stopped by finish() and waiting for its completion write, which
+        # carries the timer fields; flush() leaves it alone meanwhile
+        self.finishing = False
+        self.dirty = False
+        # bumped by every event, so a flush can tell what it did not write
+        self.changes = 0
+        self.touched = time.monotonic()
+
+    @property
+    def started(self) -> bool:
+        return bool(self.events)
+
+    @property
+    def running(self) -> bool:
+        return self.running_since is not None
+
+    @property
+    def finished(self) -> bool:
+        return self.completed or (self.started and self.events[-1][0] == COMPLETE)
+
+    def elapsed(self, now: float) -> float:
+        if self.running:
+            return self.focus_seconds + max(0.0, now - self.running_since)
+        return self.focus_seconds
+
+    def record(self, code: str, now: float):
+        self.events.append([code, int(now)])
+        self.dirty = True
+        self.changes += 1
+        self.touched = time.monotonic()
+
+    def stopped(self, now: float) -> "TimerState":
+        """A copy of this timer, stopped and marked complete at now."""
+        done = copy.copy(self)
+        done.events = [list(e) for e in self.events]
+        done.focus_seconds = self.elapsed(now)
+        done.running_since = None
+        if done.events[-1][0] != COMPLETE:
+            done.record(COMPLETE, now)
+        return done
+
+    def fields(self) -> dict:
+        return {
+            "timer_events": self.events,
+            "focus_seconds": round(self.focus_seconds, 1),
+            "paused_count": self.pause_count,
+            "timer_cycle": self.cycle,
+            "timer_running_since": self.running_since,
+        }
+
+    def view(self, now: float) -> dict:
+        if self.finished:
+            state = "completed"
+        elif not self.started:
+            state = "idle"
+        else:
+            state = "running" if self.running else "paused"
+        return {
+            "task_id": self.task_id,
+            "state": state,
+            "focus_seconds": round(self.elapsed(now), 1),
+            "paused_count": self.pause_count,
+            "timer_cycle": self.cycle,
+        }
+
+
+class TimerEngine:
+    """Server-side start/pause/resume bookkeeping with write-behind persistence.
+
+    The first event for a task loads it (one read, which also checks the
+    owner); after that the state lives in memory and dirty timers are
+    flushed in one batch every TIMER_FLUSH_SECONDS, on completion and at
+    shutdown. Run a single worker, or route a user's requests to one worker:
+    another worker would not see this worker's unflushed events.
+    """
+
+    def __init__(self):
+        self._timers: dict[str, TimerState] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: dict[str, int] = {}
+        self._flush_task = None
+
+    async def _load(self, task_id: str, user_id: str, task_data: dict | None = None) -> TimerState:
+        timer = self._timers.get(task_id)
+        if timer is None:
+            data = task_data if task_data is not None else await repository.get_doc("tasks", task_id)
+            if data is None:
+                raise TimerError(404, "Task not found.")
+            timer = self._timers.setdefault(task_id, TimerState(task_id, data.get("user_id"), data))
+        if timer.user_id != user_id:
+            raise TimerError(403, "Task does not belong to this user.")
+        return timer
+
+    @contextlib.asynccontextmanager
+    async def _lock(self, task_id: str):
+        """Hold the task's lock. The lock is dropped only when nobody holds or
+        waits for it, so two requests never end up with different locks."""
+        lock = self._locks.setdefault(task_id, asyncio.Lock())
+        self._lock_users[task_id] = self._lock_users.get(task_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[task_id] -= 1
+            if not self._lock_users[task_id]:
+                del self._lock_users[task_id]
+                del self._locks[task_id]
+
+    async def start(self, task_id: str, user_id: str) -> dict:
+        async with self._lock(task_id):
+            timer = await self._load(task_id, user_id)
+            now = time.time()
+            if timer.finished:
+                raise TimerError(409, "Task is already completed.")
+            if timer.started and not timer.running:
+                raise TimerError(409, "Timer was paused; resume it instead.")
+            if not timer.started:
+                timer.running_since = now
+                timer.cycle += 1
+                timer.record(START, now)
+            return timer.view(now)
+
+    async def pause(self, task_id: str, user_id: str) -> dict:
+        async with self._lock(task_id):
+            timer = await self._load(task_id, user_id)
+            now = time.time()
+            if not timer.started:
+                raise TimerError(409, "Timer has not been started.")
+            if timer.running:
+                timer.focus_seconds = timer.elapsed(now)
+                timer.running_since = None
+                timer.pause_count += 1
+                timer.record(PAUSE, now)
+            return timer.view(now)
+
+    async def resume(self, task_id: str, user_id: str) -> dict:
+        async with self._lock(task_id):
+            timer = await self._load(task_id, user_id)
+            now = time.time()
+            if not timer.started:
+                raise TimerError(409, "Timer has not been started.")
+            if timer.finished:
+                raise TimerError(409, "Task is already completed.")
+            if not timer.running:
+                timer.running_since = now
+                timer.cycle += 1
+                timer.record(RESUME, now)
+            return timer.view(now)
+
+    async def state(self, task_id: str, user_id: str) -> dict:
+        timer = await self._load(task_id, user_id)
+        return timer.view(time.time())
+
+    async def finish(self, task_id: str, user_id: str, task_data: dict) -> tuple[float | None, dict]:
+        """Stop the timer for a completing task.
+
+        Returns (focus minutes or None if the timer was never used, task
+        fields to write with the completion). The timer itself is left as
+        it was, but flushes skip it so that no older state is written after
+        the completion: the caller calls discard() once the completion is
+        written, or keep() if the write fails and the timer carries on.
+        """
+        async with self._lock(task_id):
+            timer = await self._load(task_id, user_id, task_data)
+            if not timer.started:
+                return None, {}
+            timer.finishing = True
+            done = timer.stopped(time.time())
+            return done.focus_seconds / 60.0, done.fields()
+
+    def discard(self, task_id: str):
+        """Forget the timer of a task whose completion has been written."""
+        self._timers.pop(task_id, None)
+
+    def keep(self, task_id: str):
+        """Undo finish() for a completion that was not written."""
+        timer = self._timers.get(task_id)
+        if timer is not None:
+            timer.finishing = False
+
+    async def flush(self):
+        task_ids = sorted(t.task_id for t in self._timers.values() if t.dirty and not t.finishing)
+        if task_ids:
+            async with contextlib.AsyncExitStack() as stack:
+                # hold the task locks until the write has landed, so finish()
+                # waits for it instead of racing it with the completion write
+                for task_id in task_ids:
+                    await stack.enter_async_context(self._lock(task_id))
+                dirty = [(t, t.changes) for t in map(self._timers.get, task_ids) if t and t.dirty and not t.finishing]
+                if dirty:
+                    await repository.commit_batch([("tasks", t.task_id, t.fields(), True) for t, _ in dirty])
+                for timer, changes in dirty:
+                    # an event recorded during the write goes out with the next flush
+                    if timer.changes == changes:
+                        timer.dirty = False
+
+        idle_before = time.monotonic() - TIMER_IDLE_SECONDS
+        for task_id, timer in list(self._timers.items()):
+            if task_id in self._locks:
+                continue
+            if not timer.dirty and not timer.running and timer.touched < idle_before:
+                self._timers.pop(task_id, None)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(TIMER_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception:
+                # the timers stay dirty and are written by the next flush
+                dirty = sum(1 for t in self._timers.values() if t.dirty)
+                logger.exception("timer flush failed, %d timer(s) left unsaved", dirty)
+
+    def start_flushing(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop_flushing(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+
+timer_engine = TimerEngine()
@@ -0,0 +1,82 @@
+"""Benchmark the final turn of a brain dump: persisting N tasks plus the session.
+
+Compares the old one-get-one-set-per-task pattern with the batched
+prepare_task_writes + commit_batch path, against a fake Firestore with a fixed
+per-round-trip latency.
+
+Run from backend/:
+    python -m bench.chat_finalize --latency-ms 40
+"""
+import argparse
+import asyncio
+import sys
+import time
+import types
+
+from bench.fake_firestore import FakeFirestore, transactional
+
+fake_db = FakeFirestore()
+sys.modules.setdefault("db.firebase", types.SimpleNamespace(db=fake_db, transactional=transactional))
+
+from db import repository  # noqa: E402
+from api.routes import chat  # noqa: E402
+
+
+async def _legacy_finalize(user_id: str, session_id: str, final_tasks: list[dict]):
+    for idx, task in enumerate(final_tasks, start=1):
+        task_id = f"{session_id}-{idx}"
+        existing = await repository.get_doc("tasks", task_id)
+        await repository.set_doc("tasks", task_id, dict(task, task_id=task_id, user_id=user_id), merge=existing is not None)
+    await repository.set_doc("sessions", session_id, {"user_id": user_id})
+
+
+async def _batched_finalize(user_id: str, session_id: str, final_tasks: list[dict]):
+    _, writes = await chat.prepare_task_writes(user_id, session_id, final_tasks)
+    writes.append(("sessions", session_id, {"user_id": user_id}, False))
+    await repository.commit_batch(writes)
+
+
+def _tasks(n: int) -> list[dict]:
+    return [
+        {
+            "priority_rank": i,
+            "task_name": f"task {i}",
+            "category": "Other",
+            "estimated_time": 30,
+            "urgency": "medium",
+            "stress_level": "low",
+            "summary": "",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+async def _measure(fn, n: int, repeats: int) -> tuple[float, int]:
+    best = float("inf")
+    trips = 0
+    for r in range(repeats):
+        fake_db.round_trips = 0
+        start = time.perf_counter()
+        await fn("bench-user", f"bench-{fn.__name__}-{n}-{r}", _tasks(n))
+        best = min(best, time.perf_counter() - start)
+        trips = fake_db.round_trips
+    return best * 1000, trips
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--counts", default="1,5,10,15,20,30")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    fake_db.latency = args.latency_ms / 1000
+
+    print(f"{'tasks':>5}  {'legacy ms':>10}  {'trips':>5}  {'batched ms':>10}  {'trips':>5}")
+    for n in (int(c) for c in args.counts.split(",")):
+        legacy_ms, legacy_trips = await _measure(_legacy_finalize, n, args.repeats)
+        batched_ms, batched_trips = await _measure(_batched_finalize, n, args.repeats)
+        print(f"{n:>5}  {legacy_ms:>10.1f}  {legacy_trips:>5}  {batched_ms:>10.1f}  {batched_trips:>5}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
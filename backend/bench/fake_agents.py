@@ -0,0 +1,122 @@
+"""Scripted stand-ins for the ADK Runner and session service.
+
+ScriptedRunner answers every run_async with text from a reply function,
+after a fixed first-token latency, and streams it token by token when called
+with a RunConfig (as /chat/stream does). FakeSessionService keeps sessions
+in a dict. Neither calls Gemini.
+"""
+import asyncio
+import json
+import random
+
+from agents.floweragent.flowerPrompt import FLOWER_TIERS
+from agents.prioritizer.prompt_priority import VALID_CATEGORIES
+
+CATEGORIES = sorted(VALID_CATEGORIES)
+
+
+class _Part:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Content:
+    def __init__(self, text: str):
+        self.parts = [_Part(text)]
+
+
+class FakeEvent:
+    def __init__(self, text: str, partial: bool = False):
+        self.content = _Content(text)
+        self.partial = partial
+
+    def is_final_response(self) -> bool:
+        return not self.partial
+
+
+class ScriptedRunner:
+    """Runner.run_async look-alike.
+
+    reply(user_id, session_id, text) returns the full answer. The first token
+    arrives after `latency` seconds (plus up to `jitter`), each further
+    streamed token after `token_interval`.
+    """
+
+    def __init__(self, app_name: str, reply, latency: float = 0.5, jitter: float = 0.0, token_interval: float = 0.01, token_chars: int = 16):
+        self.app_name = app_name
+        self.reply = reply
+        self.latency = latency
+        self.jitter = jitter
+        self.token_interval = token_interval
+        self.token_chars = token_chars
+        self.calls = 0
+
+    async def run_async(self, *, user_id, session_id, new_message, state_delta=None, run_config=None):
+        self.calls += 1
+        text = "".join(p.text or "" for p in new_message.parts)
+        answer = self.reply(user_id, session_id, text)
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if run_config is not None:
+            for start in range(0, len(answer), self.token_chars):
+                yield FakeEvent(answer[start:start + self.token_chars], partial=True)
+                await asyncio.sleep(self.token_interval)
+        yield FakeEvent(answer)
+
+
+class _Session:
+    def __init__(self, app_name, user_id, session_id, state):
+        self.app_name = app_name
+        self.user_id = user_id
+        self.id = session_id
+        self.state = dict(state or {})
+        self.events = []
+
+
+class FakeSessionService:
+    """The subset of the ADK session service the routes call."""
+
+    def __init__(self):
+        self._sessions = {}
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session = _Session(app_name, user_id, session_id, state)
+        self._sessions[(app_name, user_id, session_id)] = session
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return self._sessions.get((app_name, user_id, session_id))
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        self._sessions.pop((app_name, user_id, session_id), None)
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions)}
+
+
+def task_list_reply(n_tasks: int = 5):
+    """Prioritizer script: a final JSON list of n_tasks tasks for every turn,
+    in categories the prioritizer schema accepts."""
+    def reply(user_id, session_id, text):
+        return json.dumps([
+            {
+                "priority_rank": i,
+                "task_name": f"task {i}",
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "estimated_time": 15 * i,
+                "urgency": "medium",
+                "stress_level": "low",
+                "summary": f"step {i} of the brain dump",
+            }
+            for i in range(1, n_tasks + 1)
+        ])
+    return reply
+
+
+def award_reply(user_id, session_id, text):
+    """Flower agent script: a FlowerAward with a catalog flower, whatever the task."""
+    return json.dumps({"selected_flower": FLOWER_TIERS["SMALL"][0], "tier": "SMALL", "congrats_message": "Nice work!"})
+
+
+def message_reply(user_id, session_id, text):
+    """Congrats message agent script."""
+    return "You did it, one more flower for your bouquet!"
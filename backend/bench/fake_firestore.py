@@ -0,0 +1,206 @@
+import copy
+import threading
+import time
+import uuid
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+def _sort_key(value):
+    # Firestore orders null before numbers before strings
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: dict | None):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client, path: str, doc_id: str):
+        self._client = client
+        self._path = path
+        self.id = doc_id
+
+    def get(self, transaction=None):
+        self._client.round_trip()
+        return self._client.snapshot(self._path, self.id)
+
+    def set(self, data: dict, merge: bool = False):
+        self._client.round_trip()
+        self._client.write(self._path, self.id, data, merge)
+
+    def update(self, data: dict):
+        self._client.round_trip()
+        self._client.write(self._path, self.id, data, merge=True, must_exist=True)
+
+    def delete(self):
+        self._client.round_trip()
+        self._client.delete(self._path, self.id)
+
+
+class FakeQuery:
+    def __init__(self, client, path: str, filters=(), order=(), limit=None, cursor=None):
+        self._client = client
+        self._path = path
+        self._filters = list(filters)
+        self._order = list(order)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = {"filters": self._filters, "order": self._order, "limit": self._limit, "cursor": self._cursor, **changes}
+        return FakeQuery(self._client, self._path, **state)
+
+    def start_after(self, values):
+        values = [v.id if isinstance(v, FakeDocument) else v for v in values]
+        return self._copy(cursor=values)
+
+    def _after_cursor(self, doc_id: str, data: dict) -> bool:
+        for (field, direction), cursor_value in zip(self._order, self._cursor):
+            a = _sort_key(doc_id if field == "__name__" else data.get(field))
+            b = _sort_key(cursor_value)
+            if a != b:
+                return a > b if direction == "ASCENDING" else a < b
+        return False
+
+    def where(self, field: str, op: str, value):
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field: str, direction: str = "ASCENDING"):
+        return self._copy(order=self._order + [(field, direction)])
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def stream(self):
+        self._client.round_trip()
+        with self._client.lock:
+            docs = list(self._client.collections.get(self._path, {}).items())
+        docs = [
+            (doc_id, data) for doc_id, data in docs
+            if all(_OPS[op](data.get(field), value) for field, op, value in self._filters)
+        ]
+        for field, direction in reversed(self._order):
+            docs.sort(key=lambda d: _sort_key(d[0] if field == "__name__" else d[1].get(field)), reverse=direction == "DESCENDING")
+        if self._cursor is not None:
+            docs = [(doc_id, data) for doc_id, data in docs if self._after_cursor(doc_id, data)]
+        for doc_id, data in docs[:self._limit]:
+            yield FakeSnapshot(doc_id, copy.deepcopy(data))
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id: str | None = None):
+        return FakeDocument(self._client, self._path, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, ref: FakeDocument, data: dict, merge: bool = False):
+        self._writes.append((ref, data, merge))
+
+    def delete(self, ref: FakeDocument):
+        self._writes.append((ref, None, False))
+
+    def commit(self):
+        self._client.round_trip()
+        with self._client.lock:
+            for ref, data, merge in self._writes:
+                if data is None:
+                    self._client.delete(ref._path, ref.id)
+                else:
+                    self._client.write(ref._path, ref.id, data, merge)
+
+
+class FakeTransaction(FakeBatch):
+    pass
+
+
+def transactional(fn):
+    """Stand-in for firestore.transactional: the client lock makes it serial."""
+    def run(transaction: FakeTransaction):
+        with transaction._client.lock:
+            result = fn(transaction)
+            transaction.commit()
+        return result
+    return run
+
+
+class FakeFirestore:
+    """In-memory stand-in for the firebase_admin Firestore client.
+
+    Every call that would be a network round trip sleeps for `latency`
+    seconds and is counted in `round_trips`.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.round_trips = 0
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.lock = threading.RLock()
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def snapshot(self, path: str, doc_id: str) -> FakeSnapshot:
+        with self.lock:
+            data = self.collections.get(path, {}).get(doc_id)
+            return FakeSnapshot(doc_id, copy.deepcopy(data))
+
+    def write(self, path: str, doc_id: str, data: dict, merge: bool = False, must_exist: bool = False):
+        with self.lock:
+            docs = self.collections.setdefault(path, {})
+            if must_exist and doc_id not in docs:
+                raise KeyError(f"No document to update: {path}/{doc_id}")
+            if merge and doc_id in docs:
+                docs[doc_id].update(copy.deepcopy(data))
+            else:
+                docs[doc_id] = copy.deepcopy(data)
+
+    def delete(self, path: str, doc_id: str):
+        with self.lock:
+            self.collections.get(path, {}).pop(doc_id, None)
+
+    def collection(self, path: str) -> FakeCollection:
+        return FakeCollection(self, path)
+
+    def get_all(self, refs):
+        self.round_trip()
+        return [self.snapshot(ref._path, ref.id) for ref in refs]
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction(self)
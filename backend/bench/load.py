@@ -0,0 +1,338 @@
+"""In-process load test of the whole API, without Gemini or a Firestore project.
+
+Boots api.main:app with its lifespan against FakeFirestore (fixed latency per
+round trip) and ScriptedRunner agents (fixed first-token latency, streamed
+tokens), then drives it through httpx's ASGI transport. Each endpoint is run
+on its own and then in a mix, at every concurrency level; each run reports
+p50/p95/p99 latency, requests per second and status codes per endpoint,
+event-loop lag, and resident memory.
+
+Run from backend/:
+    python -m bench.load --concurrency 1,16 --requests 200
+    python -m bench.load --baseline bench/baseline.json --tolerance 0.25
+    python -m bench.load --save-baseline bench/results/mine.json
+
+With --baseline the exit status is 1 if any endpoint's p95 got more than
+`tolerance` slower, or its RPS more than `tolerance` lower, than in the
+baseline. bench/baseline.json is the stored baseline, recorded with the
+default options; scratch results go to the ignored bench/results/. Latency
+depends on the machine, so re-record the baseline on yours before trusting
+a comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# keep the time model, its spool and the learner lock out of the real model dir
+os.environ.setdefault("TIME_MODEL_DIR", tempfile.mkdtemp(prefix="bench-model-"))
+
+from agents.floweragent.flowerPrompt import FLOWER_TIERS  # noqa: E402
+from agents.prioritizer.prompt_priority import VALID_CATEGORIES  # noqa: E402
+from bench.fake_agents import FakeSessionService, ScriptedRunner, award_reply, message_reply, task_list_reply  # noqa: E402
+from bench.fake_firestore import FakeFirestore, transactional  # noqa: E402
+
+fake_db = FakeFirestore()
+sys.modules.setdefault("db.firebase", types.SimpleNamespace(db=fake_db, transactional=transactional, get_db=lambda: fake_db))
+
+ENDPOINTS = ("chat", "tasks", "complete", "award", "trophy")
+MIX_WEIGHTS = {"tasks": 50, "trophy": 15, "complete": 15, "award": 10, "chat": 10}
+USERS = 50
+SEED_TASKS = 20
+SEED_FLOWERS = 60
+LAG_INTERVAL = 0.01
+# seed with what the app accepts, so no request takes a fallback path
+CATEGORIES = sorted(VALID_CATEGORIES)
+SEED_FLOWERS_BY_TIER = [(tier, name) for tier, names in FLOWER_TIERS.items() for name in names]
+
+
+def rss_mb() -> float:
+    """Current resident set size; peak RSS where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+class LoopLag:
+    """Samples how late a LAG_INTERVAL sleep wakes up while the load runs."""
+
+    def __init__(self):
+        self.samples = []
+        self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> dict:
+        return {
+            "p50_ms": _ms(percentile(self.samples, 0.50)),
+            "p99_ms": _ms(percentile(self.samples, 0.99)),
+            "max_ms": _ms(max(self.samples, default=None)),
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+# ---------------------------------------------------------------------------
+# Data: every user starts with pending tasks and a trophy room; complete and
+# award requests get a fresh task of their own, created outside the timing.
+# ---------------------------------------------------------------------------
+def _task_doc(user_id: str, task_id: str, rank: int, completed: bool = False) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "task_id": task_id,
+        "user_id": user_id,
+        "session_id": f"seed-{user_id}",
+        "priority_rank": rank,
+        "task_name": f"seeded task {rank}",
+        "category": random.choice(CATEGORIES),
+        "estimated_time": 15 * (rank % 4 + 1),
+        "urgency": "medium",
+        "stress_level": "low",
+        "summary": "",
+        "hour_of_day": now.hour,
+        "day_of_week": now.weekday(),
+        "estimated_subtasks": 1,
+        "is_vague": False,
+        "has_dependencies": False,
+        "created_at": now.isoformat(),
+        "completed": completed,
+    }
+
+
+def seed():
+    now = datetime.now(timezone.utc)
+    for u in range(USERS):
+        user_id = f"user-{u}"
+        for rank in range(1, SEED_TASKS + 1):
+            task_id = f"seed-{user_id}-{rank}"
+            fake_db.write("tasks", task_id, _task_doc(user_id, task_id, rank))
+        for f in range(SEED_FLOWERS):
+            tier, flower = SEED_FLOWERS_BY_TIER[f % len(SEED_FLOWERS_BY_TIER)]
+            fake_db.write("flowers", f"seed-flower-{user_id}-{f}", {
+                "task_id": f"old-{user_id}-{f}",
+                "user_id": user_id,
+                "flower_type_id": flower,
+                "tier": tier,
+                "message": "Nice work!",
+                "earned_at": now - timedelta(hours=12 * f),
+            })
+
+
+def _new_task(user_id: str, completed: bool = False) -> str:
+    task_id = f"bench-{uuid.uuid4().hex[:12]}"
+    fake_db.write("tasks", task_id, _task_doc(user_id, task_id, 1, completed))
+    if completed:
+        fake_db.write("completed_tasks", task_id, {
+            "task_id": task_id,
+            "user_id": user_id,
+            "actual_time_spent_minutes": 25,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        })
+    return task_id
+
+
+def request_for(endpoint: str) -> tuple[str, str, dict | None]:
+    """(method, path, json body) for one request; prepares its data first."""
+    user_id = f"user-{random.randrange(USERS)}"
+    if endpoint == "chat":
+        return "POST", "/chat", {"session_id": uuid.uuid4().hex, "user_id": user_id, "message": "I need to plan my week"}
+    if endpoint == "tasks":
+        return "GET", f"/tasks/{user_id}", None
+    if endpoint == "complete":
+        return "POST", "/tasks/complete", {"task_id": _new_task(user_id), "user_id": user_id, "actual_time_spent_minutes": 25}
+    if endpoint == "award":
+        return "POST", "/flowers/award", {"task_id": _new_task(user_id, completed=True), "user_id": user_id}
+    if endpoint == "trophy":
+        return "GET", f"/flowers/trophy-room/{user_id}", None
+    raise ValueError(endpoint)
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+async def run_phase(client, endpoints: list[str], weights: list[int], concurrency: int, requests: int) -> dict:
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            endpoint = random.choices(endpoints, weights)[0]
+            method, path, body = request_for(endpoint)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except Exception as exc:
+                status = type(exc).__name__
+            latencies[endpoint].append(time.perf_counter() - started)
+            statuses[endpoint][str(status)] += 1
+
+    rss_before = rss_mb()
+    with LoopLag() as lag:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "seconds": round(elapsed, 3),
+        "loop_lag": lag.summary(),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "endpoints": {
+            endpoint: {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": _ms(percentile(values, 0.50)),
+                "p95_ms": _ms(percentile(values, 0.95)),
+                "p99_ms": _ms(percentile(values, 0.99)),
+                "status": dict(statuses[endpoint]),
+            }
+            for endpoint, values in sorted(latencies.items())
+        },
+    }
+
+
+def configure(args):
+    """Install the fakes behind the app's lazy providers."""
+    from api import providers
+    from api.routes import chat
+    from api.routes.flowers import award
+
+    fake_db.latency = args.firestore_ms / 1000
+    scripted = dict(latency=args.llm_ms / 1000, jitter=args.llm_jitter_ms / 1000, token_interval=args.token_ms / 1000)
+    providers.session_service.set(FakeSessionService())
+    chat.runner.set(ScriptedRunner(chat.APP_NAME, task_list_reply(args.tasks_per_list), **scripted))
+    award.runner.set(ScriptedRunner(award.APP_NAME, award_reply, **scripted))
+    award.message_runner.set(ScriptedRunner(award.MESSAGE_APP_NAME, message_reply, **scripted))
+
+
+async def run(args) -> dict:
+    import httpx
+    from api.main import app
+
+    configure(args)
+    random.seed(args.seed)
+    seed()
+
+    phases = [(name, [name], [1]) for name in args.endpoints]
+    if args.mix:
+        phases.append(("mix", list(MIX_WEIGHTS), list(MIX_WEIGHTS.values())))
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for concurrency in args.concurrency:
+                for name, endpoints, weights in phases:
+                    key = f"{name}@{concurrency}"
+                    results[key] = await run_phase(client, endpoints, weights, concurrency, args.requests)
+                    print_phase(key, results[key])
+    return results
+
+
+def print_phase(key: str, result: dict):
+    lag = result["loop_lag"]
+    print(f"\n{key}: {result['seconds']}s, loop lag p50 {lag['p50_ms']} ms / p99 {lag['p99_ms']} ms / max {lag['max_ms']} ms, "
+          f"RSS {result['rss_mb']} MB (+{result['rss_growth_mb']})")
+    print(f"  {'endpoint':<10} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  status")
+    for endpoint, row in result["endpoints"].items():
+        print(f"  {endpoint:<10} {row['requests']:>6} {row['rps']:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}  {row['status']}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of p95 latency or RPS beyond tolerance, as readable lines."""
+    regressions = []
+    for key, result in results.items():
+        for endpoint, row in result["endpoints"].items():
+            base = baseline.get("results", {}).get(key, {}).get("endpoints", {}).get(endpoint)
+            if not base:
+                continue
+            if base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{key} {endpoint}: p95 {base['p95_ms']} -> {row['p95_ms']} ms")
+            if base["rps"] and row["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{key} {endpoint}: rps {base['rps']} -> {row['rps']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint run")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"run each alone, from {','.join(ENDPOINTS)}")
+    parser.add_argument("--no-mix", dest="mix", action="store_false", help="skip the mixed-traffic run")
+    parser.add_argument("--firestore-ms", type=float, default=20.0, help="fake Firestore latency per round trip")
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="scripted agent time to first token")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=10.0, help="interval between streamed tokens")
+    parser.add_argument("--tasks-per-list", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", type=Path, help="write the results here")
+    parser.add_argument("--baseline", type=Path, help="compare against results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(args))
+    options = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "baseline", "tolerance")}
+
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps({"options": options, "results": results}, indent=2, default=str))
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("options") != json.loads(json.dumps(options, default=str)):
+            print("\nwarning: baseline was recorded with different options")
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
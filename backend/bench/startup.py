@@ -0,0 +1,93 @@
+"""Measure how long importing the API takes, per module.
+
+Runs `python -X importtime -c "import api.main"` in a fresh interpreter and
+reports the slowest modules by cumulative import time, plus self time summed
+per top-level package. With --warm it then builds every lazy provider in
+process and reports how long each took (needs real credentials).
+
+Run from backend/:
+    python -m bench.startup --top 25
+    python -m bench.startup --warm
+"""
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_imports(module: str = "api.main"):
+    """Return (wall seconds, [(module, self_us, cumulative_us, depth)])."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return wall, rows
+
+
+def by_package(rows) -> dict[str, int]:
+    totals = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".", 1)[0]] += self_us
+    return dict(totals)
+
+
+async def warm_providers() -> dict:
+    sys.path.insert(0, str(BACKEND_DIR))
+    started = time.perf_counter()
+    import api.main  # noqa: F401
+    from api import providers
+
+    imported = time.perf_counter() - started
+    await providers.warm_up()
+    return {"import_seconds": round(imported, 3), **providers.readiness()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import time of the API, per module.")
+    parser.add_argument("--module", default="api.main")
+    parser.add_argument("--top", type=int, default=20, help="how many modules to list")
+    parser.add_argument("--warm", action="store_true", help="also build every lazy provider and time it")
+    args = parser.parse_args(argv)
+
+    wall, rows = measure_imports(args.module)
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms in imports, {wall * 1000:.1f} ms wall (incl. interpreter start)")
+
+    print(f"\nslowest {args.top} modules (cumulative ms)")
+    for name, _, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f}  {'  ' * depth}{name}")
+
+    print("\nself time per top-level package (ms)")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:9.1f}  {package}")
+
+    if args.warm:
+        state = asyncio.run(warm_providers())
+        print(f"\nwarmup (after a {state['import_seconds']} s in-process import)")
+        for name, status in state["providers"].items():
+            outcome = f"{status['seconds']} s" if status["ready"] else f"failed: {status['error']}"
+            print(f"  {name:24} {outcome}")
+
+
+if __name__ == "__main__":
+    main()
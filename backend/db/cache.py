@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", "2048"))
+# Other workers' writes cannot invalidate this process's cache, so entries
+# also expire on their own.
+TASK_CACHE_TTL_SECONDS = float(os.getenv("TASK_CACHE_TTL", "60"))
+AWARD_RESULT_TTL_SECONDS = float(os.getenv("AWARD_RESULT_TTL", "120"))
+
+
+def compute_etag(payload) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ViewCache:
+    """Per-key LRU cache of rendered API responses, each with an ETag.
+
+    Writers call invalidate() or patch() for the keys they touch. A reader
+    that missed takes version() before reading the datastore and passes it
+    to put(), so a write that lands in between is never overwritten by the
+    older read.
+
+    Versions come from one counter and are never reused. Once there are more
+    versioned keys than max_entries, the versions of keys with no entry left
+    (expired, evicted or never cached) are dropped, and every key without a
+    version moves to a new floor version, so a read that started before the
+    sweep is not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries = OrderedDict()   # key -> (etag, payload, expires_at)
+        self._versions = {}
+        self._counter = itertools.count(1)
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self, key) -> int:
+        return self._versions.get(key, self._floor)
+
+    def _bump(self, key):
+        self._versions[key] = next(self._counter)
+        if len(self._versions) > self._max_entries:
+            self._versions = {k: v for k, v in self._versions.items() if k in self._entries}
+            self._floor = next(self._counter)
+
+    def get(self, key):
+        """Return (etag, payload), or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None or entry[2] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, payload, version: int | None = None) -> str:
+        etag = compute_etag(payload)
+        if version is not None and version != self.version(key):
+            return etag
+        self._entries[key] = (etag, payload, time.monotonic() + self._ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+        self._bump(key)
+        self.invalidations += 1
+
+    def patch(self, key, update):
+        """Apply update(payload) -> new payload to a cached entry in place of invalidating it.
+
+        If update returns None the entry is dropped instead.
+        """
+        entry = self._entries.get(key)
+        self._bump(key)
+        if entry is None:
+            return
+        new_payload = update(entry[1])
+        if new_payload is None:
+            self._entries.pop(key, None)
+            self.invalidations += 1
+            return
+        self._entries[key] = (compute_etag(new_payload), new_payload, entry[2])
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its outcome.
+
+    Concurrent do() calls with the same key await the same task, which is
+    shielded so a caller that disconnects does not cancel it for the others.
+    Successful results are also kept for ttl_seconds, so retries right after
+    the call finished are answered from memory. Failures are not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._inflight = {}
+        self._results = OrderedDict()   # key -> (result, expires_at)
+        self.calls = 0
+        self.shared = 0
+        self.hits = 0
+
+    async def do(self, key, fn):
+        """Return the result of fn() (a coroutine function) for this key."""
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._results[key] = (task.result(), time.monotonic() + self._ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self._max_entries:
+            self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "results": len(self._results),
+            "ttl_seconds": self._ttl,
+            "calls": self.calls,
+            "shared": self.shared,
+            "hits": self.hits,
+        }
+
+
+# GET /tasks/{user_id} responses, keyed by user_id
+task_view_cache = ViewCache(TASK_CACHE_SIZE, TASK_CACHE_TTL_SECONDS)
+
+# POST /flowers/award calls, keyed by (task_id, user_id)
+award_flights = SingleFlight(ttl_seconds=AWARD_RESULT_TTL_SECONDS)
@@ -1,12 +1,33 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import threading
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent.parent  # goes up from db/ to backend/
 SERVICE_ACCOUNT_PATH = BASE_DIR / "serviceAccountKey.json"
-cred = credentials.Certificate(str(SERVICE_ACCOUNT_PATH))
 
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
+_lock = threading.Lock()
+_db = None
 
-db = firestore.client()
+
+def get_db():
+    """The Firestore client; firebase_admin is imported and authenticated on first use."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                if not firebase_admin._apps:
+                    firebase_admin.initialize_app(credentials.Certificate(str(SERVICE_ACCOUNT_PATH)))
+                _db = firestore.client()
+    return _db
+
+
+def __getattr__(name):
+    # keeps `from db.firebase import db` working without initializing at import
+    if name == "db":
+        return get_db()
+    if name == "transactional":
+        from firebase_admin import firestore
+        return firestore.transactional
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,111 @@
+"""Storage backend on Cloud Firestore, through the firebase_admin client.
+
+Every method is blocking; db.repository runs them on its thread pool.
+"""
+from db import firebase
+
+MAX_BATCH_WRITES = 500
+ASCENDING = "ASCENDING"
+
+
+class FirestoreTransaction:
+    """What a run_transaction callback gets: reads first, then writes.
+
+    Firestore retries the callback on contention, so it must not have side
+    effects beyond these calls.
+    """
+
+    def __init__(self, db, transaction):
+        self._db = db
+        self._transaction = transaction
+
+    def get(self, collection: str, doc_id: str) -> dict | None:
+        doc = self._db.collection(collection).document(doc_id).get(transaction=self._transaction)
+        if not doc.exists:
+            return None
+        return doc.to_dict() or {}
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        self._transaction.set(self._db.collection(collection).document(doc_id), data, merge=merge)
+
+    def delete(self, collection: str, doc_id: str):
+        self._transaction.delete(self._db.collection(collection).document(doc_id))
+
+
+class FirestoreStore:
+    name = "firestore"
+
+    def __init__(self):
+        # authenticates here, so building the store is the slow part of startup
+        self.db = firebase.db
+
+    def get_doc(self, collection: str, doc_id: str) -> dict | None:
+        doc = self.db.collection(collection).document(doc_id).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict() or {}
+
+    def get_many(self, collection: str, doc_ids: list[str]) -> dict[str, dict]:
+        refs = [self.db.collection(collection).document(doc_id) for doc_id in doc_ids]
+        return {doc.id: doc.to_dict() or {} for doc in self.db.get_all(refs) if doc.exists}
+
+    def set_doc(self, collection: str, doc_id: str, data: dict, merge: bool = False) -> None:
+        self.db.collection(collection).document(doc_id).set(data, merge=merge)
+
+    def update_doc(self, collection: str, doc_id: str, data: dict) -> None:
+        self.db.collection(collection).document(doc_id).update(data)
+
+    def delete_doc(self, collection: str, doc_id: str) -> None:
+        self.db.collection(collection).document(doc_id).delete()
+
+    def add_doc(self, collection: str, data: dict) -> str:
+        _, ref = self.db.collection(collection).add(data)
+        return ref.id
+
+    def commit_batch(self, writes) -> None:
+        # Firestore caps a batch at 500 operations.
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for collection, doc_id, data, merge in writes[start:start + MAX_BATCH_WRITES]:
+                batch.set(self.db.collection(collection).document(doc_id), data, merge=merge)
+            batch.commit()
+
+    def run_transaction(self, fn):
+        @firebase.transactional
+        def run(transaction):
+            return fn(FirestoreTransaction(self.db, transaction))
+        return run(self.db.transaction())
+
+    def query_docs(self, collection: str, filters, order_by, limit) -> list[tuple[str, dict]]:
+        query = self.db.collection(collection)
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        for field, direction in order_by:
+            query = query.order_by(field, direction=direction)
+        if limit is not None:
+            query = query.limit(limit)
+        return [(doc.id, doc.to_dict() or {}) for doc in query.stream()]
+
+    def query_page(self, collection: str, filters, order_by, limit, start_after):
+        coll = self.db.collection(collection)
+        query = coll
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        for field, direction in order_by:
+            query = query.order_by(field, direction=direction)
+        # document id as the final tiebreaker keeps cursors stable
+        last_direction = order_by[-1][1] if order_by else ASCENDING
+        query = query.order_by("__name__", direction=last_direction)
+        if start_after is not None:
+            *values, doc_id = start_after
+            query = query.start_after([*values, coll.document(doc_id)])
+        docs = [(doc.id, doc.to_dict() or {}) for doc in query.limit(limit + 1).stream()]
+
+        if len(docs) <= limit:
+            return docs, None
+        docs = docs[:limit]
+        last_id, last_data = docs[-1]
+        return docs, [last_data.get(field) for field, _ in order_by] + [last_id]
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,155 @@
+"""Per-user flower statistics kept in user_stats/{user_id}.
+
+The document is updated in the same transaction as each award, so streak and
+per-day counts can be read without scanning the flowers collection:
+
+    {
+        "user_id": ...,
+        "timezone": "Europe/Paris",          # IANA name the dates are in
+        "current_streak": 3,                 # as of last_award_date
+        "longest_streak": 9,
+        "last_award_date": "2026-10-17",
+        "total_flowers": 42,
+        "tier_counts": {"EXCELLENT": 5, ...},
+        "day_counts": {"2026-10-17": {"total": 2, "SMALL": 2}, ...},
+    }
+
+day_counts only keeps the last DAY_COUNT_WINDOW days.
+
+Rebuild every user's document from the flowers collection (in whichever
+store STORAGE_BACKEND selects) with:
+    python -m db.flower_stats [--user USER_ID] [--timezone Europe/Paris]
+"""
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+COLLECTION = "user_stats"
+DAY_COUNT_WINDOW = 90
+
+
+def get_zone(name: str | None):
+    """ZoneInfo for an IANA name; UTC when name is empty. Raises ValueError if unknown."""
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown timezone: {name}") from exc
+
+
+def to_datetime(value) -> datetime | None:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            return to_datetime(datetime.fromisoformat(value))
+        except ValueError:
+            return None
+    return None
+
+
+def local_date(value, tz) -> date | None:
+    moment = to_datetime(value)
+    return moment.astimezone(tz).date() if moment else None
+
+
+def empty_stats(user_id: str, tz_name: str | None = None) -> dict:
+    return {
+        "user_id": user_id,
+        "timezone": tz_name or "UTC",
+        "current_streak": 0,
+        "longest_streak": 0,
+        "last_award_date": None,
+        "total_flowers": 0,
+        "tier_counts": {},
+        "day_counts": {},
+    }
+
+
+def apply_award(stats: dict, award_date: date, tier: str) -> dict:
+    """Return stats updated for one flower earned on award_date (user-local)."""
+    stats = {
+        **stats,
+        "tier_counts": dict(stats.get("tier_counts") or {}),
+        "day_counts": {k: dict(v) for k, v in (stats.get("day_counts") or {}).items()},
+    }
+    day_key = award_date.isoformat()
+    last = date.fromisoformat(stats["last_award_date"]) if stats.get("last_award_date") else None
+
+    if last is None or award_date > last:
+        if last is not None and award_date - last == timedelta(days=1):
+            stats["current_streak"] = stats.get("current_streak", 0) + 1
+        else:
+            stats["current_streak"] = 1
+        stats["last_award_date"] = day_key
+    # a flower dated on or before the last award day (same day, or a
+    # timezone change) is counted but does not move the streak
+
+    stats["longest_streak"] = max(stats.get("longest_streak", 0), stats["current_streak"])
+    stats["total_flowers"] = stats.get("total_flowers", 0) + 1
+    stats["tier_counts"][tier] = stats["tier_counts"].get(tier, 0) + 1
+
+    day = stats["day_counts"].setdefault(day_key, {"total": 0})
+    day["total"] += 1
+    day[tier] = day.get(tier, 0) + 1
+
+    newest = date.fromisoformat(stats["last_award_date"])
+    cutoff = (newest - timedelta(days=DAY_COUNT_WINDOW - 1)).isoformat()
+    stats["day_counts"] = {k: v for k, v in stats["day_counts"].items() if k >= cutoff}
+    return stats
+
+
+def effective_streak(stats: dict, today: date) -> int:
+    """The streak as seen today: it lapses once a full day passes without a flower."""
+    last = stats.get("last_award_date")
+    if not last:
+        return 0
+    if today - date.fromisoformat(last) > timedelta(days=1):
+        return 0
+    return stats.get("current_streak", 0)
+
+
+def rebuild(user_id: str, flowers: list[dict], tz_name: str | None = None) -> dict:
+    """Recompute a user's stats from their flowers documents."""
+    tz = get_zone(tz_name)
+    stats = empty_stats(user_id, tz_name)
+    dated = [(to_datetime(f.get("earned_at")), f) for f in flowers]
+    for earned_at, flower in sorted((d for d in dated if d[0] is not None), key=lambda d: d[0]):
+        stats = apply_award(stats, earned_at.astimezone(tz).date(), flower.get("tier") or "MICRO")
+    return stats
+
+
+def backfill(user_id: str | None = None, tz_name: str | None = None) -> int:
+    """Rebuild user_stats from the flowers collection. Returns the number of users written."""
+    from db.repository import get_store
+
+    store = get_store()
+    filters = [("user_id", "==", user_id)] if user_id else []
+
+    by_user = {}
+    for _, data in store.query_docs("flowers", filters, [], None):
+        if data.get("user_id"):
+            by_user.setdefault(data["user_id"], []).append(data)
+
+    existing = store.get_many(COLLECTION, list(by_user)) if by_user else {}
+    writes = []
+    for uid, flowers in by_user.items():
+        stored_tz = existing.get(uid, {}).get("timezone")
+        writes.append((COLLECTION, uid, rebuild(uid, flowers, tz_name or stored_tz), False))
+    if writes:
+        store.commit_batch(writes)
+    return len(by_user)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild user_stats from the flowers collection.")
+    parser.add_argument("--user", help="only rebuild this user")
+    parser.add_argument("--timezone", help="IANA timezone for day boundaries (default: each user's stored one, else UTC)")
+    args = parser.parse_args(argv)
+    get_zone(args.timezone)
+    print(f"rebuilt stats for {backfill(args.user, args.timezone)} user(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Async access to the app's documents, on the configured storage backend.
+
+STORAGE_BACKEND picks the store:
+    firestore   Cloud Firestore (default; needs serviceAccountKey.json)
+    sqlite      an embedded SQLite file at SQLITE_PATH (":memory:" for a
+                throwaway database), for single-node deployments and tests
+
+A store is a class with blocking get_doc, get_many, set_doc, update_doc,
+delete_doc, add_doc, commit_batch, run_transaction, query_docs, query_page and close
+methods (see db/firestore_store.py and db/sqlite_store.py); the functions
+below run them on a thread pool.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from metrics import span
+
+# The store clients are blocking, so every round trip runs on this pool
+# instead of the event loop. Size it for the number of calls we want
+# in flight per worker.
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", "32"))
+_executor = ThreadPoolExecutor(max_workers=FIRESTORE_MAX_WORKERS, thread_name_prefix="firestore")
+STORAGE_BACKENDS = {"firestore", "sqlite"}
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).resolve().parent.parent / ".data" / "bonita.sqlite3"))
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The configured store, built on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if STORAGE_BACKEND == "sqlite":
+                    from db.sqlite_store import SQLiteStore
+                    _store = SQLiteStore(SQLITE_PATH)
+                elif STORAGE_BACKEND == "firestore":
+                    from db.firestore_store import FirestoreStore
+                    _store = FirestoreStore()
+                else:
+                    raise ValueError(f"STORAGE_BACKEND must be one of {sorted(STORAGE_BACKENDS)}, not {STORAGE_BACKEND!r}")
+    return _store
+
+
+def _call(method: str, *args):
+    return getattr(get_store(), method)(*args)
+
+
+async def _run(method: str, *args):
+    loop = asyncio.get_running_loop()
+    # timed from the caller's side, so waiting for a pool thread counts too
+    with span(f"db.{method}"):
+        return await loop.run_in_executor(_executor, partial(_call, method, *args))
+
+
+async def get_doc(collection: str, doc_id: str) -> dict | None:
+    """Return the document data, or None if it does not exist."""
+    return await _run("get_doc", collection, doc_id)
+
+
+async def get_docs(*keys: tuple[str, str]) -> list[dict | None]:
+    """Fetch several (collection, doc_id) pairs concurrently, in order."""
+    return list(await asyncio.gather(*(get_doc(collection, doc_id) for collection, doc_id in keys)))
+
+
+async def get_many(collection: str, doc_ids: list[str]) -> dict[str, dict]:
+    """Fetch many documents of one collection in a single get_all round trip.
+
+    Returns a dict of doc_id -> data containing only the documents that exist.
+    """
+    if not doc_ids:
+        return {}
+    return await _run("get_many", collection, list(doc_ids))
+
+
+async def set_doc(collection: str, doc_id: str, data: dict, merge: bool = False) -> None:
+    await _run("set_doc", collection, doc_id, data, merge)
+
+
+async def update_doc(collection: str, doc_id: str, data: dict) -> None:
+    await _run("update_doc", collection, doc_id, data)
+
+
+async def delete_doc(collection: str, doc_id: str) -> None:
+    """Delete the document; a missing one is not an error."""
+    await _run("delete_doc", collection, doc_id)
+
+
+async def add_doc(collection: str, data: dict) -> str:
+    """Add a document with a generated id and return that id."""
+    return await _run("add_doc", collection, data)
+
+
+async def commit_batch(writes) -> None:
+    """Commit (collection, doc_id, data, merge) set() operations as one batch."""
+    if writes:
+        await _run("commit_batch", list(writes))
+
+
+async def run_transaction(fn):
+    """Run fn(txn) atomically and return its result.
+
+    txn has get(collection, doc_id), set(collection, doc_id, data, merge) and
+    delete(collection, doc_id); do every get before the first write. Firestore may retry fn on contention,
+    so it must not have side effects beyond these calls.
+    """
+    return await _run("run_transaction", fn)
+
+
+async def query_docs(collection: str, filters=(), order_by=(), limit: int | None = None) -> list[tuple[str, dict]]:
+    """Run a where() query and return (doc_id, data) pairs.
+
+    filters is a sequence of (field, op, value) tuples and order_by a sequence
+    of (field, ASCENDING | DESCENDING) tuples, both applied in order.
+    """
+    return await _run("query_docs", collection, list(filters), list(order_by), limit)
+
+
+async def query_page(collection: str, filters=(), order_by=(), limit: int = 50, cursor: str | None = None):
+    """One page of a query, in order_by order with the document id as tiebreaker.
+
+    Returns (docs, next_cursor) where docs are (doc_id, data) pairs and
+    next_cursor is None on the last page. Pass next_cursor back as `cursor`
+    to continue. Raises ValueError for a malformed cursor.
+    """
+    start_after = decode_cursor(cursor) if cursor else None
+    if start_after is not None and len(start_after) != len(order_by) + 1:
+        raise ValueError("cursor does not match this query")
+    docs, last = await _run("query_page", collection, list(filters), list(order_by), limit, start_after)
+    return docs, encode_cursor(last) if last is not None else None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(values, list) or not values or not isinstance(values[-1], str):
+        raise ValueError("invalid cursor")
+    try:
+        return [_decode_value(v) for v in values]
+    except (TypeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=True)
+    if _store is not None:
+        _store.close()
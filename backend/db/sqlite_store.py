@@ -0,0 +1,290 @@
+"""Storage backend on an embedded SQLite database, for single-node deployments and tests.
+
+Documents live in one table as JSON, keyed by (collection, doc_id), and are
+queried with json_extract(). The fields the routes filter and sort on have
+expression indexes, so the user and time-range queries are index lookups:
+
+    user_id                 every per-user query
+    user_id, earned_at      bouquet, trophy room
+    user_id, created_at     paged task lists
+    created_at              training events, oldest first
+    seq                     chat message log
+
+Top-level datetimes are stored as UTC ISO strings, so they compare and sort
+as text, and come back as datetimes. set(merge=True) merges nested maps like
+Firestore does. Writes of a batch or transaction commit atomically;
+transactions take the write lock up front (BEGIN IMMEDIATE), so they run
+one at a time and never need retrying.
+"""
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+MAX_IN_PARAMS = 500
+BUSY_TIMEOUT_MS = 10_000
+FIELD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+OPS = {"==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+INDEXED_FIELDS = (
+    ("user", ("user_id",)),
+    ("user_earned", ("user_id", "earned_at")),
+    ("user_created", ("user_id", "created_at")),
+    ("created", ("created_at",)),
+    ("seq", ("seq",)),
+)
+
+
+def _column(field: str) -> str:
+    if field == "__name__":
+        return "doc_id"
+    if not FIELD.fullmatch(field):
+        raise ValueError(f"unsupported field name: {field!r}")
+    # must match the index expressions exactly for SQLite to use them
+    return f"json_extract(data, '$.{field}')"
+
+
+def _to_sql(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    return value
+
+
+def _encode(data: dict) -> tuple[str, str | None]:
+    """(JSON text, JSON list of the top-level keys that held datetimes)."""
+    dates = [key for key, value in data.items() if isinstance(value, datetime)]
+    body = {key: _to_sql(value) for key, value in data.items()}
+    return json.dumps(body, separators=(",", ":"), default=str), json.dumps(dates) if dates else None
+
+
+def _decode(text: str, dates: str | None) -> dict:
+    data = json.loads(text)
+    for key in json.loads(dates) if dates else ():
+        if isinstance(data.get(key), str):
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+
+def _merge(base: dict, changes: dict) -> dict:
+    merged = dict(base)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _where(collection: str, filters) -> tuple[str, list]:
+    clauses, params = ["collection = ?"], [collection]
+    for field, op, value in filters:
+        column = _column(field)
+        if op == "in":
+            values = [_to_sql(v) for v in value]
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})" if values else "0")
+            params.extend(values)
+        elif value is None and op in ("==", "!="):
+            clauses.append(f"{column} IS {'NOT ' if op == '!=' else ''}NULL")
+        elif op in OPS:
+            clauses.append(f"{column} {OPS[op]} ?")
+            params.append(_to_sql(value))
+        else:
+            raise ValueError(f"unsupported operator: {op!r}")
+    return " AND ".join(clauses), params
+
+
+def _order(order_by) -> str:
+    return ", ".join(f"{_column(field)} {'DESC' if direction == DESCENDING else 'ASC'}" for field, direction in order_by)
+
+
+def _after(order_by, values) -> tuple[str, list]:
+    """Rows strictly after the cursor `values` in order_by order."""
+    alternatives, params = [], []
+    for i, (field, direction) in enumerate(order_by):
+        parts = [f"{_column(f)} = ?" for f, _ in order_by[:i]]
+        parts.append(f"{_column(field)} {'<' if direction == DESCENDING else '>'} ?")
+        alternatives.append("(" + " AND ".join(parts) + ")")
+        params.extend(_to_sql(v) for v in values[:i + 1])
+    return "(" + " OR ".join(alternatives) + ")", params
+
+
+class SQLiteTransaction:
+    """What a run_transaction callback gets; writes apply when it returns."""
+
+    def __init__(self, store, conn):
+        self._store = store
+        self._conn = conn
+        self.writes = []
+
+    def get(self, collection: str, doc_id: str) -> dict | None:
+        return self._store._get(self._conn, collection, doc_id)
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        self.writes.append((collection, doc_id, data, merge))
+
+    def delete(self, collection: str, doc_id: str):
+        self.writes.append((collection, doc_id, None, False))
+
+
+class SQLiteStore:
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # an in-memory database is private to its connection, so every pool
+        # thread shares that one connection, one call at a time
+        self._memory_lock = threading.RLock() if self.path == ":memory:" else None
+        if self._memory_lock is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._use() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " collection TEXT NOT NULL, doc_id TEXT NOT NULL, data TEXT NOT NULL, dates TEXT,"
+                " PRIMARY KEY (collection, doc_id)) WITHOUT ROWID"
+            )
+            for name, fields in INDEXED_FIELDS:
+                columns = ", ".join(_column(field) for field in fields)
+                conn.execute(f"CREATE INDEX IF NOT EXISTS docs_{name} ON docs (collection, {columns})")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _use(self):
+        if self._memory_lock is not None:
+            with self._memory_lock:
+                if not self._connections:
+                    self._open()
+                yield self._connections[0]
+            return
+        # one connection per pool thread; WAL lets readers run beside the writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        yield conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._use() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _get(self, conn, collection: str, doc_id: str) -> dict | None:
+        row = conn.execute("SELECT data, dates FROM docs WHERE collection = ? AND doc_id = ?", (collection, doc_id)).fetchone()
+        return _decode(*row) if row else None
+
+    def _write(self, conn, collection: str, doc_id: str, data: dict | None, merge: bool):
+        if data is None:
+            conn.execute("DELETE FROM docs WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+            return
+        if merge:
+            existing = self._get(conn, collection, doc_id)
+            if existing is not None:
+                data = _merge(existing, data)
+        text, dates = _encode(data)
+        conn.execute("INSERT OR REPLACE INTO docs (collection, doc_id, data, dates) VALUES (?, ?, ?, ?)", (collection, doc_id, text, dates))
+
+    def get_doc(self, collection: str, doc_id: str) -> dict | None:
+        with self._use() as conn:
+            return self._get(conn, collection, doc_id)
+
+    def get_many(self, collection: str, doc_ids: list[str]) -> dict[str, dict]:
+        found = {}
+        with self._use() as conn:
+            for start in range(0, len(doc_ids), MAX_IN_PARAMS):
+                chunk = doc_ids[start:start + MAX_IN_PARAMS]
+                rows = conn.execute(
+                    f"SELECT doc_id, data, dates FROM docs WHERE collection = ? AND doc_id IN ({','.join('?' * len(chunk))})",
+                    [collection, *chunk],
+                )
+                found.update((doc_id, _decode(text, dates)) for doc_id, text, dates in rows)
+        return found
+
+    def set_doc(self, collection: str, doc_id: str, data: dict, merge: bool = False) -> None:
+        self.commit_batch([(collection, doc_id, data, merge)])
+
+    def update_doc(self, collection: str, doc_id: str, data: dict) -> None:
+        def update(txn):
+            if txn.get(collection, doc_id) is None:
+                raise KeyError(f"No document to update: {collection}/{doc_id}")
+            txn.set(collection, doc_id, data, merge=True)
+        self.run_transaction(update)
+
+    def delete_doc(self, collection: str, doc_id: str) -> None:
+        self.commit_batch([(collection, doc_id, None, False)])
+
+    def add_doc(self, collection: str, data: dict) -> str:
+        doc_id = uuid.uuid4().hex[:20]
+        self.commit_batch([(collection, doc_id, data, False)])
+        return doc_id
+
+    def commit_batch(self, writes) -> None:
+        # no 500-operation cap: the whole batch is one SQLite transaction
+        with self._transaction() as conn:
+            for collection, doc_id, data, merge in writes:
+                self._write(conn, collection, doc_id, data, merge)
+
+    def run_transaction(self, fn):
+        with self._transaction() as conn:
+            txn = SQLiteTransaction(self, conn)
+            result = fn(txn)
+            for collection, doc_id, data, merge in txn.writes:
+                self._write(conn, collection, doc_id, data, merge)
+        return result
+
+    def _select(self, collection, filters, order_by, limit, after=None):
+        where, params = _where(collection, filters)
+        if after is not None:
+            clause, after_params = after
+            where += " AND " + clause
+            params += after_params
+        sql = f"SELECT doc_id, data, dates FROM docs WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {_order(order_by)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._use() as conn:
+            return [(doc_id, _decode(text, dates)) for doc_id, text, dates in conn.execute(sql, params)]
+
+    def query_docs(self, collection: str, filters, order_by, limit) -> list[tuple[str, dict]]:
+        return self._select(collection, filters, order_by, limit)
+
+    def query_page(self, collection: str, filters, order_by, limit, start_after):
+        # document id as the final tiebreaker keeps cursors stable
+        last_direction = order_by[-1][1] if order_by else ASCENDING
+        order = [*order_by, ("__name__", last_direction)]
+        after = _after(order, start_after) if start_after is not None else None
+        docs = self._select(collection, filters, order, limit + 1, after)
+
+        if len(docs) <= limit:
+            return docs, None
+        docs = docs[:limit]
+        last_id, last_data = docs[-1]
+        return docs, [last_data.get(field) for field, _ in order_by] + [last_id]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
@@ -0,0 +1,119 @@
+"""Phase timings, shared by every layer (db, agents, api).
+
+Code wraps the expensive parts of its work in span(phase) - store round
+trips, agent runs, tool calls, model predictions, reply parsing. Inside an
+HTTP request the time goes to that request's spans (api.metrics records them
+per route when the request ends); outside any request (the model updater
+thread, the timer flush) it is recorded straight into PHASES under
+route="background".
+
+This module has no dependencies of its own, so the db and agents layers can
+import it without importing the API.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+BACKGROUND = "background"
+
+# phase -> [seconds, calls] for the request being served, if any
+_spans: ContextVar[dict | None] = ContextVar("metrics_spans", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...], buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            base = format_labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+PHASES = Histogram("phase_duration_seconds", "Time spent in a phase, summed per request.", ("route", "phase"))
+
+
+def begin_request():
+    """Collect the spans of the current context into a fresh dict.
+
+    Returns (spans, token); pass the token to end_request().
+    """
+    spans = {}
+    return spans, _spans.set(spans)
+
+
+def end_request(token):
+    _spans.reset(token)
+
+
+def record(phase: str, seconds: float):
+    spans = _spans.get()
+    if spans is None:
+        PHASES.observe((BACKGROUND, phase), seconds)
+        return
+    entry = spans.get(phase)
+    if entry is None:
+        spans[phase] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def span(phase: str):
+    """Time the block as `phase` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+
+def timed(phase: str):
+    """Decorator form of span() for plain functions."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,32 @@
+"""Run from backend/: python -m pytest -q tests
+
+The app imports its packages absolutely (api, agents, db), as uvicorn and the
+bench scripts do from backend/.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+# keep the time model, its spool and the learner lock out of the real model dir
+os.environ.setdefault("TIME_MODEL_DIR", tempfile.mkdtemp(prefix="test-model-"))
+# and the ADK sessions in memory instead of backend/.adk
+os.environ.setdefault("ADK_SESSION_DB_URL", "memory")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A throwaway in-memory SQLite store behind db.repository."""
+    from db import repository
+    from db.sqlite_store import SQLiteStore
+
+    sqlite = SQLiteStore(":memory:")
+    monkeypatch.setattr(repository, "_store", sqlite)
+    yield sqlite
+    sqlite.close()
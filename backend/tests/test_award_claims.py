@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.llm_scheduler import Saturated
+from api.routes.flowers import award
+from db import repository
+
+TASK_ID = "task-1"
+USER_ID = "user-1"
+
+
+def seed_completed_task(store):
+    now = datetime.now(timezone.utc)
+    store.set_doc("tasks", TASK_ID, {
+        "task_id": TASK_ID, "user_id": USER_ID, "task_name": "write report", "category": "Work",
+        "priority_rank": 2, "urgency": "high", "stress_level": "medium", "estimated_time": 45,
+        "created_at": now - timedelta(hours=2),
+    })
+    store.set_doc("completed_tasks", TASK_ID, {
+        "task_id": TASK_ID, "user_id": USER_ID, "actual_time_spent_minutes": 40, "completed_at": now,
+    })
+
+
+def claim(store, token: str) -> bool:
+    return store.run_transaction(lambda txn: award._claim_award(txn, TASK_ID, token))
+
+
+def test_claim_is_exclusive_until_released(store):
+    assert claim(store, "a")
+    assert not claim(store, "b")
+    assert claim(store, "a")
+    store.run_transaction(lambda txn: award._release_claim(txn, TASK_ID, "b"))
+    assert not claim(store, "b")
+    store.run_transaction(lambda txn: award._release_claim(txn, TASK_ID, "a"))
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID) is None
+    assert claim(store, "b")
+
+
+def test_expired_claim_is_taken_over(store):
+    store.set_doc(award.CLAIM_COLLECTION, TASK_ID, {
+        "token": "dead-worker", "expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+    })
+    assert claim(store, "b")
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID)["token"] == "b"
+
+
+def test_saving_the_award_deletes_the_claim(store):
+    assert claim(store, "a")
+    flower = {
+        "task_id": TASK_ID, "user_id": USER_ID, "flower_type_id": "rose", "tier": "SMALL",
+        "message": "Nice", "earned_at": datetime.now(timezone.utc),
+    }
+    store.run_transaction(lambda txn: award._save_award(txn, flower, None))
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID) is None
+    assert not claim(store, "b")
+
+
+@pytest.mark.parametrize("error", [RuntimeError("agent crashed"), Saturated("busy")])
+def test_llm_mode_falls_back_to_rules_on_any_agent_error(store, monkeypatch, error):
+    seed_completed_task(store)
+
+    async def failing_agent(**kwargs):
+        raise error
+
+    monkeypatch.setattr(award, "AWARD_MODE", "llm")
+    monkeypatch.setattr(award, "call_flower_agent", failing_agent)
+    response = asyncio.run(award._award(award.AwardRequest(task_id=TASK_ID, user_id=USER_ID)))
+
+    assert response["tier"] in {"EXCELLENT", "MEDIUM", "SMALL", "MICRO"}
+    assert response["selected_flower"]
+    assert store.get_doc("flowers", TASK_ID) is not None
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID) is None
+
+
+def test_failed_award_releases_the_claim(store, monkeypatch):
+    seed_completed_task(store)
+
+    async def failing_save(body, award_data):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(award, "AWARD_MODE", "hybrid")
+    monkeypatch.setattr(award, "write_congrats_message", lambda *args: asyncio.sleep(0))
+    monkeypatch.setattr(award, "_store_award", failing_save)
+    with pytest.raises(RuntimeError):
+        asyncio.run(award._award(award.AwardRequest(task_id=TASK_ID, user_id=USER_ID)))
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID) is None
+
+
+def test_waiter_takes_over_a_released_claim(store, monkeypatch):
+    monkeypatch.setattr(award, "CLAIM_POLL_SECONDS", 0.01)
+    assert claim(store, "holder")
+
+    async def scenario():
+        waiter = asyncio.ensure_future(award._claim_or_wait(TASK_ID, "waiter"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await repository.run_transaction(lambda txn: award._release_claim(txn, TASK_ID, "holder"))
+        return await asyncio.wait_for(waiter, 1.0)
+
+    assert asyncio.run(scenario()) is None
+    assert store.get_doc(award.CLAIM_COLLECTION, TASK_ID)["token"] == "waiter"
+
+
+def test_waiter_gets_the_holders_award(store, monkeypatch):
+    monkeypatch.setattr(award, "CLAIM_POLL_SECONDS", 0.01)
+    assert claim(store, "holder")
+    flower = {
+        "task_id": TASK_ID, "user_id": USER_ID, "flower_type_id": "rose", "tier": "SMALL",
+        "message": "Nice", "earned_at": datetime.now(timezone.utc),
+    }
+
+    async def scenario():
+        waiter = asyncio.ensure_future(award._claim_or_wait(TASK_ID, "waiter"))
+        await asyncio.sleep(0.05)
+        await repository.run_transaction(lambda txn: award._save_award(txn, flower, None))
+        return await asyncio.wait_for(waiter, 1.0)
+
+    assert asyncio.run(scenario())["flower_type_id"] == "rose"
@@ -0,0 +1,63 @@
+import pytest
+
+from db.cache import ViewCache, etag_matches
+
+
+def test_read_that_raced_a_write_is_not_cached():
+    cache = ViewCache(max_entries=10, ttl_seconds=60)
+    version = cache.version("user")
+    cache.invalidate("user")  # a write lands while the reader is at the datastore
+    cache.put("user", {"tasks": ["stale"]}, version)
+    assert cache.get("user") is None
+
+    cache.put("user", {"tasks": ["fresh"]}, cache.version("user"))
+    assert cache.get("user")[1] == {"tasks": ["fresh"]}
+
+
+def test_patch_updates_the_entry_and_its_etag():
+    cache = ViewCache(max_entries=10, ttl_seconds=60)
+    etag = cache.put("user", {"count": 1})
+    cache.patch("user", lambda view: {**view, "count": 2})
+    new_etag, view = cache.get("user")
+    assert view == {"count": 2} and new_etag != etag
+
+    cache.patch("user", lambda view: None)
+    assert cache.get("user") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ViewCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_expired_entry_is_a_miss():
+    cache = ViewCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False), ('"x"', True), ('W/"x"', True), ('"y", "x"', True), ("*", True), ('"y"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"x"') is expected
+
+
+def test_versions_of_uncached_keys_are_pruned():
+    cache = ViewCache(max_entries=2, ttl_seconds=60)
+    cache.put("kept", 1)
+    version = cache.version("user-0")
+    for i in range(100):
+        cache.invalidate(f"user-{i}")
+    cache.patch("kept", lambda view: view + 1)
+    assert len(cache._versions) <= 2 * 2
+
+    # a read that started before its key was pruned is still not cached
+    cache.put("user-0", {"tasks": ["stale"]}, version)
+    assert cache.get("user-0") is None
+    assert cache.get("kept")[1] == 2
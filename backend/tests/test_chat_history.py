@@ -0,0 +1,56 @@
+import asyncio
+
+from api.routes import chat
+
+SESSION_ID = "session-1"
+USER_ID = "user-1"
+
+
+def turn(message: str, since: int | None = None):
+    body = chat.ChatMessage(session_id=SESSION_ID, user_id=USER_ID, message=message, since=since)
+    return chat._finish_turn(body, {}, f"reply to {message}", None)
+
+
+def test_turns_get_consecutive_seqs(store):
+    async def scenario():
+        first = await turn("first")
+        second = await turn("second")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert [m["seq"] for m in first["history"]] == [0, 1]
+    assert [m["seq"] for m in second["history"]] == [2, 3]
+    assert second["cursor"] == 4
+
+
+def test_concurrent_turns_never_share_a_seq(store):
+    async def scenario():
+        # every turn read the session before any of them wrote it
+        await asyncio.gather(*(turn(f"message {i}") for i in range(8)))
+        return await chat.load_history(SESSION_ID)
+
+    history = asyncio.run(scenario())
+    assert [m["seq"] for m in history] == list(range(16))
+    assert sorted(m["message"] for m in history if m["role"] == "user") == sorted(f"message {i}" for i in range(8))
+    assert store.get_doc("sessions", SESSION_ID)["message_count"] == 16
+
+
+def test_legacy_history_is_migrated_once(store):
+    legacy = {"user_id": USER_ID, "history": [
+        {"role": "user", "message": "old question"},
+        {"role": "agent", "message": "old answer"},
+        {"role": "user", "message": "old follow-up"},
+    ]}
+    store.set_doc("sessions", SESSION_ID, legacy)
+
+    async def scenario():
+        # both turns started before either migrated
+        body = chat.ChatMessage(session_id=SESSION_ID, user_id=USER_ID, message="new", since=0)
+        first = await chat._finish_turn(body, legacy, "one", None)
+        await chat._finish_turn(body, legacy, "two", None)
+        return first, await chat.load_history(SESSION_ID)
+
+    first, history = asyncio.run(scenario())
+    assert [m["message"] for m in first["history"]] == ["old question", "old answer", "old follow-up", "new", "one"]
+    assert [m["seq"] for m in history] == list(range(7))
+    assert [m["message"] for m in history[3:]] == ["new", "one", "new", "two"]
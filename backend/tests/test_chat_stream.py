@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+from api.routes import chat
+from db.cache import ViewCache
+
+SESSION_ID = "session-1"
+USER_ID = "user-1"
+TASKS = [
+    {"priority_rank": 1, "task_name": "Write report", "category": "Work", "estimated_time": 60},
+    {"priority_rank": 2, "task_name": "Call the bank", "category": "Other", "estimated_time": 10},
+]
+
+
+def parse_sse(chunks: list[str]) -> list[tuple[str, dict]]:
+    events = []
+    for chunk in chunks:
+        kind, data = chunk.strip().split("\n", 1)
+        events.append((kind.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_stream_saves_each_task_and_closes_the_agent_stream(store, monkeypatch):
+    reply = json.dumps(TASKS)
+    first_object_end = reply.index("}") + 1
+    state = {"closed": False, "stored_while_generating": None}
+
+    async def fake_stream(**kwargs):
+        try:
+            yield "delta", reply[:first_object_end + 1]
+            # give the first task's write a chance to land before the rest
+            for _ in range(50):
+                if store.get_doc("tasks", f"{SESSION_ID}-1") is not None:
+                    break
+                await asyncio.sleep(0.01)
+            state["stored_while_generating"] = store.get_doc("tasks", f"{SESSION_ID}-1") is not None
+            yield "delta", reply[first_object_end + 1:]
+            yield "final", reply
+            yield "final", "never read"
+        finally:
+            state["closed"] = True
+
+    monkeypatch.setattr(chat, "stream_prioritizer_agent", fake_stream)
+
+    async def scenario():
+        body = chat.ChatMessage(session_id=SESSION_ID, user_id=USER_ID, message="plan my day")
+        response = await chat.chat_stream(body, None)
+        chunks = []
+        async for chunk in response.body_iterator:
+            if chunk.startswith("event: done"):
+                # the agent stream is closed before the turn is finished
+                assert state["closed"]
+            chunks.append(chunk)
+        return parse_sse(chunks)
+
+    events = asyncio.run(scenario())
+    assert [kind for kind, _ in events] == ["task", "task", "done"]
+    assert state["stored_while_generating"]
+    done = events[-1][1]
+    assert done["list_ready"] and [t["task_name"] for t in done["tasks"]] == ["Write report", "Call the bank"]
+    for idx in (1, 2):
+        stored = store.get_doc("tasks", f"{SESSION_ID}-{idx}")
+        assert stored["completed"] is False and stored["user_id"] == USER_ID
+    assert store.get_doc("sessions", SESSION_ID)["saved_tasks"] == done["tasks"]
+
+
+def test_tasks_saved_before_a_failure_invalidate_the_task_view(store, monkeypatch):
+    reply = json.dumps(TASKS)
+    first_object_end = reply.index("}") + 1
+
+    async def fake_stream(**kwargs):
+        yield "delta", reply[:first_object_end + 1]
+        for _ in range(50):
+            if store.get_doc("tasks", f"{SESSION_ID}-1") is not None:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(chat, "stream_prioritizer_agent", fake_stream)
+    monkeypatch.setattr(chat, "task_view_cache", ViewCache(10, 60))
+    chat.task_view_cache.put(USER_ID, {"tasks": []})
+
+    async def scenario():
+        body = chat.ChatMessage(session_id=SESSION_ID, user_id=USER_ID, message="plan my day")
+        response = await chat.chat_stream(body, None)
+        return parse_sse([chunk async for chunk in response.body_iterator])
+
+    events = asyncio.run(scenario())
+    assert [kind for kind, _ in events] == ["task", "error"]
+    assert store.get_doc("tasks", f"{SESSION_ID}-1") is not None
+    assert chat.task_view_cache.get(USER_ID) is None
+
+
+def test_a_list_without_a_single_task_is_not_a_final_list():
+    assert chat.parse_final_tasks("[]") == []
+    assert chat.parse_final_tasks('[{"task_name": "  "}, {"priority_rank": 1}, "x"]') is None
+    assert [t["task_name"] for t in chat.parse_final_tasks('[{"task_name": "  "}, {"task_name": "Call"}]')] == ["Call"]
+
+
+def test_stream_of_a_list_of_junk_is_not_a_finished_turn(store, monkeypatch):
+    reply = json.dumps([{"priority_rank": 1}, {"task_name": ""}])
+
+    async def fake_stream(**kwargs):
+        yield "delta", reply
+        yield "final", reply
+
+    monkeypatch.setattr(chat, "stream_prioritizer_agent", fake_stream)
+
+    async def scenario():
+        body = chat.ChatMessage(session_id=SESSION_ID, user_id=USER_ID, message="plan my day")
+        response = await chat.chat_stream(body, None)
+        return parse_sse([chunk async for chunk in response.body_iterator])
+
+    events = asyncio.run(scenario())
+    assert [kind for kind, _ in events] == ["done"]
+    assert events[0][1]["list_ready"] is False
+    assert store.get_doc("sessions", SESSION_ID)["list_ready"] is False
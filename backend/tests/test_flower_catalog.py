@@ -0,0 +1,58 @@
+import asyncio
+import re
+import xml.etree.ElementTree as ET
+
+from starlette.requests import Request
+
+from agents.floweragent.catalog import FlowerCatalog, minify_svg
+from api.routes.flowers import assets
+
+NUMBER_LIST = re.compile(r"[A-Za-z]|-?(?:\d+\.?\d*|\.\d+)(?:e-?\d+)?")
+
+
+def tokens(value: str) -> list:
+    return [float(t) if t[-1].isdigit() else t for t in NUMBER_LIST.findall(value)]
+
+
+def test_minify_svg_is_lossless():
+    raw = b"""<?xml version="1.0"?>
+<!-- generator comment -->
+<svg xmlns="http://www.w3.org/2000/svg"
+\t viewBox="0 0  512 512" >
+  <path style="fill:#F5EBDC;" d="M462.716,141.263c-22.868,3.598 -51.839,12.365
+\t-81.582,24.685 s0.5 , 10.25 0.75-1 Z" />
+  <polygon points="10,0.5 20 , 30" />
+</svg>"""
+    minified = minify_svg(raw)
+    assert minified == (
+        b'<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 512 512">'
+        b'<path style="fill:#F5EBDC;" d="M462.716,141.263c-22.868,3.598-51.839,12.365-81.582,24.685s.5,10.25 .75-1Z"/>'
+        b'<polygon points="10,.5 20,30"/></svg>'
+    )
+    for before, after in zip(ET.fromstring(raw.split(b"?>", 1)[1]).iter(), ET.fromstring(minified.split(b"?>", 1)[1]).iter()):
+        assert before.tag == after.tag and before.keys() == after.keys()
+        for name in before.keys():
+            if name in ("d", "points", "viewBox"):
+                assert tokens(before.get(name)) == tokens(after.get(name))
+            else:
+                assert before.get(name) == after.get(name)
+
+
+def test_catalog_scans_every_root(tmp_path):
+    first, second = tmp_path / "flowers", tmp_path / "unfurl" / "flowers"
+    (first / "MICRO").mkdir(parents=True)
+    (second / "SMALL").mkdir(parents=True)
+    (first / "MICRO" / "Dauntless Daisy.svg").write_bytes(b"<svg><g/></svg>")
+    (second / "SMALL" / "Dauntless Daisy.svg").write_bytes(b"<svg><path/></svg>")
+    (second / "SMALL" / "Diligent Daffodil.svg").write_bytes(b"<svg/>")
+
+    catalog = FlowerCatalog.scan([first, second])
+    assert sorted(a.name for a in catalog.assets) == ["Dauntless Daisy.svg", "Diligent Daffodil.svg"]
+    assert catalog.get("Dauntless Daisy").body == b"<svg><g/></svg>"
+
+
+def test_asset_answers_304_to_a_weak_etag():
+    asset = assets.get_catalog().assets[0]
+    request = Request({"type": "http", "headers": [(b"if-none-match", f"W/{asset.etag}".encode())]})
+    response = asyncio.run(assets.get_flower_asset(asset.name, request))
+    assert response.status_code == 304
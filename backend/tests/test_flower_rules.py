@@ -0,0 +1,50 @@
+import pytest
+
+from agents.floweragent.flowerPrompt import FLOWER_PROMPT, FLOWER_TIERS
+from agents.floweragent.rules import TIER_ORDER, award_flower, pick_tier
+
+
+@pytest.mark.parametrize("task, tier", [
+    # the first tier with any matching condition wins
+    ({"priority_rank": 1, "stress_level": "high", "actual_time_spent_minutes": 10}, "EXCELLENT"),
+    ({"priority_rank": 9, "stress_level": "low", "actual_time_spent_minutes": 200}, "EXCELLENT"),
+    ({"priority_rank": 3, "stress_level": "low", "actual_time_spent_minutes": 5}, "MEDIUM"),
+    ({"priority_rank": 8, "stress_level": "medium"}, "MEDIUM"),
+    ({"priority_rank": 8, "stress_level": "low", "actual_time_spent_minutes": 5}, "SMALL"),
+    ({"priority_rank": 4, "category": "House Chore"}, "MEDIUM"),
+    ({"priority_rank": 11, "actual_time_spent_minutes": 5}, "MICRO"),
+    ({"category": "House Chore", "actual_time_spent_minutes": 30}, "SMALL"),
+    ({"category": "House Chore"}, "MICRO"),
+    # range boundaries, as FLOWER_PROMPT states them
+    ({"priority_rank": 5}, "MEDIUM"),
+    ({"priority_rank": 6}, "SMALL"),
+    ({"priority_rank": 10}, "SMALL"),
+    ({"actual_time_spent_minutes": 14.9}, "MICRO"),
+    ({"actual_time_spent_minutes": 15}, "SMALL"),
+    ({"actual_time_spent_minutes": 45}, "MEDIUM"),
+    ({"actual_time_spent_minutes": 120}, "MEDIUM"),
+    ({"actual_time_spent_minutes": 121}, "EXCELLENT"),
+    # unusable values match nothing
+    ({"priority_rank": "n/a", "stress_level": " HIGH "}, "EXCELLENT"),
+    ({"priority_rank": None, "stress_level": "unknown"}, "MICRO"),
+    ({}, "MICRO"),
+])
+def test_pick_tier(task, tier):
+    assert pick_tier(task) == tier
+
+
+def test_prompt_states_the_rules_the_engine_applies():
+    assert TIER_ORDER == ("EXCELLENT", "MEDIUM", "SMALL", "MICRO")
+    assert 'Conditions: priority_rank == 1 OR stress_level == "high" OR actual_time_spent_minutes > 120' in FLOWER_PROMPT
+    assert 'Conditions: priority_rank in [2..5] OR stress_level == "medium" OR 45 <= actual_time_spent_minutes <= 120' in FLOWER_PROMPT
+    assert 'Conditions: priority_rank in [6..10] OR stress_level == "low" OR 15 <= actual_time_spent_minutes < 45' in FLOWER_PROMPT
+    assert 'Conditions: actual_time_spent_minutes < 15 OR category == "House Chore"' in FLOWER_PROMPT
+
+
+def test_award_is_deterministic_and_from_its_tier():
+    task = {"task_id": "t-1", "task_name": "Taxes", "priority_rank": 4, "stress_level": "medium", "actual_time_spent_minutes": 50}
+    first = award_flower(task)
+    assert first == award_flower(task)
+    assert first["tier"] == "MEDIUM"
+    assert first["selected_flower"] in FLOWER_TIERS["MEDIUM"]
+    assert "Taxes" in first["congrats_message"]
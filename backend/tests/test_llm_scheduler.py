@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+
+from api.llm_scheduler import AgentLane, CircuitBreaker, CircuitOpen, DeadlineExceeded, Saturated
+
+
+class Boom(Exception):
+    pass
+
+
+def half_open_lane(**kwargs) -> AgentLane:
+    """A lane whose breaker has opened and whose cooldown has just ended."""
+    lane = AgentLane("test", **{"concurrency": 1, "max_queue": 1, "timeout": 5.0, **kwargs})
+    lane.breaker = CircuitBreaker(failures=1, cooldown=60)
+    lane.breaker.failure()
+    lane.breaker._opened_at = time.monotonic() - 61
+    assert lane.breaker.state == "half_open"
+    return lane
+
+
+async def succeed(lane: AgentLane):
+    async with lane.slot():
+        pass
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+
+def test_breaker_lets_one_trial_through_when_half_open():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    breaker.failure()
+    assert breaker.check() is True
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.check() is False
+
+
+def test_failed_trial_reopens():
+    async def scenario():
+        lane = half_open_lane()
+        with pytest.raises(Boom):
+            async with lane.slot():
+                raise Boom()
+        assert lane.breaker.state == "open"
+        assert lane.breaker.opened == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_trial_releases_the_breaker():
+    async def scenario():
+        lane = half_open_lane()
+        entered = asyncio.Event()
+
+        async def trial():
+            async with lane.slot():
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(trial())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert lane.breaker.allows()
+        await succeed(lane)
+        assert lane.breaker.state == "closed"
+        assert lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_closed_stream_releases_the_breaker():
+    async def scenario():
+        lane = half_open_lane()
+
+        async def stream():
+            async with lane.slot():
+                yield "token"
+                yield "token"
+
+        events = stream()
+        assert await events.__anext__() == "token"
+        await events.aclose()
+        assert lane.breaker.allows()
+        await succeed(lane)
+        assert lane.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_saturated_call_does_not_take_the_trial():
+    async def scenario():
+        lane = half_open_lane(max_queue=0)
+        await lane._slots.acquire()
+        with pytest.raises(Saturated):
+            await succeed(lane)
+        lane._slots.release()
+        assert lane.breaker.allows()
+        await succeed(lane)
+        assert lane.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_deadline_while_queued_does_not_take_the_trial():
+    async def scenario():
+        lane = half_open_lane()
+        await lane._slots.acquire()
+        with pytest.raises(DeadlineExceeded):
+            async with lane.slot(lane.deadline(0.01)):
+                pass
+        lane._slots.release()
+        assert lane.breaker.allows()
+        assert lane.queued == 0
+        await succeed(lane)
+        assert lane.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_open_breaker_short_circuits_without_queueing():
+    async def scenario():
+        lane = half_open_lane()
+        lane.breaker._opened_at = time.monotonic()
+        with pytest.raises(CircuitOpen):
+            await succeed(lane)
+        assert lane.counts["short_circuited"] == 1
+        assert lane.queued == 0 and lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_hedge_returns_the_first_result_and_frees_its_slot():
+    async def scenario():
+        lane = AgentLane("test", concurrency=2, max_queue=0, timeout=5.0, hedge_after=0.01)
+        started = []
+
+        async def call(attempt):
+            started.append(attempt)
+            await asyncio.sleep(1.0 if attempt == 0 else 0.01)
+            return attempt
+
+        assert await lane.run(call) == 1
+        assert started == [0, 1]
+        assert lane.counts["hedged"] == 1
+        assert lane.in_flight == 0 and not lane._slots.locked()
+
+    asyncio.run(scenario())
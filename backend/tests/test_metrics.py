@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+import metrics
+from tests.conftest import BACKEND
+
+
+def test_db_and_agents_do_not_import_the_api():
+    code = (
+        "import sys, db.repository, db.sqlite_store, agents.prioritizer.model_updates; "
+        "print(sorted(m for m in sys.modules if m == 'api' or m.startswith('api.')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_spans_go_to_the_current_request_or_background():
+    spans, token = metrics.begin_request()
+    try:
+        with metrics.span("db.get_doc"):
+            pass
+        metrics.record("db.get_doc", 0.5)
+    finally:
+        metrics.end_request(token)
+    assert spans["db.get_doc"][1] == 2 and spans["db.get_doc"][0] >= 0.5
+
+    before = metrics.PHASES._series.get((metrics.BACKGROUND, "test.phase"), [None, 0.0, 0])[2]
+    metrics.record("test.phase", 0.01)
+    assert metrics.PHASES._series[(metrics.BACKGROUND, "test.phase")][2] == before + 1
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+
+import pytest
+
+from agents.prioritizer import model_updates
+from agents.prioritizer.model_updates import LearnerLock, ModelUpdater, UpdateSpool
+from agents.prioritizer.predicttime import OnlineTimeModel
+from tests.test_time_model import samples
+
+
+@pytest.fixture
+def updater(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_updates, "_model", OnlineTimeModel())
+    updater = ModelUpdater(
+        model_updates.get_model,
+        path=tmp_path / "time_model.json",
+        checkpoint_every=1000,
+        spool=UpdateSpool(tmp_path / "spool.sqlite"),
+        learner_lock=LearnerLock(tmp_path / "learner.lock"),
+    )
+    yield updater
+    updater._learner_lock.release()
+    updater._spool.close()
+
+
+def test_learner_publishes_a_new_model_and_leaves_the_old_one_alone(updater):
+    published = model_updates.get_model()
+    updater._tick([list(samples(40))], stopping=False)
+
+    learned = model_updates.get_model()
+    assert learned is not published
+    assert published.n == 0
+    assert learned.n == 1
+
+
+def test_scoring_does_not_wait_for_the_model_lock(updater):
+    with model_updates.model_lock:
+        # a learner holding the lock would have blocked predictions before
+        assert model_updates.get_model().predict_many([{"category": "Social"}])
+
+
+def test_each_submitted_batch_is_learned_as_one_update(updater):
+    batch = list(samples(10))
+    single = next(samples(1, seed=3))
+    updater._tick([batch, [single]], stopping=False)
+
+    expected = OnlineTimeModel()
+    expected.learn_many([x for x, _ in batch], [y for _, y in batch])
+    expected.learn(*single)
+    assert model_updates.get_model().to_params() == expected.to_params()
+
+
+def test_rows_spooled_without_a_batch_are_learned_one_by_one(updater, tmp_path):
+    conn = sqlite3.connect(tmp_path / "spool.sqlite")
+    conn.execute("CREATE TABLE updates (id INTEGER PRIMARY KEY AUTOINCREMENT, features TEXT NOT NULL, y REAL NOT NULL)")
+    conn.executemany("INSERT INTO updates (features, y) VALUES (?, ?)", [(json.dumps(x), y) for x, y in samples(5)])
+    conn.commit()
+    conn.close()
+    updater._tick([], stopping=False)
+
+    expected = OnlineTimeModel()
+    for x, y in samples(5):
+        expected.learn(x, y)
+    assert model_updates.get_model().to_params() == expected.to_params()
+
+
+def test_a_batch_split_by_the_read_size_is_learned_whole(updater, monkeypatch):
+    monkeypatch.setattr(model_updates, "SPOOL_READ_SIZE", 4)
+    batches = [list(samples(3, seed=seed)) for seed in (1, 2, 3)] + [list(samples(9, seed=4))]
+    updater._tick(batches, stopping=False)
+
+    expected = OnlineTimeModel()
+    for batch in batches:
+        expected.learn_many([x for x, _ in batch], [y for _, y in batch])
+    assert model_updates.get_model().to_params() == expected.to_params()
+    assert updater._spool.read(updater._applied_id) == []
@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api.routes import actualTime
+from api.routes.flowers import award
+from db import repository
+from tests.conftest import BACKEND
+
+USER_ID = "user-1"
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["sqlite", "firestore"])
+def backend(request, store, monkeypatch):
+    """The SQLite store, and the Firestore store on the in-memory fake."""
+    if request.param == "sqlite":
+        return store
+    from bench.fake_firestore import FakeFirestore, transactional
+    from db import firebase
+    from db.firestore_store import FirestoreStore
+
+    # set in the module dict: getattr() would build the real client first
+    monkeypatch.setitem(vars(firebase), "db", FakeFirestore())
+    monkeypatch.setitem(vars(firebase), "transactional", transactional)
+    firestore = FirestoreStore()
+    monkeypatch.setattr(repository, "_store", firestore)
+    return firestore
+
+
+def seed(backend, count: int = 23):
+    for i in range(count):
+        backend.set_doc("tasks", f"t{i:02d}", {
+            "user_id": USER_ID if i % 4 else "someone-else",
+            # few distinct ranks, so the document id has to break ties
+            "priority_rank": i % 3,
+            "completed": False,
+            "created_at": START + timedelta(hours=i // 2),
+        })
+
+
+def all_pages(filters, order_by, limit: int) -> list[str]:
+    seen, cursor = [], None
+    while True:
+        docs, cursor = asyncio.run(repository.query_page("tasks", filters, order_by, limit, cursor))
+        seen += [doc_id for doc_id, _ in docs]
+        if cursor is None:
+            return seen
+        assert len(docs) == limit
+
+
+@pytest.mark.parametrize("limit", [1, 4, 17, 100])
+def test_pages_cover_every_match_once_in_order(backend, limit):
+    seed(backend)
+    filters = [("user_id", "==", USER_ID)]
+    seen = all_pages(filters, [("priority_rank", repository.ASCENDING)], limit)
+
+    docs = {doc_id: data for doc_id, data in asyncio.run(repository.query_docs("tasks", filters))}
+    assert seen == sorted(docs, key=lambda doc_id: (docs[doc_id]["priority_rank"], doc_id))
+
+
+def test_descending_datetime_pages(backend):
+    seed(backend)
+    seen = all_pages([("user_id", "==", USER_ID)], [("created_at", repository.DESCENDING)], 5)
+
+    docs = dict(asyncio.run(repository.query_docs("tasks", [("user_id", "==", USER_ID)])))
+    assert seen == sorted(docs, key=lambda doc_id: (docs[doc_id]["created_at"], doc_id), reverse=True)
+
+
+def test_cursor_round_trips_datetimes():
+    values = [START, 3, None, "t07"]
+    assert repository.decode_cursor(repository.encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", repository.encode_cursor([1, 2])[:-2]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        repository.decode_cursor(cursor)
+
+
+def test_cursor_from_another_query_is_rejected(store):
+    seed(store)
+    _, cursor = asyncio.run(repository.query_page("tasks", [], [("priority_rank", repository.ASCENDING)], 2))
+    with pytest.raises(ValueError):
+        asyncio.run(repository.query_page("tasks", [], [], 2, cursor))
+
+
+def test_task_page_answers_400_to_a_bad_cursor(store):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(actualTime._get_tasks_page(USER_ID, 10, "garbage", None, None, None, None))
+    assert exc.value.status_code == 400
+
+
+class _Recorded(Exception):
+    pass
+
+
+def _index_for(indexes, collection, filters, order_by):
+    """The composite index in firestore.indexes.json that serves this query, if any."""
+    ordered = [field for field, _ in order_by]
+    equality = {field for field, op, _ in filters if op == "==" and field not in ordered}
+    wanted = [*order_by, ("__name__", order_by[-1][1])]
+    for index in indexes:
+        fields = [(f["fieldPath"], f["order"]) for f in index["fields"]]
+        if index["collectionGroup"] != collection or len(fields) != len(equality) + len(wanted):
+            continue
+        if {f for f, _ in fields[:len(equality)]} == equality and fields[len(equality):] == wanted:
+            return index
+    return None
+
+
+def test_every_paged_query_has_a_composite_index(store, monkeypatch):
+    indexes = json.loads((BACKEND / "firestore.indexes.json").read_text())["indexes"]
+    queries = []
+
+    async def record(collection, filters, order_by, limit, cursor):
+        queries.append((collection, filters, order_by))
+        raise _Recorded
+
+    monkeypatch.setattr(repository, "query_page", record)
+    for completed, category, after, before in itertools.product((None, False), (None, "Social"), (None, START), (None, START)):
+        with pytest.raises(_Recorded):
+            asyncio.run(actualTime._get_tasks_page(USER_ID, 10, None, completed, category, after, before))
+    for tier, start in itertools.product((None, "small"), (None, START)):
+        with pytest.raises(_Recorded):
+            asyncio.run(award.get_trophy_room(USER_ID, tz="UTC", limit=10, cursor=None, start=start, end=None, tier=tier))
+
+    assert len(queries) == 20
+    for collection, filters, order_by in queries:
+        assert _index_for(indexes, collection, filters, order_by), (collection, filters, order_by)
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from api import providers
+from api.providers import Lazy, provider
+from api.routes import status
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty provider registry in place of the app's."""
+    registered = []
+    monkeypatch.setattr(providers, "PROVIDERS", registered)
+    return registered
+
+
+def test_factory_runs_once_on_first_use():
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.01)
+        return object()
+
+    lazy = Lazy("thing", build)
+    assert not lazy.ready and calls == []
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(lazy.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert lazy.ready and lazy.status()["seconds"] is not None
+    assert asyncio.run(lazy.aget()) is results[0]
+
+
+def test_failed_build_is_reported_and_retried():
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("no credentials")
+        return "client"
+
+    lazy = Lazy("storage", build)
+    with pytest.raises(RuntimeError):
+        lazy.get()
+    assert lazy.status() == {"ready": False, "seconds": None, "error": "RuntimeError('no credentials')"}
+
+    assert lazy.get() == "client"
+    assert lazy.status()["ready"] and lazy.status()["error"] is None
+
+
+def test_set_replaces_the_factory():
+    lazy = Lazy("runner", lambda: pytest.fail("factory should not run"))
+    lazy.set("scripted")
+    assert lazy.get() == "scripted" and lazy.status()["seconds"] == 0.0
+
+
+def test_warm_up_builds_every_provider_and_survives_failures(registry, caplog):
+    @provider("good")
+    def good():
+        return "ok"
+
+    @provider("broken")
+    def broken():
+        raise RuntimeError("import failed")
+
+    assert registry == [good, broken]
+    with caplog.at_level(logging.ERROR, logger="api.providers"):
+        asyncio.run(providers.warm_up())
+
+    assert "warmup of broken failed" in caplog.text
+    state = providers.readiness()
+    assert state["ready"] is False
+    assert state["providers"]["good"]["ready"] is True
+    assert state["providers"]["broken"] == {"ready": False, "seconds": None, "error": "RuntimeError('import failed')"}
+
+
+def test_readiness_endpoint_is_503_until_every_provider_is_built(registry):
+    lazy = provider("late")(lambda: "built")
+
+    response = asyncio.run(status.get_readiness())
+    assert response.status_code == 503
+    assert json.loads(response.body)["providers"]["late"]["ready"] is False
+
+    lazy.get()
+    response = asyncio.run(status.get_readiness())
+    assert response.status_code == 200 and json.loads(response.body)["ready"] is True
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from agents.prioritizer import retrain
+from agents.prioritizer.predicttime import OnlineTimeModel, read_snapshot
+from tests.test_time_model import samples
+
+
+def events(count: int, seed: int = 7):
+    return [{"features": x, "actual_time_spent_minutes": y} for x, y in samples(count, seed)]
+
+
+def online(count: int, seed: int = 7) -> OnlineTimeModel:
+    model = OnlineTimeModel()
+    for x, y in samples(count, seed):
+        model.learn(x, y)
+    return model
+
+
+def assert_same_model(model, expected):
+    for name, value in expected.to_params().items():
+        assert model.to_params()[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+
+def test_replay_of_single_events_matches_online_learning():
+    model = OnlineTimeModel()
+    report = retrain.replay(retrain.iter_batches(events(300), batch_size=1), model)
+
+    expected = online(300)
+    assert report["samples"] == 300
+    assert report["mae"] == pytest.approx(expected.mae, abs=1e-3)
+    assert_same_model(model, expected)
+
+
+def test_batched_replay_is_learn_many():
+    log = events(300, seed=3)
+    model = OnlineTimeModel()
+    retrain.replay(retrain.iter_batches(log, batch_size=32), model)
+
+    expected = OnlineTimeModel()
+    for start in range(0, len(log), 32):
+        batch = log[start:start + 32]
+        expected.learn_many([e["features"] for e in batch], [e["actual_time_spent_minutes"] for e in batch])
+    assert_same_model(model, expected)
+
+
+def test_unusable_events_are_skipped():
+    log = [
+        {"features": {"category": "Social"}, "actual_time_spent_minutes": None},
+        {"features": {"category": "Social"}, "actual_time_spent_minutes": "n/a"},
+        {"features": {"category": "Social"}, "actual_time_spent_minutes": 0},
+        {"actual_time_spent_minutes": float("nan")},
+        {"features": {"category": "Social"}, "actual_time_spent_minutes": "25"},
+    ]
+    (X, y), = retrain.iter_batches(log, batch_size=32)
+    assert X.shape == (1, 6) and y.tolist() == [25.0]
+
+
+def test_main_writes_a_loadable_snapshot(tmp_path, capsys):
+    export = tmp_path / "events.jsonl"
+    export.write_text("\n".join(json.dumps(e) for e in events(100)) + "\n\n")
+    out = tmp_path / "time_model.json"
+
+    retrain.main(["--jsonl", str(export), "--out", str(out), "--batch-size", "1"])
+
+    assert json.loads(capsys.readouterr().out.splitlines()[0])["samples"] == 100
+    assert_same_model(OnlineTimeModel.from_params(read_snapshot(out)), online(100))
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    export = tmp_path / "events.jsonl"
+    export.write_text("\n".join(json.dumps(e) for e in events(10)))
+    out = tmp_path / "time_model.json"
+    retrain.main(["--jsonl", str(export), "--out", str(out), "--dry-run"])
+    assert not out.exists()
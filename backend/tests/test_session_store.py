@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+
+from agents import session_store
+from agents.session_store import BoundedSessionService
+
+APP = "app"
+USER_ID = "user-1"
+
+
+class CountingBacking(InMemorySessionService):
+    """The in-memory service, counting reads and optionally failing appends."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.fail_appends = False
+
+    async def get_session(self, **kwargs):
+        self.reads += 1
+        return await super().get_session(**kwargs)
+
+    async def append_event(self, session, event):
+        if self.fail_appends:
+            raise ValueError("stale session")
+        return await super().append_event(session, event)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def get(service, session_id):
+    return run(service.get_session(app_name=APP, user_id=USER_ID, session_id=session_id))
+
+
+def create(service, session_id):
+    return run(service.create_session(app_name=APP, user_id=USER_ID, session_id=session_id))
+
+
+def test_cached_session_is_served_without_the_backing_store():
+    backing = CountingBacking()
+    service = BoundedSessionService(backing, max_sessions=2, ttl_seconds=60)
+    session = create(service, "a")
+
+    assert get(service, "a") is session
+    assert backing.reads == 0
+    assert (service.hits, service.misses) == (1, 0)
+
+
+def test_least_recently_used_session_is_evicted():
+    backing = CountingBacking()
+    service = BoundedSessionService(backing, max_sessions=2, ttl_seconds=60)
+    for session_id in ("a", "b"):
+        create(service, session_id)
+    get(service, "a")
+    create(service, "c")
+
+    stats = service.stats()
+    assert stats["live_sessions"] == 2 and stats["evictions"] == 1
+    # b fell out and is read back from the backing store; a and c did not
+    assert get(service, "b").id == "b" and backing.reads == 1
+    assert service.stats()["approx_bytes"] > 0
+
+
+def test_expired_session_is_reloaded(monkeypatch):
+    backing = CountingBacking()
+    service = BoundedSessionService(backing, max_sessions=10, ttl_seconds=60)
+    clock = [1000.0]
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    create(service, "a")
+
+    clock[0] += 30
+    get(service, "a")
+    assert backing.reads == 0
+    # each use extends the entry
+    clock[0] += 59
+    get(service, "a")
+    assert backing.reads == 0
+    clock[0] += 61
+    assert get(service, "a").id == "a"
+    assert backing.reads == 1 and service.evictions == 1
+
+
+def test_a_failed_append_drops_the_cached_session():
+    backing = CountingBacking()
+    service = BoundedSessionService(backing, max_sessions=10, ttl_seconds=60)
+    session = create(service, "a")
+    run(service.append_event(session, Event(author="user")))
+    assert get(service, "a") is session and backing.reads == 0
+
+    backing.fail_appends = True
+    with pytest.raises(ValueError):
+        run(service.append_event(session, Event(author="user")))
+    assert service.stats()["live_sessions"] == 0
+
+    reloaded = get(service, "a")
+    assert backing.reads == 1
+    assert reloaded is not session and len(reloaded.events) == 1
+
+
+def test_a_cache_size_of_zero_always_reads_through():
+    backing = CountingBacking()
+    service = BoundedSessionService(backing, max_sessions=0, ttl_seconds=60)
+    create(service, "a")
+    get(service, "a")
+    get(service, "a")
+    assert backing.reads == 2 and service.stats()["live_sessions"] == 0
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from db.cache import SingleFlight
+
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight(ttl_seconds=60)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "award"
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do("task", work) for _ in range(5)))
+        return results + [await flights.do("task", work)]
+
+    assert asyncio.run(scenario()) == ["award"] * 6
+    assert len(calls) == 1
+    assert (flights.shared, flights.hits) == (4, 1)
+
+
+def test_single_flight_does_not_cache_failures():
+    flights = SingleFlight(ttl_seconds=60)
+    outcomes = iter([RuntimeError("agent down"), "award"])
+
+    async def work():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await flights.do("task", work)
+        return await flights.do("task", work)
+
+    assert asyncio.run(scenario()) == "award"
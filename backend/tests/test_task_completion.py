@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from api.routes import actualTime
+from api.timer_engine import TimerEngine
+from db import repository
+
+USER_ID = "user-1"
+
+
+@pytest.fixture
+def engine(store, monkeypatch):
+    engine = TimerEngine()
+    monkeypatch.setattr(actualTime, "timer_engine", engine)
+    monkeypatch.setattr(actualTime.model_updater, "submit_many", lambda samples: True)
+    for task_id in ("a", "b"):
+        store.set_doc("tasks", task_id, {"user_id": USER_ID, "task_name": task_id, "category": "Social", "completed": False})
+    return engine
+
+
+def failing_write(*args, **kwargs):
+    raise RuntimeError("datastore unavailable")
+
+
+def test_timer_survives_a_failed_batch_completion(store, engine, monkeypatch):
+    asyncio.run(engine.start("a", USER_ID))
+    body = actualTime.CompleteTasksRequest(user_id=USER_ID, tasks=[{"task_id": "a"}, {"task_id": "b", "actual_time_spent_minutes": 5}])
+    with monkeypatch.context() as m:
+        m.setattr(repository, "commit_batch", failing_write)
+        with pytest.raises(RuntimeError):
+            asyncio.run(actualTime.complete_tasks(body))
+    assert asyncio.run(engine.state("a", USER_ID))["state"] == "running"
+
+    result = asyncio.run(actualTime.complete_tasks(body))
+    assert result["succeeded"] == 2
+    assert store.get_doc("tasks", "a")["timer_events"][-1][0] == "c"
+    assert "a" not in engine._timers
+
+
+def test_timer_survives_a_failed_single_completion(store, engine, monkeypatch):
+    asyncio.run(engine.start("a", USER_ID))
+    submitted = []
+    monkeypatch.setattr(actualTime.model_updater, "submit", lambda features, y: submitted.append(y))
+    with monkeypatch.context() as m:
+        m.setattr(repository, "commit_batch", failing_write)
+        with pytest.raises(RuntimeError):
+            asyncio.run(actualTime.complete_task(actualTime.CompleteTaskRequest(task_id="a", user_id=USER_ID)))
+    assert asyncio.run(engine.state("a", USER_ID))["state"] == "running"
+    # nothing was written, so nothing is learned
+    assert submitted == []
+    assert store.get_doc("completed_tasks", "a") is None
+
+    asyncio.run(actualTime.complete_task(actualTime.CompleteTaskRequest(task_id="a", user_id=USER_ID)))
+    assert len(submitted) == 1
+    assert store.get_doc("tasks", "a")["completed"] is True
+    assert store.get_doc("completed_tasks", "a")["actual_time_spent_minutes"] == submitted[0]
+    assert "a" not in engine._timers
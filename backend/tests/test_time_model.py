@@ -0,0 +1,182 @@
+import random
+import subprocess
+import sys
+
+import pytest
+
+from agents.prioritizer.predicttime import (
+    CATEGORY_TO_ID,
+    OnlineTimeModel,
+    SnapshotError,
+    read_snapshot,
+    write_snapshot,
+)
+from tests.conftest import BACKEND
+
+
+def samples(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    categories = list(CATEGORY_TO_ID)
+    for _ in range(count):
+        x = {
+            "category": rng.choice(categories),
+            "hour_of_day": rng.randrange(24),
+            "day_of_week": rng.randrange(7),
+            "estimated_subtasks": rng.randrange(1, 5),
+            "is_vague": rng.random() < 0.3,
+            "has_dependencies": rng.random() < 0.2,
+        }
+        yield x, 10 + 8 * CATEGORY_TO_ID[x["category"]] + 5 * x["estimated_subtasks"] + rng.gauss(0, 4)
+
+
+def trained(count: int = 200) -> OnlineTimeModel:
+    model = OnlineTimeModel()
+    for x, y in samples(count):
+        model.learn(x, y)
+    return model
+
+
+def test_learns_exactly_like_the_river_pipeline():
+    pytest.importorskip("river")
+    from river import compose, linear_model, metrics, optim, preprocessing
+
+    from agents.prioritizer.predicttime import _feature_row, _normalize_features
+
+    pipeline = compose.Pipeline(preprocessing.StandardScaler(), linear_model.LinearRegression(optimizer=optim.SGD(0.01)))
+    mae = metrics.MAE()
+    model = OnlineTimeModel()
+    for x, y in samples(300):
+        features = _normalize_features(x)
+        y_hat = max(pipeline.predict_one(features) or 45.0, 5.0)
+        mae.update(max(y, 5.0), y_hat)
+        pipeline.learn_one(features, max(y, 5.0))
+        model.learn(x, y)
+
+    x = next(samples(1, seed=99))[0]
+    assert model.mae == pytest.approx(mae.get(), rel=1e-9)
+    assert model._raw_predict(_feature_row(x)) == pytest.approx(pipeline.predict_one(_normalize_features(x)), rel=1e-9)
+
+
+def test_predict_many_matches_predict():
+    model = trained()
+    xs = [x for x, _ in samples(20, seed=3)]
+    for batched, single in zip(model.predict_many(xs), [model.predict(x) for x in xs]):
+        assert batched["reason"] == single["reason"]
+        assert batched["confidence"] == pytest.approx(single["confidence"])
+        assert batched["predicted_minutes"] == pytest.approx(single["predicted_minutes"])
+    assert model.predict_many([]) == []
+
+
+def test_untrained_model_gives_no_estimate():
+    result = OnlineTimeModel().predict({"category": "Social"})
+    assert result["predicted_minutes"] is None
+    assert result["reason"] == "insufficient_training_data"
+
+
+def test_snapshot_round_trip(tmp_path):
+    model = trained()
+    path = tmp_path / "time_model.json"
+    write_snapshot(model.to_params(), path)
+    loaded = OnlineTimeModel.from_params(read_snapshot(path))
+    assert loaded.to_params() == model.to_params()
+
+    # a loaded model owns its arrays and keeps learning
+    x, y = next(samples(1, seed=5))
+    loaded.learn(x, y)
+    assert loaded.n == model.n + 1
+
+
+def test_snapshot_checksum_is_verified(tmp_path):
+    path = tmp_path / "time_model.json"
+    write_snapshot(trained(50).to_params(), path)
+    arrays = next(tmp_path.glob("time_model.*.npy"))
+    data = bytearray(arrays.read_bytes())
+    data[-1] ^= 0xFF
+    arrays.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+def test_loading_and_scoring_do_not_import_river(tmp_path):
+    path = tmp_path / "time_model.json"
+    write_snapshot(trained(50).to_params(), path)
+    code = (
+        "import sys; from pathlib import Path; "
+        "from agents.prioritizer.predicttime import OnlineTimeModel, read_snapshot; "
+        f"m = OnlineTimeModel.from_params(read_snapshot(Path({str(path)!r}))); "
+        "m.predict_many([{'category': 'Social'}]); "
+        "print(any(name.split('.')[0] in ('river', 'pandas') for name in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_feature_matrix_matches_row_by_row_normalization():
+    from agents.prioritizer.predicttime import _feature_row, feature_matrix
+
+    xs = [
+        {"category": "Learning", "hour_of_day": 9, "day_of_week": 2, "estimated_subtasks": 3, "is_vague": True},
+        {"category": " Social ", "hour_of_day": 30, "day_of_week": -1, "estimated_subtasks": 0, "has_dependencies": 1},
+        {"category": "Gardening", "hour_of_day": 7.9, "day_of_week": float("nan"), "is_vague": 0.0},
+        {"category": None, "hour_of_day": "14", "day_of_week": "3.5", "estimated_subtasks": None, "is_vague": "yes"},
+        {},
+        None,
+    ]
+    assert feature_matrix(xs).tolist() == [_feature_row(x) for x in xs]
+    assert feature_matrix([]).shape == (0, 6)
+
+
+def test_copy_does_not_share_state():
+    model = trained(50)
+    before = model.to_params()
+    copy = model.copy()
+    x, y = next(samples(1, seed=11))
+    copy.learn(x, y)
+    assert model.to_params() == before
+    assert copy.n == model.n + 1
+
+
+def test_learn_many_of_one_row_is_learn():
+    batched, single = trained(50), trained(50)
+    for x, y in samples(30, seed=5):
+        batched.learn_many([x], [y])
+        single.learn(x, y)
+    for name, value in single.to_params().items():
+        assert batched.to_params()[name] == pytest.approx(value, rel=1e-9)
+
+
+def test_learn_many_is_one_update_for_the_batch():
+    from agents.prioritizer.predicttime import feature_matrix
+
+    model = trained(50)
+    before = model.copy()
+    batch = list(samples(25, seed=13))
+    xs, ys = [x for x, _ in batch], [y for _, y in batch]
+    model.learn_many(xs + [xs[0]], ys + [None])
+
+    # the invalid y is skipped, the other rows are merged at once
+    assert model.n == before.n + 1
+    assert model.means == pytest.approx((before.means * 50 + feature_matrix(xs).sum(axis=0)) / 75)
+    errors = [abs(max(y, 5.0) - max(before._raw_predict(row), 5.0)) for row, y in zip(feature_matrix(xs), ys)]
+    assert model.mae == pytest.approx((before.mae * 50 + sum(errors)) / 75)
+
+
+def test_one_large_batch_does_not_make_the_model_trusted():
+    model = OnlineTimeModel()
+    batch = list(samples(500))
+    model.learn_many([x for x, _ in batch], [y for _, y in batch])
+    assert model.n == 1
+    assert model.predict(batch[0][0])["reason"] == "insufficient_training_data"
+
+
+def test_every_model_and_update_gets_a_new_version():
+    model = OnlineTimeModel()
+    versions = [model.version]
+    x, y = next(samples(1))
+    model.learn(x, y)
+    versions.append(model.version)
+    model.learn_many([x, x], [y, y])
+    versions.append(model.version)
+    versions.append(model.copy().version)
+    versions.append(OnlineTimeModel.from_params(model.to_params()).version)
+    assert versions == sorted(set(versions))
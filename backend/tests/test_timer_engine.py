@@ -0,0 +1,159 @@
+import asyncio
+import logging
+
+import pytest
+
+from api import timer_engine as timer_module
+from api.timer_engine import TimerEngine, TimerError
+from db import repository
+
+USER_ID = "user-1"
+
+
+@pytest.fixture
+def engine(store):
+    store.set_doc("tasks", "a", {"user_id": USER_ID, "task_name": "a", "completed": False})
+    return TimerEngine()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_start_pause_resume(engine):
+    assert run(engine.start("a", USER_ID))["state"] == "running"
+    assert run(engine.start("a", USER_ID))["state"] == "running"
+    paused = run(engine.pause("a", USER_ID))
+    assert (paused["state"], paused["paused_count"]) == ("paused", 1)
+    with pytest.raises(TimerError) as exc:
+        run(engine.start("a", USER_ID))
+    assert exc.value.status_code == 409
+    resumed = run(engine.resume("a", USER_ID))
+    assert (resumed["state"], resumed["timer_cycle"]) == ("running", 2)
+
+
+def test_unknown_task_and_other_users_are_refused(engine):
+    with pytest.raises(TimerError) as exc:
+        run(engine.start("missing", USER_ID))
+    assert exc.value.status_code == 404
+    with pytest.raises(TimerError) as exc:
+        run(engine.pause("a", "someone-else"))
+    assert exc.value.status_code == 403
+
+
+def test_flush_writes_dirty_timers_in_one_batch(engine, store, monkeypatch):
+    batches = []
+    commit_batch = repository.commit_batch
+
+    async def counting(writes):
+        batches.append(writes)
+        await commit_batch(writes)
+
+    monkeypatch.setattr(repository, "commit_batch", counting)
+    run(engine.start("a", USER_ID))
+    run(engine.pause("a", USER_ID))
+    run(engine.flush())
+    run(engine.flush())
+
+    assert len(batches) == 1
+    assert [code for code, _ in store.get_doc("tasks", "a")["timer_events"]] == ["s", "p"]
+
+
+def test_failed_flush_is_logged_and_retried(engine, store, monkeypatch, caplog):
+    async def failing(writes):
+        raise RuntimeError("datastore unavailable")
+
+    async def scenario():
+        await engine.start("a", USER_ID)
+        with monkeypatch.context() as m:
+            m.setattr(repository, "commit_batch", failing)
+            engine.start_flushing()
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.05)
+        await engine.stop_flushing()
+
+    monkeypatch.setattr(timer_module, "TIMER_FLUSH_SECONDS", 0.01)
+    with caplog.at_level(logging.ERROR, logger="api.timer_engine"):
+        run(scenario())
+
+    assert "timer flush failed" in caplog.text
+    assert store.get_doc("tasks", "a")["timer_events"][0][0] == "s"
+
+
+def test_event_recorded_during_a_flush_stays_dirty(engine, monkeypatch):
+    commit_batch = repository.commit_batch
+
+    async def slow(writes):
+        await asyncio.sleep(0.01)
+        await commit_batch(writes)
+
+    async def scenario():
+        await engine.start("a", USER_ID)
+        flush = asyncio.ensure_future(engine.flush())
+        await asyncio.sleep(0)
+        await engine.pause("a", USER_ID)
+        await flush
+
+    monkeypatch.setattr(repository, "commit_batch", slow)
+    run(scenario())
+    assert engine._timers["a"].dirty
+
+
+def test_task_locks_are_shared_and_dropped_when_unused(engine, monkeypatch):
+    seen = []
+
+    async def scenario():
+        async def hold():
+            async with engine._lock("a"):
+                seen.append(engine._locks["a"])
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(hold(), hold(), engine.start("a", USER_ID), engine.finish("a", USER_ID, {}))
+
+    run(scenario())
+    assert seen[0] is seen[1]
+    assert engine._locks == {} and engine._lock_users == {}
+
+
+def test_finish_leaves_the_timer_until_discarded(engine):
+    run(engine.start("a", USER_ID))
+    minutes, fields = run(engine.finish("a", USER_ID, {}))
+
+    assert minutes is not None and fields["timer_events"][-1][0] == "c"
+    assert run(engine.state("a", USER_ID))["state"] == "running"
+    engine.discard("a")
+    assert "a" not in engine._timers
+
+
+def test_flush_skips_a_finishing_timer_until_kept(engine, store):
+    run(engine.start("a", USER_ID))
+    run(engine.finish("a", USER_ID, {}))
+    run(engine.flush())
+    assert "timer_events" not in store.get_doc("tasks", "a")
+
+    # the completion write failed: the timer is flushed as before
+    engine.keep("a")
+    run(engine.flush())
+    assert store.get_doc("tasks", "a")["timer_events"][0][0] == "s"
+
+
+def test_finish_waits_for_a_flush_in_flight(engine, monkeypatch):
+    order = []
+    commit_batch = repository.commit_batch
+
+    async def slow(writes):
+        await asyncio.sleep(0.01)
+        await commit_batch(writes)
+        order.append("flushed")
+
+    async def scenario():
+        await engine.start("a", USER_ID)
+        flush = asyncio.ensure_future(engine.flush())
+        await asyncio.sleep(0)
+        await engine.finish("a", USER_ID, {})
+        order.append("finished")
+        await flush
+
+    monkeypatch.setattr(repository, "commit_batch", slow)
+    run(scenario())
+    assert order == ["flushed", "finished"]
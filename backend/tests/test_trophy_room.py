@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timezone
+
+from api.routes.flowers import award
+from db import flower_stats
+
+USER_ID = "user-1"
+
+
+def seed_flowers(store):
+    # in New York all three are on March 1st; in UTC the first is on the 2nd
+    for flower_id, earned_at in (
+        ("late", datetime(2026, 3, 2, 3, 0, tzinfo=timezone.utc)),
+        ("evening", datetime(2026, 3, 1, 23, 30, tzinfo=timezone.utc)),
+        ("afternoon", datetime(2026, 3, 1, 22, 0, tzinfo=timezone.utc)),
+    ):
+        store.set_doc("flowers", flower_id, {
+            "task_id": flower_id, "user_id": USER_ID, "flower_type_id": "Dauntless Daisy.svg",
+            "tier": "MICRO", "message": "Nice work!", "earned_at": earned_at,
+        })
+
+
+def dates(room: dict) -> list[tuple[str, list[str]]]:
+    return [(b["date"], [f["flower_id"] for f in b["flowers"]]) for b in room["bouquets"]]
+
+
+def test_trophy_room_groups_by_the_requested_timezone(store):
+    seed_flowers(store)
+    room = asyncio.run(award.get_trophy_room(USER_ID, tz="America/New_York", limit=100))
+    assert room["timezone"] == "America/New_York"
+    assert dates(room) == [("2026-03-01", ["late", "evening", "afternoon"])]
+
+    utc = asyncio.run(award.get_trophy_room(USER_ID, tz="UTC", limit=100))
+    assert dates(utc) == [("2026-03-02", ["late"]), ("2026-03-01", ["evening", "afternoon"])]
+
+
+def test_trophy_room_defaults_to_the_saved_timezone(store):
+    seed_flowers(store)
+    store.set_doc(flower_stats.COLLECTION, USER_ID, flower_stats.empty_stats(USER_ID, "America/New_York"))
+    room = asyncio.run(award.get_trophy_room(USER_ID, limit=100))
+    assert dates(room) == [("2026-03-01", ["late", "evening", "afternoon"])]